@@ -0,0 +1,235 @@
+import os, json, time, random, asyncio
+from collections import defaultdict, deque
+from typing import Dict, List, Optional
+
+import openai
+import pydantic
+from langchain_core.exceptions import OutputParserException
+
+from langchain_story import scenes_chain, story_chain, storyline_chain, timeline_chain, fun_chain
+from langchain_story import scene_prompt, story_prompt, storyline_prompt, timeline_prompt, fun_prompt
+from langchain_story import scenes_to_json, to_json, ensure_timeline_constraints, split_duration, LLMCallCounter
+from langchain_story import llm_cache
+from projection import count_tokens, project_analysis, DEFAULT_TOKEN_BUDGET
+
+# ---------------------------
+# asyncio 파이프라인 (여러 analysis_json 작업을 동시에)
+# ---------------------------
+# - 각 단계는 ainvoke, 작업끼리는 동시에 진행하고 RPM/TPM 한도를 함께 나눠 씀
+# - 재시도는 일시적인 오류(429/5xx/타임아웃/연결, 구조화 출력 파싱/스키마 검증 실패)만, 지수 백오프 + 지터
+# - 단계별 지연/재시도/한도 대기 시간 집계 (PipelineStats)
+# 한 작업 안의 단계는 scenes -> story_idea -> storyline -> timeline -> fun_eval 순서로
+# 앞 단계 결과가 필요하므로 동시 실행은 작업 단위로 이루어짐
+
+LLM_RPM = int(os.environ["LLM_RPM"]) if os.environ.get("LLM_RPM") else None   # 분당 요청 수 한도
+LLM_TPM = int(os.environ["LLM_TPM"]) if os.environ.get("LLM_TPM") else None   # 분당 토큰 수 한도
+MAX_CONCURRENCY = 4         # 동시에 진행할 작업 수
+MAX_RETRY = 4
+BACKOFF_BASE = 1.0          # 초
+BACKOFF_MAX = 30.0
+
+RETRYABLE_ERRORS = (
+    openai.RateLimitError,
+    openai.APITimeoutError,
+    openai.APIConnectionError,
+    openai.InternalServerError,
+    asyncio.TimeoutError,
+    OutputParserException,
+    pydantic.ValidationError,   # with_structured_output이 스키마에 안 맞는 응답을 받으면 이 예외 (다시 부르면 대개 성공)
+)
+
+# 단계별 (체인, 프롬프트, 예상 출력 토큰) - 프롬프트는 TPM 예산용 토큰 추정에 사용
+STAGES = {
+    "scenes": (scenes_chain, scene_prompt, 800),
+    "story_idea": (story_chain, story_prompt, 400),
+    "storyline": (storyline_chain, storyline_prompt, 600),
+    "timeline": (timeline_chain, timeline_prompt, 1500),
+    "fun_eval": (fun_chain, fun_prompt, 1200),
+}
+
+
+class RateLimiter:
+    """
+    최근 window초 동안의 요청 수/토큰 수로 RPM, TPM 한도를 지킴 (None이면 제한 없음)
+    한 이벤트 루프 안에서 여러 작업이 공유
+    """
+
+    def __init__(self, rpm: Optional[int] = LLM_RPM, tpm: Optional[int] = LLM_TPM, window: float = 60.0):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.window = window
+        self._events = deque()      # (시각, 토큰 수)
+        self._tokens = 0
+
+    async def acquire(self, tokens: int) -> float:
+        # 한도 안에 들어올 때까지 기다리고, 기다린 시간(초)을 반환
+        if self.tpm is not None:
+            tokens = min(tokens, self.tpm)      # 한 요청이 한도보다 크면 한도만큼만 잡음
+        waited = 0.0
+        while True:
+            now = time.monotonic()
+            while self._events and now - self._events[0][0] >= self.window:
+                self._tokens -= self._events.popleft()[1]
+
+            rpm_ok = self.rpm is None or len(self._events) < self.rpm
+            tpm_ok = self.tpm is None or self._tokens + tokens <= self.tpm
+            if rpm_ok and tpm_ok:
+                self._events.append((now, tokens))
+                self._tokens += tokens
+                return waited
+
+            delay = max(0.01, self.window - (now - self._events[0][0]))
+            await asyncio.sleep(delay)
+            waited += delay
+
+
+class PipelineStats:
+    """단계별 호출 지연(재시도 포함), 재시도 횟수, 한도 대기 시간"""
+
+    def __init__(self):
+        self.latency: Dict[str, List[float]] = defaultdict(list)
+        self.retries: Dict[str, int] = defaultdict(int)
+        self.wait: Dict[str, float] = defaultdict(float)
+        self.errors: Dict[str, int] = defaultdict(int)
+
+    def summary(self) -> dict:
+        out = {}
+        for stage in STAGES:
+            lat = sorted(self.latency.get(stage, []))
+            if not lat and not self.errors.get(stage):
+                continue
+            out[stage] = {
+                "calls": len(lat),
+                "avg_sec": round(sum(lat) / len(lat), 3) if lat else None,
+                "p95_sec": round(lat[min(len(lat) - 1, int(len(lat) * 0.95))], 3) if lat else None,
+                "retries": self.retries.get(stage, 0),
+                "rate_wait_sec": round(self.wait.get(stage, 0.0), 3),
+                "errors": self.errors.get(stage, 0),
+            }
+        return out
+
+
+def is_retryable(e: Exception) -> bool:
+    return isinstance(e, RETRYABLE_ERRORS)
+
+
+def backoff_delay(attempt: int, e: Optional[Exception] = None) -> float:
+    # 서버가 retry-after를 주면 그만큼, 아니면 full jitter 지수 백오프
+    headers = getattr(getattr(e, "response", None), "headers", None) or {}
+    retry_after = headers.get("retry-after")
+    if retry_after:
+        try:
+            return min(BACKOFF_MAX, float(retry_after))
+        except ValueError:
+            pass
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * (2 ** attempt)))
+
+
+def estimate_tokens(stage: str, payload: dict) -> int:
+    _, prompt, output_tokens = STAGES[stage]
+    messages = prompt.format_messages(**payload)
+    return sum(count_tokens(m.content) for m in messages) + output_tokens
+
+
+async def ainvoke_stage(stage: str, payload: dict, limiter: RateLimiter, stats: PipelineStats,
+                        config=None, max_retry: int = MAX_RETRY):
+    chain = STAGES[stage][0]
+    tokens = estimate_tokens(stage, payload)
+    t0 = time.perf_counter()
+    for attempt in range(max_retry + 1):
+        stats.wait[stage] += await limiter.acquire(tokens)
+        try:
+            result = await chain.ainvoke(payload, config=config)
+            stats.latency[stage].append(time.perf_counter() - t0)
+            return result
+        except Exception as e:
+            if not is_retryable(e) or attempt == max_retry:
+                stats.errors[stage] += 1
+                raise
+            delay = backoff_delay(attempt, e)
+            stats.retries[stage] += 1
+            print(f"[Retry {attempt+1}] {stage}: {type(e).__name__} - {delay:.1f}s 후 재시도")
+            await asyncio.sleep(delay)
+
+
+async def arun_pipeline(analysis_json: dict, duration: int = 30, limiter: Optional[RateLimiter] = None,
+                        stats: Optional[PipelineStats] = None, config=None,
+                        token_budget=DEFAULT_TOKEN_BUDGET) -> dict:
+    # local_langchain.run_pipeline의 asyncio 버전
+    # 작업 안의 단계는 모두 앞 단계 결과가 필요해서 차례대로 실행 (서로 독립인 단계가 없음)
+    # 동시 실행은 작업 단위 - 여러 작업은 arun_many에서 함께 진행하며 한도(RateLimiter)를 나눠 씀
+    limiter = limiter or RateLimiter()
+    stats = stats if stats is not None else PipelineStats()
+    analysis_str = project_analysis(analysis_json, token_budget)
+
+    async def _stage(stage, payload):
+        return await ainvoke_stage(stage, payload, limiter, stats, config=config)
+
+    scenes = await _stage("scenes", {"analysis_json": analysis_str})
+    scenes_json = scenes_to_json(scenes)
+
+    split = split_duration(duration)
+    story_idea = await _stage("story_idea", {"scenes_json": scenes_json, "duration": duration, **split})
+    story_idea_json = to_json(story_idea)
+
+    storyline = await _stage("storyline", {"scenes_json": scenes_json, "story_idea_json": story_idea_json})
+    storyline_json = to_json(storyline)
+
+    timeline = await _stage("timeline", {
+        "analysis_json": analysis_str,
+        "storyline_json": storyline_json,
+        "duration": duration,
+        "image_ratio": 0.3,
+        "video_ratio": 0.7,
+    })
+    timeline = ensure_timeline_constraints(timeline, analysis_json, duration)
+
+    fun_eval = await _stage("fun_eval", {"storyline_json": storyline_json, "timeline_json": to_json(timeline)})
+
+    return {"scenes": scenes, "story_idea": story_idea, "storyline": storyline, "timeline": timeline, "fun_eval": fun_eval}
+
+
+async def arun_many(jobs: List[dict], max_concurrency: int = MAX_CONCURRENCY,
+                    rpm: Optional[int] = LLM_RPM, tpm: Optional[int] = LLM_TPM, config=None):
+    """
+    jobs: [{"analysis_json": dict, "duration": int}, ...]
+    반환: (입력 순서대로 결과 목록, PipelineStats) - 실패한 작업은 {"error": 메시지}
+    """
+    limiter = RateLimiter(rpm, tpm)
+    stats = PipelineStats()
+    sem = asyncio.Semaphore(max_concurrency)
+
+    async def _job(job):
+        async with sem:
+            try:
+                return await arun_pipeline(job["analysis_json"], job.get("duration", 30), limiter, stats, config)
+            except Exception as e:
+                print(f"작업 실패: {type(e).__name__} - {e}")
+                return {"error": f"{type(e).__name__}: {e}"}
+
+    results = await asyncio.gather(*(_job(j) for j in jobs))
+    return results, stats
+
+
+if __name__ == "__main__":
+    # 같은 샘플을 여러 번 넣어 동시 처리 확인 (LLM_CACHE_BYPASS=1 이면 캐시 없이 호출)
+    import sys
+    from contextlib import nullcontext
+
+    with open("analysis.json", "r", encoding="utf-8") as f:
+        analysis_json = json.load(f)
+    n_jobs = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+
+    counter = LLMCallCounter()
+    t0 = time.perf_counter()
+    with llm_cache.bypass() if os.environ.get("LLM_CACHE_BYPASS") == "1" else nullcontext():
+        results, stats = asyncio.run(arun_many(
+            [{"analysis_json": analysis_json, "duration": 30}] * n_jobs,
+            config={"callbacks": [counter]},
+        ))
+    elapsed = time.perf_counter() - t0
+
+    print(f"\n=== {n_jobs}개 작업 {elapsed:.1f}s (실패 {sum('error' in r for r in results)}) ===")
+    print(json.dumps(stats.summary(), ensure_ascii=False, indent=2))
+    print("\n=== LLM Calls (stage별) ===")
+    print(dict(counter.counts))
@@ -0,0 +1,322 @@
+# benchmark.py
+# LLM 파이프라인 성능 측정용 스크립트 (langchain 디렉터리에서 실행)
+#   python benchmark.py tokens analysis.json [--budgets 1000 3000 8000]
+#   python benchmark.py latency analysis.json [--duration 30] [--repeat 3]
+#   python benchmark.py timeline-stream analysis.json [--duration 30] [--repeat 3]
+#   python benchmark.py repair analysis.json [--duration 30] [--repeat 3]
+#   python benchmark.py timeline-index [--items 1000 5000 20000] [--queries 2000]
+#   python benchmark.py captions [--minutes 10] [--repeat 5]
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from typing import List
+
+from projection import count_tokens, project_analysis, DEFAULT_TOKEN_BUDGET
+
+# 공용 모듈(capUp/shared) - 상위 폴더를 뒤에 추가해 이 폴더의 같은 이름 모듈을 가리지 않음
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def _load(path: str) -> dict:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def bench_tokens(analysis_path: str, budgets: List[int]) -> List[dict]:
+    # 원본 json.dumps vs 축약본(예산별) 토큰 수
+    analysis = _load(analysis_path)
+    full = count_tokens(json.dumps(analysis, ensure_ascii=False))
+
+    rows = [{"mode": "full", "tokens": full, "ratio": 1.0, "sec": 0.0}]
+    for budget in [None] + list(budgets):
+        t0 = time.perf_counter()
+        text = project_analysis(analysis, budget)
+        sec = time.perf_counter() - t0
+        tokens = count_tokens(text)
+        rows.append({"mode": f"compact(budget={budget})", "tokens": tokens,
+                     "ratio": round(tokens / full, 3), "sec": round(sec, 4)})
+
+    for r in rows:
+        print(f"{r['mode']:>24}  tokens={r['tokens']:>7}  x{r['ratio']:<6}  projection {r['sec']}s")
+    return rows
+
+
+def bench_latency(analysis_path: str, duration: int = 30, repeat: int = 3,
+                  token_budget: int = DEFAULT_TOKEN_BUDGET) -> dict:
+    # 캐시를 건너뛰고 전체 파이프라인을 원본/축약본으로 각각 실행 (실제 API 호출)
+    from langchain_story import overall, llm_cache
+
+    analysis = _load(analysis_path)
+    result = {}
+    for compact in (False, True):
+        runs = []
+        for _ in range(repeat):
+            payload = {"analysis_json": analysis, "duration": duration,
+                       "compact": compact, "token_budget": token_budget}
+            t0 = time.perf_counter()
+            with llm_cache.bypass():
+                overall.invoke(payload)
+            runs.append(time.perf_counter() - t0)
+        mode = "compact" if compact else "full"
+        result[mode] = {"median_sec": round(statistics.median(runs), 2), "runs": [round(r, 2) for r in runs]}
+        print(f"{mode:>8}: median {result[mode]['median_sec']}s  runs={result[mode]['runs']}")
+    return result
+
+
+def bench_timeline_stream(analysis_path: str, duration: int = 30, repeat: int = 3) -> dict:
+    # timeline 단계만: 일반 invoke(전체 대기) vs 스트리밍(첫 항목까지 / 전체)
+    # 앞 단계(scenes~storyline)는 캐시를 써서 한 번만 계산
+    from langchain_story import (scenes_chain, story_chain, storyline_chain, timeline_chain,
+                                 scenes_to_json, to_json, split_duration, llm_cache)
+    from timeline_stream import TimelineStream
+
+    analysis = _load(analysis_path)
+    analysis_str = project_analysis(analysis)
+    scenes_json = scenes_to_json(scenes_chain.invoke({"analysis_json": analysis_str}))
+    story_idea = story_chain.invoke({"scenes_json": scenes_json, "duration": duration, **split_duration(duration)})
+    storyline = storyline_chain.invoke({"scenes_json": scenes_json, "story_idea_json": to_json(story_idea)})
+    payload = {"analysis_json": analysis_str, "storyline_json": to_json(storyline),
+               "duration": duration, "image_ratio": 0.3, "video_ratio": 0.7}
+
+    full, first, streamed = [], [], []
+    with llm_cache.bypass():
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            timeline_chain.invoke(payload)
+            full.append(time.perf_counter() - t0)
+
+            stream = TimelineStream(payload, analysis, duration)
+            stream.run()
+            first.append(stream.first_item_sec or stream.total_sec)
+            streamed.append(stream.total_sec)
+
+    result = {
+        "invoke_full_sec": round(statistics.median(full), 2),
+        "stream_first_item_sec": round(statistics.median(first), 2),
+        "stream_full_sec": round(statistics.median(streamed), 2),
+    }
+    print(json.dumps(result, ensure_ascii=False))
+    return result
+
+
+def bench_repair(analysis_path: str, duration: int = 30, repeat: int = 3) -> dict:
+    # 절반 길이의 타임라인 보정: 로컬 솔버 vs 예전 LLM 재호출(adjust_length)
+    from langchain_story import (TimelineItem, TimelineOutput, StorylineOutput, adjust_timeline_length,
+                                 solve_timeline_locally, base_llm, llm_cache)
+
+    analysis = _load(analysis_path)
+    short, t = [], 0.0
+    for seg in analysis.get("segments", []):
+        if t >= duration / 2:
+            break
+        short.append(TimelineItem(type="video", filename=seg["source"], start=t, end=t + 4.0, source_start=seg["start"]))
+        t += 4.0
+    storyline = StorylineOutput(story_summary="", story_flow=[])
+
+    def _tl():
+        return TimelineOutput(story_summary="", timeline=[it.model_copy() for it in short])
+
+    solver = []
+    for _ in range(max(repeat, 100)):
+        t0 = time.perf_counter()
+        solved, report = solve_timeline_locally(_tl(), analysis, duration)
+        solver.append(time.perf_counter() - t0)
+
+    llm = []
+    with llm_cache.bypass():
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            adjust_timeline_length(_tl(), analysis, duration, storyline, base_llm, use_solver=False)
+            llm.append(time.perf_counter() - t0)
+
+    result = {
+        "solver_ms": round(statistics.median(solver) * 1000, 3),
+        "llm_sec": round(statistics.median(llm), 2),
+        "solver_report": report,
+    }
+    print(json.dumps(result, ensure_ascii=False))
+    return result
+
+
+def _synthetic_timeline(n: int, seed: int = 0) -> List[dict]:
+    # 롱폼/배치 생성 타임라인 흉내: 영상/이미지 컷이 이어지고 자막/오디오가 겹침
+    rng = random.Random(seed)
+    items, t = [], 0.0
+    while len(items) < n:
+        length = rng.uniform(3.0, 7.0)
+        items.append({"type": rng.choice(["video", "video", "image"]), "start": t, "end": t + length})
+        if rng.random() < 0.7:
+            st = t + rng.uniform(0, length / 2)
+            items.append({"type": "subtitle", "start": st, "end": st + rng.uniform(1.0, 4.0)})
+        if rng.random() < 0.05:
+            items.append({"type": "audio", "start": t, "end": t + rng.uniform(20.0, 120.0)})
+        t += length
+    return items[:n]
+
+
+def bench_timeline_index(sizes: List[int], queries: int = 2000) -> List[dict]:
+    # 선형 스캔 vs TimelineIndex (active_at / overlapping / coverage / gaps)
+    from shared.timeline_index import TimelineIndex
+
+    rows = []
+    for n in sizes:
+        items = _synthetic_timeline(n)
+        end = max(it["end"] for it in items)
+        rng = random.Random(1)
+        points = [rng.uniform(0, end) for _ in range(queries)]
+        visual = ("video", "image")
+
+        t0 = time.perf_counter()
+        for t in points:
+            [it for it in items if it["start"] <= t < it["end"]]
+            [it for it in items if it["start"] < t + 5.0 and it["end"] > t]
+        naive_query = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        merged = []
+        for it in sorted((it for it in items if it["type"] in visual), key=lambda x: x["start"]):
+            if merged and it["start"] <= merged[-1][1]:
+                merged[-1][1] = max(merged[-1][1], it["end"])
+            else:
+                merged.append([it["start"], it["end"]])
+        naive_cov = sum(b - a for a, b in merged)
+        naive_cov_sec = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        index = TimelineIndex(items)
+        index.items()
+        build = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        for t in points:
+            index.active_at(t)
+            index.overlapping(t, t + 5.0)
+        index_query = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        cov = index.coverage(visual)
+        index.gaps(visual, 0.0, end)
+        index_cov_sec = time.perf_counter() - t0
+        assert abs(cov - naive_cov) < 1e-6
+
+        row = {
+            "items": n,
+            "build_ms": round(build * 1000, 2),
+            "naive_query_us": round(naive_query / queries * 1e6, 1),
+            "index_query_us": round(index_query / queries * 1e6, 1),
+            "naive_coverage_ms": round(naive_cov_sec * 1000, 3),
+            "index_coverage_ms": round(index_cov_sec * 1000, 3),
+        }
+        print(json.dumps(row))
+        rows.append(row)
+    return rows
+
+
+def _synthetic_words(seconds: float, seed: int = 0) -> List[dict]:
+    # 초당 2~3어절 한국어 대사, 문장 끝/쉼표와 쉼 포함
+    rng = random.Random(seed)
+    vocab = ["오늘은", "고객", "리뷰를", "분석해서", "인사이트를", "뽑는", "방법을", "소개합니다", "데이터를", "모으고",
+             "모델을", "학습시키면", "정확도가", "올라갑니다", "자동화", "파이프라인까지", "보여드릴게요", "정말", "간단해요"]
+    words, t = [], 0.0
+    while t < seconds:
+        w = rng.choice(vocab)
+        r = rng.random()
+        w += "." if r < 0.12 else ("," if r < 0.2 else "")
+        dur = rng.uniform(0.25, 0.5)
+        words.append({"word": " " + w, "start": round(t, 3), "end": round(t + dur, 3)})
+        t += dur + (rng.uniform(0.5, 1.0) if w.endswith(".") else rng.uniform(0.02, 0.15))
+    return words
+
+
+def bench_captions(minutes: float = 10.0, repeat: int = 5) -> dict:
+    # Whisper 단어 -> 자막 항목 + SRT/ASS (컷 매핑 포함), LLM 없음
+    from captions import build_captions, to_ass, to_srt
+
+    seconds = minutes * 60
+    words = _synthetic_words(seconds)
+    # 원본 하나를 5초 컷으로 순서를 섞어 배치 (컷마다 source_start 다름)
+    rng = random.Random(2)
+    sources = [i * 5.0 for i in range(int(seconds // 5))]
+    rng.shuffle(sources)
+    timeline = [{"type": "video", "filename": "talk.mp4", "start": i * 5.0, "end": i * 5.0 + 5.0, "source_start": src}
+                for i, src in enumerate(sources)]
+
+    build, sidecar = [], []
+    captions = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        captions = build_captions(timeline, {"talk.mp4": words})
+        build.append(time.perf_counter() - t0)
+        t0 = time.perf_counter()
+        to_srt(captions)
+        to_ass(captions)
+        sidecar.append(time.perf_counter() - t0)
+
+    lengths = [c["end"] - c["start"] for c in captions]
+    result = {
+        "minutes": minutes,
+        "words": len(words),
+        "cuts": len(timeline),
+        "captions": len(captions),
+        "build_ms": round(statistics.median(build) * 1000, 2),
+        "sidecar_ms": round(statistics.median(sidecar) * 1000, 2),
+        "min_caption_sec": round(min(lengths), 3) if lengths else 0.0,
+        "max_caption_sec": round(max(lengths), 3) if lengths else 0.0,
+    }
+    print(json.dumps(result))
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("tokens", help="analysis_json 원본 vs 축약본 토큰 수")
+    p.add_argument("analysis_path")
+    p.add_argument("--budgets", type=int, nargs="+", default=[1000, DEFAULT_TOKEN_BUDGET, 8000])
+
+    p = sub.add_parser("latency", help="원본 vs 축약본 전체 파이프라인 지연")
+    p.add_argument("analysis_path")
+    p.add_argument("--duration", type=int, default=30)
+    p.add_argument("--repeat", type=int, default=3)
+    p.add_argument("--token-budget", type=int, default=DEFAULT_TOKEN_BUDGET)
+
+    p = sub.add_parser("timeline-stream", help="timeline 단계 첫 항목까지 vs 전체 지연")
+    p.add_argument("analysis_path")
+    p.add_argument("--duration", type=int, default=30)
+    p.add_argument("--repeat", type=int, default=3)
+
+    p = sub.add_parser("repair", help="타임라인 길이 보정: 로컬 솔버 vs LLM")
+    p.add_argument("analysis_path")
+    p.add_argument("--duration", type=int, default=30)
+    p.add_argument("--repeat", type=int, default=3)
+
+    p = sub.add_parser("timeline-index", help="타임라인 구간 질의: 선형 스캔 vs TimelineIndex")
+    p.add_argument("--items", type=int, nargs="+", default=[1000, 5000, 20000])
+    p.add_argument("--queries", type=int, default=2000)
+
+    p = sub.add_parser("captions", help="Whisper 단어 -> 자막/SRT/ASS 생성 시간")
+    p.add_argument("--minutes", type=float, default=10.0)
+    p.add_argument("--repeat", type=int, default=5)
+
+    args = parser.parse_args()
+    if args.command == "tokens":
+        bench_tokens(args.analysis_path, args.budgets)
+    elif args.command == "latency":
+        bench_latency(args.analysis_path, args.duration, args.repeat, args.token_budget)
+    elif args.command == "timeline-stream":
+        bench_timeline_stream(args.analysis_path, args.duration, args.repeat)
+    elif args.command == "repair":
+        bench_repair(args.analysis_path, args.duration, args.repeat)
+    elif args.command == "timeline-index":
+        bench_timeline_index(args.items, args.queries)
+    elif args.command == "captions":
+        bench_captions(args.minutes, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
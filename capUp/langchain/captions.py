@@ -0,0 +1,289 @@
+import os
+import unicodedata
+from typing import Dict, List, Tuple
+
+# ---------------------------
+# Whisper 단어 타임스탬프 -> 자막 (LLM 없이)
+# ---------------------------
+# - 타임라인 video 컷(filename, start, end, source_start)마다 원본 구간 안의 단어를 컷 위치로 옮김
+# - 쉼/문장 끝/최대 길이/최대 글자 수에서 자막을 나누고, 컷 경계는 넘지 않음
+# - 줄바꿈은 어절(띄어쓰기) 단위, 구두점/연결 어미 뒤를 선호, 두 줄 길이를 비슷하게
+# - 내부 시각은 정수 ms (SRT/ASS도 ms 기준으로 출력)
+# 결과는 subtitle 항목 dict 목록 (TimelineItem.model_validate 가능), SRT/ASS 사이드카로도 저장
+# 순수 파이썬만 사용 - movie_maker는 이 모듈을 import하지 않고 write_sidecar로 만든 SRT/ASS 파일(subtitle_file)만 받음
+
+MAX_LINE_CHARS = 16         # 한 줄 최대 폭 (한글 1, 영문/숫자/공백 0.5)
+MAX_LINES = 2
+MIN_CAPTION_MS = 800
+MAX_CAPTION_MS = 4000
+PAUSE_MS = 600              # 단어 사이 쉼이 이보다 길면 새 자막
+MIN_VISIBLE_MS = 200        # 컷에 걸린 단어가 이보다 짧게 보이면 버림
+
+_SENTENCE_END = (".", "?", "!", "。", "？", "！", "…")
+_CLAUSE_END = (",", "，", "、", ";", ":")
+# 뒤에서 끊기 좋은 연결 어미/조사 (어절 끝)
+_CONNECTIVES = ("고", "서", "며", "면", "지만", "는데", "은데", "니까", "면서", "려고", "도록", "는", "은", "를", "을", "에서", "에게", "으로", "로")
+
+
+def _get(item, key, default=None):
+    if isinstance(item, dict):
+        return item.get(key, default)
+    return getattr(item, key, default)
+
+
+def _width(text: str) -> float:
+    return sum(1.0 if unicodedata.east_asian_width(ch) in ("W", "F") else 0.5 for ch in text)
+
+
+def _words_of(speech) -> List[dict]:
+    # speechTranscriptions 형태(whisper_utils) 또는 단어 목록 그대로
+    if not speech:
+        return []
+    if isinstance(speech, list) and isinstance(speech[0], dict) and "alternatives" in speech[0]:
+        return [w for tr in speech for alt in tr.get("alternatives", [])[:1] for w in alt.get("words", [])]
+    return list(speech)
+
+
+def transcript_words(analysis_json: dict) -> Dict[str, List[dict]]:
+    # 분석 JSON의 영상별 Whisper 결과 -> {filename: [{word, start, end}]}
+    out = {}
+    for v in analysis_json.get("videos", []):
+        if not v.get("filename"):
+            continue
+        parsed = v.get("analysis") if isinstance(v.get("analysis"), dict) else v
+        words = _words_of(parsed.get("speech") or parsed.get("speechTranscriptions"))
+        if words:
+            out[v["filename"]] = words
+    return out
+
+
+def _to_ms(words: List[dict]) -> List[Tuple[int, int, str]]:
+    # (시작 ms, 끝 ms, 단어), 빠진 시각은 앞뒤 단어로 채움
+    out = []
+    n = len(words)
+    for i, w in enumerate(words):
+        text = w.get("word") or ""
+        if not text.strip():
+            continue
+        st, et = w.get("start"), w.get("end")
+        if st is None:
+            st = out[-1][1] / 1000 if out else (et if et is not None else 0.0)
+        if et is None:
+            nxt = next((words[j].get("start") for j in range(i + 1, n) if words[j].get("start") is not None), None)
+            et = nxt if nxt is not None and nxt > st else st + 0.2
+        out.append((int(round(float(st) * 1000)), int(round(max(float(st), float(et)) * 1000)), text))
+    return out
+
+
+def _cuts(timeline) -> list:
+    return sorted((it for it in timeline if _get(it, "type") == "video" and _get(it, "filename")),
+                  key=lambda it: float(_get(it, "start")))
+
+
+def map_words(timeline, words_by_file: Dict[str, List[dict]]) -> List[Tuple[int, int, str, int]]:
+    """
+    video 컷에 보이는 단어를 타임라인 시각으로 -> [(시작 ms, 끝 ms, 단어, 컷 번호)] (시작 순)
+    timeline: TimelineItem 목록 또는 timeline_json["timeline"]
+    """
+    by_name = {}
+    for name, words in words_by_file.items():
+        ms = _to_ms(words)
+        by_name[name] = ms
+        by_name.setdefault(os.path.basename(name), ms)
+
+    out = []
+    for k, it in enumerate(_cuts(timeline)):
+        words = by_name.get(_get(it, "filename")) or by_name.get(os.path.basename(_get(it, "filename"))) or []
+        t0 = int(round(float(_get(it, "start")) * 1000))
+        t1 = int(round(float(_get(it, "end")) * 1000))
+        src = _get(it, "source_start")
+        s0 = t0 if src is None else int(round(float(src) * 1000))
+        s1 = s0 + (t1 - t0)
+        for ws, we, text in words:
+            if we <= s0 or ws >= s1:
+                continue
+            a, b = t0 + max(ws, s0) - s0, t0 + min(we, s1) - s0
+            if b - a < min(MIN_VISIBLE_MS, we - ws):
+                continue
+            out.append((a, b, text, k))
+    out.sort(key=lambda w: (w[0], w[3]))
+    return out
+
+
+def break_lines(text: str, max_chars: float = MAX_LINE_CHARS, max_lines: int = MAX_LINES) -> List[str]:
+    # 어절 단위 줄바꿈 (어절 안에서는 자르지 않음)
+    tokens = text.split()
+    if not tokens:
+        return []
+    if _width(text) <= max_chars or len(tokens) == 1:
+        return [" ".join(tokens)]
+
+    widths = [_width(t) for t in tokens]
+    if max_lines == 2:
+        best, best_cost = 1, None
+        total = sum(widths) + 0.5 * (len(tokens) - 1)
+        left = 0.0
+        for i in range(1, len(tokens)):
+            left += widths[i - 1] + (0.5 if i > 1 else 0.0)
+            right = total - left - 0.5
+            over = max(0.0, left - max_chars) + max(0.0, right - max_chars)
+            cost = over * 100 + abs(left - right)
+            prev = tokens[i - 1]
+            if prev.endswith(_SENTENCE_END + _CLAUSE_END):
+                cost -= 6
+            elif prev.endswith(_CONNECTIVES):
+                cost -= 2
+            if i == 1 or i == len(tokens) - 1:
+                cost += 3       # 한 어절만 떨어지는 줄은 피함
+            if best_cost is None or cost < best_cost:
+                best, best_cost = i, cost
+        return [" ".join(tokens[:best]), " ".join(tokens[best:])]
+
+    lines, cur, cur_w = [], [], 0.0
+    for tok, w in zip(tokens, widths):
+        if cur and cur_w + 0.5 + w > max_chars:
+            lines.append(" ".join(cur))
+            cur, cur_w = [], 0.0
+        cur_w += (0.5 if cur else 0.0) + w
+        cur.append(tok)
+    if cur:
+        lines.append(" ".join(cur))
+    return lines
+
+
+def _join(words) -> str:
+    return "".join(w[2] for w in words).strip()
+
+
+def build_captions(
+    timeline,
+    words_by_file: Dict[str, List[dict]],
+    max_chars: float = MAX_LINE_CHARS,
+    max_lines: int = MAX_LINES,
+    min_ms: int = MIN_CAPTION_MS,
+    max_ms: int = MAX_CAPTION_MS,
+    pause_ms: int = PAUSE_MS,
+) -> List[dict]:
+    """
+    타임라인 video 컷 + 원본별 Whisper 단어 -> subtitle 항목 [{type, text, start, end}] (초, 시작 순)
+    text의 줄바꿈은 "\\n"
+    """
+    words = map_words(timeline, words_by_file)
+    limit = max_chars * max_lines
+
+    groups: List[list] = []
+    cur: list = []
+    for w in words:
+        if cur:
+            last = cur[-1]
+            text = _join(cur + [w])
+            if (w[3] != last[3]                                 # 컷이 바뀜
+                    or w[0] - last[1] > pause_ms                 # 쉼
+                    or w[1] - cur[0][0] > max_ms                 # 너무 김
+                    or _width(text) > limit                      # 글자 수
+                    or (last[2].strip().endswith(_SENTENCE_END) and last[1] - cur[0][0] >= min_ms)):
+                groups.append(cur)
+                cur = []
+        cur.append(w)
+    if cur:
+        groups.append(cur)
+
+    # 컷 시작/끝 (자막이 앞뒤 컷으로 넘어가지 않게)
+    cuts = _cuts(timeline)
+    cut_start = {k: int(round(float(_get(it, "start")) * 1000)) for k, it in enumerate(cuts)}
+    cut_end = {k: int(round(float(_get(it, "end")) * 1000)) for k, it in enumerate(cuts)}
+
+    captions = []
+    prev_end = 0
+    for i, g in enumerate(groups):
+        start, end = g[0][0], g[-1][1]
+        nxt = groups[i + 1][0][0] if i + 1 < len(groups) else None
+        ceiling = cut_end.get(g[0][3], end)
+        if nxt is not None:
+            ceiling = min(ceiling, nxt)
+        end = max(end, min(start + min_ms, ceiling))     # 최소 길이 (다음 자막/컷 끝까지만)
+        if end - start < min_ms:                          # 컷 끝에 걸린 짧은 자막은 앞으로 당김
+            start = max(min(start, end - min_ms), prev_end, cut_start.get(g[0][3], start))
+        end = min(end, start + max_ms)
+        if end <= start:
+            continue
+        lines = break_lines(_join(g), max_chars, max_lines)
+        if not lines:
+            continue
+        captions.append({"type": "subtitle", "text": "\n".join(lines), "start": start / 1000, "end": end / 1000})
+        prev_end = end
+    return captions
+
+
+def captions_from_analysis(timeline, analysis_json: dict, **kwargs) -> List[dict]:
+    return build_captions(timeline, transcript_words(analysis_json), **kwargs)
+
+
+# ---------------------------
+# 사이드카 (SRT / ASS)
+# ---------------------------
+def _ms(t: float) -> int:
+    return int(round(float(t) * 1000))
+
+
+def _srt_time(ms: int) -> str:
+    h, ms = divmod(ms, 3600000)
+    m, ms = divmod(ms, 60000)
+    s, ms = divmod(ms, 1000)
+    return f"{h:02d}:{m:02d}:{s:02d},{ms:03d}"
+
+
+def _ass_time(ms: int) -> str:
+    cs = (ms + 5) // 10
+    h, cs = divmod(cs, 360000)
+    m, cs = divmod(cs, 6000)
+    s, cs = divmod(cs, 100)
+    return f"{h:d}:{m:02d}:{s:02d}.{cs:02d}"
+
+
+def to_srt(captions) -> str:
+    blocks = []
+    for i, c in enumerate(sorted(captions, key=lambda c: _ms(_get(c, "start"))), 1):
+        blocks.append(f"{i}\n{_srt_time(_ms(_get(c, 'start')))} --> {_srt_time(_ms(_get(c, 'end')))}\n{_get(c, 'text')}\n")
+    return "\n".join(blocks)
+
+
+def to_ass(captions, resolution: Tuple[int, int] = (1080, 1920), font: str = "NanumGothic",
+           fontsize: int = 48, margin_v: int = 60) -> str:
+    # movie.py 자막과 비슷하게: 흰 글자 + 반투명 검은 상자, 아래 가운데
+    w, h = resolution
+    lines = [
+        "[Script Info]",
+        "ScriptType: v4.00+",
+        f"PlayResX: {w}",
+        f"PlayResY: {h}",
+        "WrapStyle: 2",
+        "",
+        "[V4+ Styles]",
+        "Format: Name, Fontname, Fontsize, PrimaryColour, SecondaryColour, OutlineColour, BackColour, Bold, Italic, "
+        "Underline, StrikeOut, ScaleX, ScaleY, Spacing, Angle, BorderStyle, Outline, Shadow, Alignment, "
+        "MarginL, MarginR, MarginV, Encoding",
+        f"Style: Default,{font},{fontsize},&H00FFFFFF,&H00FFFFFF,&H66000000,&H66000000,0,0,0,0,100,100,0,0,"
+        f"3,10,0,2,40,40,{margin_v},1",
+        "",
+        "[Events]",
+        "Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text",
+    ]
+    for c in sorted(captions, key=lambda c: _ms(_get(c, "start"))):
+        text = str(_get(c, "text")).replace("{", "\\{").replace("}", "\\}").replace("\n", "\\N")
+        lines.append(f"Dialogue: 0,{_ass_time(_ms(_get(c, 'start')))},{_ass_time(_ms(_get(c, 'end')))},Default,,0,0,0,,{text}")
+    return "\n".join(lines) + "\n"
+
+
+def write_sidecar(captions, path: str, resolution: Tuple[int, int] = (1080, 1920), font: str = "NanumGothic") -> str:
+    # 확장자(.srt / .ass)로 형식 결정
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".srt":
+        body = to_srt(captions)
+    elif ext == ".ass":
+        body = to_ass(captions, resolution, font)
+    else:
+        raise ValueError(f"지원하지 않는 자막 형식: {ext}")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(body)
+    return path
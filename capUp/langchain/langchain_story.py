@@ -1,9 +1,21 @@
-import os, json, math
+import os, sys, json, math
+import threading
+from collections import defaultdict
 from typing import List, Literal, Optional
 from pydantic import BaseModel, Field
 from langchain_openai import ChatOpenAI
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.runnables import RunnableLambda, RunnablePassthrough, RunnableParallel
+from langchain_core.output_parsers import JsonOutputParser
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.runnables import RunnableLambda, RunnablePassthrough
+from contextlib import nullcontext
+from llm_cache import SQLiteLLMCache
+from projection import project_analysis, DEFAULT_TOKEN_BUDGET
+from timeline_solver import solve_timeline
+# 공용 모듈(capUp/shared) - 상위 폴더를 뒤에 추가해 이 폴더의 같은 이름 모듈을 가리지 않음
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from shared.timeline_index import TimelineIndex
+from captions import transcript_words, build_captions
 
 
 
@@ -47,6 +59,10 @@ class TimelineItem(BaseModel):
     end: float
     position: Optional[Position] = None
     size: Optional[Size] = None
+    source_start: Optional[float] = None    # video: 원본에서 잘라 올 시작 시각 (없으면 start)
+
+class SubtitleTexts(BaseModel):
+    texts: List[str]
 
 class StorylineOutput(BaseModel):
     story_summary: str
@@ -122,14 +138,14 @@ def ensure_timeline_constraints(tl: TimelineOutput, analysis_json: dict, total:
         auds = analysis_json.get("audio", [])
         return auds[0]["filename"] if auds else None
 
-    current_end = 0.0
-    if tl.timeline:
-        current_end = max([it.end for it in tl.timeline])
+    # video 길이 보정 후 구간 인덱스 구성 (끝 시각/정렬에 사용)
+    index = TimelineIndex(tl.timeline)
+    current_end = index.end()
 
     if "image" not in types_present:
         img = first_image()
         if img:
-            tl.timeline.append(TimelineItem(
+            index.add(TimelineItem(
                 type="image",
                 filename=img,
                 start=max(0.0, current_end - 3.0) if current_end else 0.0,
@@ -141,7 +157,7 @@ def ensure_timeline_constraints(tl: TimelineOutput, analysis_json: dict, total:
     if "audio" not in types_present:
         aud = first_audio()
         if aud:
-            tl.timeline.append(TimelineItem(
+            index.add(TimelineItem(
                 type="audio",
                 filename=aud,
                 start=0.0,
@@ -149,7 +165,7 @@ def ensure_timeline_constraints(tl: TimelineOutput, analysis_json: dict, total:
             ))
 
     # 3) 전체 길이 컷
-    tl.timeline.sort(key=lambda x: (x.start, x.end))
+    tl.timeline = [span.item for span in index.items()]
     for it in tl.timeline:
         if it.start > total:
             it.start = float(total - 0.1)
@@ -159,9 +175,70 @@ def ensure_timeline_constraints(tl: TimelineOutput, analysis_json: dict, total:
     return tl
 
 
-def adjust_timeline_length(tl: TimelineOutput, analysis_json: dict, duration: int, storyline: StorylineOutput, llm) -> TimelineOutput:
-    # 현재 총 길이
-    total_length = sum([it.end - it.start for it in tl.timeline if it.type in ["video", "image", "subtitle"]])
+def fill_missing_subtitles(tl: TimelineOutput, missing: List[dict], storyline: StorylineOutput, llm) -> TimelineOutput:
+    # 솔버가 채우지 못한 자막 텍스트(오프닝 훅/클로징 CTA)만 LLM에 요청
+    prompt = f"""
+    아래 스토리라인의 쇼츠에 들어갈 짧은 자막을 {len(missing)}개 작성하라.
+    순서대로: {", ".join("오프닝 훅(질문/숫자/반전)" if m["section"] == "opening" else "클로징 CTA(구독/더보기)" for m in missing)}
+    각 자막은 20자 이내.
+
+    [스토리라인]
+    {to_json(storyline)}
+    """
+    writer_llm = llm.with_structured_output(SubtitleTexts).with_config(tags=["stage:subtitle_text"])
+    texts = writer_llm.invoke(prompt).texts
+    for m, text in zip(missing, texts):
+        tl.timeline.append(TimelineItem(type="subtitle", text=text, start=m["start"], end=m["end"]))
+    tl.timeline.sort(key=lambda x: (x.start, x.end))
+    return tl
+
+
+def solve_timeline_locally(tl: TimelineOutput, analysis_json: dict, duration: int,
+                           story_idea: Optional[StoryIdeaOutput] = None):
+    # timeline_solver로 구간 예산/컷 길이/비율 보정 -> (TimelineOutput, report)
+    if story_idea is not None:
+        sections = {"opening_sec": story_idea.opening_sec, "development_sec": story_idea.development_sec,
+                    "closing_sec": story_idea.closing_sec}
+        ratios = {"image_ratio": story_idea.image_ratio, "video_ratio": story_idea.video_ratio}
+    else:
+        sections = split_duration(duration)
+        ratios = {}
+    items, report = solve_timeline([it.model_dump() for it in tl.timeline], analysis_json, duration, sections, **ratios)
+    solved = TimelineOutput(story_summary=tl.story_summary, timeline=[TimelineItem.model_validate(it) for it in items])
+    return solved, report
+
+
+def apply_captions(tl: TimelineOutput, analysis_json: dict) -> TimelineOutput:
+    # Whisper 단어 타임스탬프가 있으면 대사 자막은 로컬 캡션 엔진으로 (LLM 자막 중 겹치는 것은 제거)
+    # 대사가 없는 구간의 자막(오프닝 훅, CTA 등)은 그대로
+    words = transcript_words(analysis_json)
+    if not words:
+        return tl
+    captions = [TimelineItem.model_validate(c) for c in build_captions(tl.timeline, words)]
+    if not captions:
+        return tl
+    index = TimelineIndex(captions)
+    kept = [it for it in tl.timeline
+            if it.type != "subtitle" or not index.overlapping(it.start, it.end, "subtitle")]
+    tl.timeline = [span.item for span in TimelineIndex(kept + captions).items()]
+    return tl
+
+
+def adjust_timeline_length(tl: TimelineOutput, analysis_json: dict, duration: int, storyline: StorylineOutput, llm,
+                           story_idea: Optional[StoryIdeaOutput] = None, use_solver: bool = True) -> TimelineOutput:
+    # 현재 총 길이 (겹치는 video/image/subtitle 구간은 한 번만)
+    total_length = TimelineIndex(tl.timeline).coverage(("video", "image", "subtitle"))
+    if duration - 2 <= total_length <= duration + 2:
+        return tl
+
+    # 2초 넘게 어긋나면 로컬 솔버로 먼저 맞추고, 새 자막 텍스트가 필요할 때만 LLM 호출
+    # 분석 JSON에 채울 샷/이미지가 없어 2초 이상 모자라면 예전처럼 LLM으로 보강
+    if use_solver:
+        solved, report = solve_timeline_locally(tl, analysis_json, duration, story_idea)
+        if report["unfilled_sec"] <= 2:
+            if report["missing_subtitles"]:
+                solved = fill_missing_subtitles(solved, report["missing_subtitles"], storyline, llm)
+            return solved
 
     if total_length < duration - 2:  # 2초 이상 모자라면
         prompt = f"""
@@ -176,7 +253,7 @@ def adjust_timeline_length(tl: TimelineOutput, analysis_json: dict, duration: in
 
         반드시 TimelineOutput 스키마를 지키고, 기존 timeline 뒤에 자연스럽게 이어 붙여라.
         """
-        fixer_llm = base_llm.with_structured_output(TimelineOutput)
+        fixer_llm = llm.with_structured_output(TimelineOutput).with_config(tags=["stage:adjust_length"])
         new_tl = fixer_llm.invoke(prompt)
         return new_tl
 
@@ -261,7 +338,7 @@ def punch_up_timeline(
 
     출력: TimelineOutput JSON만
     """
-    fixer_llm = llm.with_structured_output(TimelineOutput)
+    fixer_llm = llm.with_structured_output(TimelineOutput).with_config(tags=["stage:punch_up"])
     improved = fixer_llm.invoke(prompt)
     return improved
 
@@ -269,8 +346,12 @@ def punch_up_timeline(
 # ---------------------------
 # LLMs OUTPUT PARSER 지정
 # ---------------------------
+# 프롬프트 단위 응답 캐시 (temperature=0이라 같은 입력이면 같은 결과) - structured output 변형들도 공유
+llm_cache = SQLiteLLMCache(os.environ.get("LLM_CACHE_PATH", ".llm_cache.sqlite"))
+
 base_llm = ChatOpenAI(model="gpt-4o",
-                      temperature=0,)
+                      temperature=0,
+                      cache=llm_cache,)
 
 scene_llm = base_llm.with_structured_output(ScenesOutput)
 story_llm = base_llm.with_structured_output(StoryIdeaOutput)
@@ -356,8 +437,8 @@ timeline_prompt = ChatPromptTemplate.from_messages([
 6) 클로징은 팀 단체사진/로고 이미지와 핵심 메시지를 사용
 7) 전체 시간에서 이미지컷은 약 {image_ratio} 비율, 영상컷은 {video_ratio} 비율이 되도록 분량 조절
 8) 모든 필드는 반드시 채워라. 불필요한 경우에도 기본값을 채운다.
-- position 기본값: {"x":0,"y":0}
-- size 기본값: {"width":1920,"height":1080}
+- position 기본값: {{"x":0,"y":0}}
+- size 기본값: {{"width":1920,"height":1080}}
 - filename/text는 없을 경우 빈 문자열("")로
 9) JSON(스키마) 이외 텍스트 출력 금지
 
@@ -421,121 +502,144 @@ JSON만 출력하라.
 # LCEL Wiring
 # ---------------------------
 
-# === scenes ===
-scenes_chain = scene_prompt | scene_llm
-
-# 구간 분할: opening/dev/closing 초 계산
-splitter = RunnableLambda(lambda inp: split_duration(int(inp["duration"])))
-
-# === story idea 입력 맵 ===
-story_inputs = RunnableParallel(
-    scenes_json = scenes_chain | RunnableLambda(lambda out: scenes_to_json(out)),
-    duration    = RunnableLambda(lambda inp: int(inp["duration"])),
-    opening_sec = splitter | RunnableLambda(lambda d: d["opening_sec"]),
-    development_sec = splitter | RunnableLambda(lambda d: d["development_sec"]),
-    closing_sec = splitter | RunnableLambda(lambda d: d["closing_sec"]),
-)
+# === 단계별 체인 ===
+# 각 체인은 앞 단계 결과를 입력으로 받기만 하고 앞 단계를 다시 실행하지 않는다.
+# 전체 실행은 아래 pipeline이 단계마다 한 번씩 계산해 dict에 누적하며 다음 단계로 넘긴다.
+
+# scenes: {analysis_json}
+scenes_chain = (scene_prompt | scene_llm).with_config(run_name="scenes", tags=["stage:scenes"])
+
+# story idea: {scenes_json, duration, opening_sec, development_sec, closing_sec}
+story_chain = (story_prompt | story_llm).with_config(run_name="story_idea", tags=["stage:story_idea"])
+
+# storyline: {scenes_json, story_idea_json}
+storyline_chain = (storyline_prompt | storyline_llm).with_config(run_name="storyline", tags=["stage:storyline"])
+
+# timeline: {analysis_json, storyline_json, duration, image_ratio, video_ratio}
+timeline_chain = (timeline_prompt | timeline_llm).with_config(run_name="timeline", tags=["stage:timeline"])
+
+# timeline (스트리밍): timeline_chain과 같은 입력, JSON 모드로 받아 부분 JSON(dict)을 누적 출력
+# TimelineItem 단위 검증/보정은 timeline_stream.py
+timeline_stream_chain = (
+    timeline_prompt | base_llm.bind(response_format={"type": "json_object"}) | JsonOutputParser()
+).with_config(run_name="timeline_stream", tags=["stage:timeline"])
+
+# fun evalutation: {storyline_json, timeline_json}
+fun_chain = (fun_prompt | fun_llm).with_config(run_name="fun_eval", tags=["stage:fun_eval"])
+
+
+def _analysis_dict(analysis_json) -> dict:
+    return analysis_json if isinstance(analysis_json, dict) else json.loads(analysis_json)
+
+
+def _prepare_inputs(inp: dict) -> dict:
+    # 입력 정규화: analysis_json은 dict/문자열 모두 허용, 구간 분할 계산
+    # 프롬프트에는 축약본(projection.py)을 넣고, 보정 단계에는 원본 dict를 사용
+    # compact=False면 원본 전체, token_budget으로 축약본 토큰 예산 조절
+    duration = int(inp["duration"])
+    analysis = _analysis_dict(inp["analysis_json"])
+    if inp.get("compact", True):
+        prompt_json = project_analysis(analysis, inp.get("token_budget", DEFAULT_TOKEN_BUDGET))
+    else:
+        prompt_json = json.dumps(analysis, ensure_ascii=False)
+    return {
+        **inp,
+        "analysis": analysis,
+        "analysis_json": prompt_json,
+        "duration": duration,
+        "image_ratio": 0.3,
+        "video_ratio": 0.7,
+        **split_duration(duration),
+    }
 
-# story idea 체인 (입력맵 -> prompt -> llm)
-story_chain = story_inputs | story_prompt | story_llm
 
-# === storyline 입력 맵 ===
-storyline_inputs = RunnableParallel(
-    scenes_json     = scenes_chain | RunnableLambda(lambda out: scenes_to_json(out)),
-    story_idea_json = story_chain  | RunnableLambda(lambda out: to_json(out)),
+# === 전체 단계 DAG (단계별 LLM 호출 1회) ===
+stages = (
+    RunnableLambda(_prepare_inputs)
+    | RunnablePassthrough.assign(scenes=scenes_chain)
+    | RunnablePassthrough.assign(scenes_json=lambda x: scenes_to_json(x["scenes"]))
+    | RunnablePassthrough.assign(story_idea=story_chain)
+    | RunnablePassthrough.assign(story_idea_json=lambda x: to_json(x["story_idea"]))
+    | RunnablePassthrough.assign(storyline=storyline_chain)
+    | RunnablePassthrough.assign(storyline_json=lambda x: to_json(x["storyline"]))
+    | RunnablePassthrough.assign(timeline_raw=timeline_chain)
+    | RunnablePassthrough.assign(timeline_json=lambda x: to_json(x["timeline_raw"]))
+    | RunnablePassthrough.assign(fun_eval=fun_chain)
 )
 
-# storyline 체인
-storyline_chain = storyline_inputs | storyline_prompt | storyline_llm
-
-
-
-# === timeline 입력 맵 ===
-timeline_inputs = RunnableParallel(
-    analysis_json = RunnableLambda(
-        lambda inp: json.dumps(inp["analysis_json"], ensure_ascii=False)
-                    if isinstance(inp["analysis_json"], dict) else inp["analysis_json"]
-    ),
-    storyline_json = storyline_chain | RunnableLambda(lambda out: to_json(out)),
-    duration       = RunnableLambda(lambda inp: int(inp["duration"])),
-    image_ratio    = RunnableLambda(lambda inp: 0.3),   # 추가
-    video_ratio    = RunnableLambda(lambda inp: 0.7),   # 추가
-)
 
+# ===========================
+# 전체 파이프라인
+# ===========================
+FUN_THRESHOLD = 4           # overall_score 4 미만이면 재시도
+ALLOWED_VERDICTS = {"pass"} # pass가 아니면 재시도
 
-# timeline 체인
-timeline_chain = timeline_inputs | timeline_prompt | timeline_llm
 
+def finalize(outs: dict) -> dict:
+    analysis = outs["analysis"]
+    duration = outs["duration"]
+
+    # 1) 기본 보정
+    tl = ensure_timeline_constraints(outs["timeline_raw"], analysis, duration)
+
+    # 2) 재미 평가 확인 후 재시도 필요하면 적용
+    fun_eval = outs["fun_eval"]
+    if fun_eval.overall_score < FUN_THRESHOLD or fun_eval.verdict not in ALLOWED_VERDICTS:
+        tl = punch_up_timeline(
+            tl=tl,
+            storyline=outs["storyline"],
+            story_idea=outs["story_idea"],
+            analysis_json=analysis,
+            duration=duration,
+            eval_result=fun_eval,
+            llm=base_llm,
+        )
 
+    # 3) 길이/타입 최종 보정
+    tl = adjust_timeline_length(
+        tl=ensure_timeline_constraints(tl, analysis, duration),
+        analysis_json=analysis,
+        duration=duration,
+        storyline=outs["storyline"],
+        llm=base_llm,
+        story_idea=outs["story_idea"],
+    )
+
+    # 4) 대사 자막은 Whisper 단어 타임스탬프로 (captions=False면 LLM 자막 그대로)
+    if outs.get("captions", True):
+        tl = apply_captions(tl, analysis)
+
+    return {
+        "scenes": outs["scenes"],
+        "story_idea": outs["story_idea"],
+        "storyline": outs["storyline"],
+        "fun_evaluation": fun_eval,
+        "timeline": tl,
+    }
 
 
-# fun evalutation chain: storyline + timeline를 입력으로 받아 평가
-fun_chain = (RunnableParallel(
-    storyline_json = storyline_chain | RunnableLambda(lambda out: to_json(out)),
-    timeline_json  = timeline_chain  | RunnableLambda(lambda out: to_json(out)),
-) | fun_prompt | fun_llm)
+overall = stages | RunnableLambda(finalize)
 
 
-# ===========================
-# 전체 파이프라인
-# ===========================
-FUN_THRESHOLD = 4           # overall_score 4 미만이면 재시도
-ALLOWED_VERDICTS = {"pass"} # pass가 아니면 재시도
+# ---------------------------
+# LLM 호출 집계 (단계별 호출 수 확인용)
+# ---------------------------
+class LLMCallCounter(BaseCallbackHandler):
+    """
+    invoke(..., config={"callbacks": [counter]})로 넘기면
+    stage 태그별 LLM 호출 수(counts)와 호출 순서(trace)를 기록
+    """
 
-overall = RunnableParallel(
-    scenes       = scenes_chain,
-    story_idea   = story_chain,
-    storyline    = storyline_chain,
-    timeline_raw = timeline_chain,
-    fun_eval     = fun_chain,  # 평가 결과를 병렬로
-    _analysis    = RunnableLambda(lambda inp: inp["analysis_json"]),
-    _duration    = RunnableLambda(lambda inp: int(inp["duration"])),
-) | RunnableLambda(
-    lambda outs: (lambda _outs=outs: (
-        # 1) 기본 보정
-        (lambda _tl:
-            # 재미 평가 확인 후 재시도 필요하면 적용
-            (lambda _maybe_punched:
-                # 3) 길이/타입 최종 보정
-                {
-                    "scenes": _outs["scenes"],
-                    "story_idea": _outs["story_idea"],
-                    "storyline": _outs["storyline"],
-                    "fun_evaluation": _outs["fun_eval"],
-                    "timeline": adjust_timeline_length(
-                        tl = ensure_timeline_constraints(_maybe_punched,
-                              _outs["_analysis"] if isinstance(_outs["_analysis"], dict) else json.loads(_outs["_analysis"]),
-                              _outs["_duration"]),
-                        analysis_json = _outs["_analysis"] if isinstance(_outs["_analysis"], dict) else json.loads(_outs["_analysis"]),
-                        duration = _outs["_duration"],
-                        storyline = _outs["storyline"],
-                        llm = base_llm
-                    )
-                }
-            )(
-                punch_up_timeline(
-                    tl=_tl,
-                    storyline=_outs["storyline"],
-                    story_idea=_outs["story_idea"],
-                    analysis_json=_outs["_analysis"] if isinstance(_outs["_analysis"], dict) else json.loads(_outs["_analysis"]),
-                    duration=_outs["_duration"],
-                    eval_result=_outs["fun_eval"],
-                    llm=base_llm
-                ) if (
-                    _outs["fun_eval"].overall_score < FUN_THRESHOLD or
-                    _outs["fun_eval"].verdict not in ALLOWED_VERDICTS
-                ) else _tl
-            )
-        )(
-            ensure_timeline_constraints(
-                _outs["timeline_raw"],
-                _outs["_analysis"] if isinstance(_outs["_analysis"], dict) else json.loads(_outs["_analysis"]),
-                _outs["_duration"]
-            )
-        )
-    ))()
-)
+    def __init__(self):
+        self.counts = defaultdict(int)
+        self.trace = []
+        self._lock = threading.Lock()
 
+    def on_chat_model_start(self, serialized, messages, *, run_id, tags=None, **kwargs):
+        stage = next((t.split(":", 1)[1] for t in (tags or []) if t.startswith("stage:")), "other")
+        with self._lock:
+            self.counts[stage] += 1
+            self.trace.append(stage)
 
 
 # ---------------------------
@@ -553,7 +657,10 @@ if __name__ == "__main__":
         "instruction": "밝고 감동적인 학과 소개 쇼츠로 만들어줘. 메시지는 '한국 폴리텍대학 AI융합소프트웨어과 홍보 영상'."
 
     }
-    result = overall.invoke(payload)
+    counter = LLMCallCounter()
+    # LLM_CACHE_BYPASS=1 이면 캐시를 읽지 않고 새로 호출
+    with llm_cache.bypass() if os.environ.get("LLM_CACHE_BYPASS") == "1" else nullcontext():
+        result = overall.invoke(payload, config={"callbacks": [counter]})
 
     print("\n=== Scenes ===")
     print(scenes_to_json(result["scenes"]))
@@ -565,5 +672,9 @@ if __name__ == "__main__":
     print(to_json(result["timeline"]))
     print("\n=== Fun Evaluation ===")
 
-    print(to_json(result["fun_evaluation"]))    
+    print(to_json(result["fun_evaluation"]))
+    print("\n=== LLM Calls (stage별) ===")
+    print(dict(counter.counts))
+    print("\n=== LLM Cache ===")
+    print(llm_cache.stats())
 
@@ -0,0 +1,131 @@
+import os, json, time, hashlib, sqlite3, threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+from langchain_core.caches import BaseCache, RETURN_VAL_TYPE
+from langchain_core.messages import message_to_dict, messages_from_dict
+from langchain_core.outputs import ChatGeneration, Generation
+
+
+# 이번 실행에서 캐시 조회를 건너뛸지 (결과는 새로 저장)
+_bypass: ContextVar[bool] = ContextVar("llm_cache_bypass", default=False)
+
+
+def _jsonable(value):
+    # with_structured_output(json_schema)은 additional_kwargs["parsed"]에 Pydantic 객체를 넣음
+    if hasattr(value, "model_dump"):
+        return value.model_dump()
+    if isinstance(value, dict):
+        return {k: _jsonable(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_jsonable(v) for v in value]
+    return value
+
+
+class SQLiteLLMCache(BaseCache):
+    """
+    LLM 응답 디스크 캐시 (SQLite)
+    - 키: sha256(llm_string + 렌더링된 프롬프트)
+      llm_string = 모델명/temperature/바인딩 인자(structured output 스키마 포함)
+      렌더링된 프롬프트 = 프롬프트 템플릿 + 입력값
+    - 히트 시 저장된 메시지를 돌려주고, 뒤의 structured output 파서가 Pydantic 객체로 다시 검증
+    - ttl_sec 지난 항목은 무시/삭제, max_entries 넘으면 오래 안 쓴 순서로 삭제
+    """
+
+    def __init__(self, path: str = ".llm_cache.sqlite", ttl_sec: Optional[float] = 7 * 24 * 3600,
+                 max_entries: int = 5000):
+        self.path = path
+        self.ttl_sec = ttl_sec
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache ("
+                " key TEXT PRIMARY KEY, value TEXT NOT NULL,"
+                " created REAL NOT NULL, last_used REAL NOT NULL)"
+            )
+
+    @staticmethod
+    def _key(prompt: str, llm_string: str) -> str:
+        return hashlib.sha256(f"{llm_string}\n{prompt}".encode("utf-8")).hexdigest()
+
+    def _expired(self, created: float, now: float) -> bool:
+        return self.ttl_sec is not None and now - created > self.ttl_sec
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[RETURN_VAL_TYPE]:
+        if _bypass.get():
+            return None
+
+        key = self._key(prompt, llm_string)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT value, created FROM llm_cache WHERE key = ?", (key,)).fetchone()
+            if row is None or self._expired(row[1], now):
+                self.misses += 1
+                return None
+            self.hits += 1
+            with self._conn:
+                self._conn.execute("UPDATE llm_cache SET last_used = ? WHERE key = ?", (now, key))
+
+        generations = []
+        for g in json.loads(row[0]):
+            if "message" in g:
+                message = messages_from_dict([g["message"]])[0]
+                generations.append(ChatGeneration(message=message, generation_info=g.get("generation_info")))
+            else:
+                generations.append(Generation(text=g["text"], generation_info=g.get("generation_info")))
+        return generations
+
+    def update(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        items = []
+        for g in return_val:
+            if isinstance(g, ChatGeneration):
+                message = g.message.model_copy(update={"additional_kwargs": _jsonable(g.message.additional_kwargs)})
+                items.append({"message": message_to_dict(message), "generation_info": _jsonable(g.generation_info)})
+            else:
+                items.append({"text": g.text, "generation_info": _jsonable(g.generation_info)})
+
+        key = self._key(prompt, llm_string)
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, created, last_used) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(items, ensure_ascii=False), now, now),
+            )
+            self._evict(now)
+
+    def _evict(self, now: float) -> None:
+        if self.ttl_sec is not None:
+            self._conn.execute("DELETE FROM llm_cache WHERE created < ?", (now - self.ttl_sec,))
+        self._conn.execute(
+            "DELETE FROM llm_cache WHERE key IN ("
+            " SELECT key FROM llm_cache ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        )
+
+    def clear(self, **kwargs) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM llm_cache")
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 3) if total else 0.0,
+                "entries": entries,
+            }
+
+    @contextmanager
+    def bypass(self):
+        # with llm_cache.bypass(): overall.invoke(...) -> 조회 없이 새로 호출하고 결과로 캐시 갱신
+        token = _bypass.set(True)
+        try:
+            yield
+        finally:
+            _bypass.reset(token)
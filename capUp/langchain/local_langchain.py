@@ -1,28 +1,90 @@
-import os, json
+import os, json, time
 from langchain_story import scenes_chain, story_chain, storyline_chain, timeline_chain, fun_chain
-from langchain_story import scenes_to_json, to_json, ensure_timeline_constraints, split_duration
+from langchain_story import scenes_to_json, to_json, ensure_timeline_constraints, split_duration, LLMCallCounter
+from langchain_story import llm_cache, apply_captions
+from projection import project_analysis, DEFAULT_TOKEN_BUDGET
+from async_pipeline import is_retryable, backoff_delay
+from timeline_stream import TimelineStream
+from contextlib import nullcontext
 
-def safe_invoke(chain, payload, max_retry=2):
-    for attempt in range(max_retry):
+def safe_invoke(chain, payload, max_retry=2, config=None):
+    # 일시적인 오류만 백오프 후 재시도 (async_pipeline과 같은 기준), 마지막 시도가 실패하면 기다리지 않고 바로 예외
+    attempts = max(1, max_retry)
+    for attempt in range(attempts):
         try:
-            return chain.invoke(payload)
+            return chain.invoke(payload, config=config)
         except Exception as e:
-            print(f"[Retry {attempt+1}] JSON 파싱 실패: {e}")
-    raise RuntimeError("LLM 호출 실패 (최대 재시도 초과)")
+            if not is_retryable(e):
+                raise
+            if attempt == attempts - 1:
+                raise RuntimeError(f"LLM 호출 실패 (최대 재시도 초과): {type(e).__name__}: {e}") from e
+            delay = backoff_delay(attempt, e)
+            print(f"[Retry {attempt+1}] {type(e).__name__}: {e} - {delay:.1f}s 후 재시도")
+            time.sleep(delay)
 
-def run_pipeline(analysis_json: dict, duration: int = 30):
-    scenes = safe_invoke(scenes_chain, {"analysis_json": json.dumps(analysis_json, ensure_ascii=False)})
+def safe_stream_timeline(payload, analysis_json, duration, config=None, on_item=None, on_replace=None,
+                         finalize=None, max_retry=2):
+    # TimelineStream + safe_invoke와 같은 재시도 기준
+    # 앞 시도에서 이미 항목을 내보냈으면 다시 시도할 때는 항목을 다시 내보내지 않고 끝에 on_replace(최종 결과)로 대체
+    attempts = max(1, max_retry)
+    emitted = False
+    for attempt in range(attempts):
+        stream = TimelineStream(payload, analysis_json, duration, config=config,
+                                on_item=None if emitted else on_item, on_replace=None if emitted else on_replace,
+                                finalize=finalize)
+        try:
+            timeline = stream.run()
+        except Exception as e:
+            emitted = emitted or stream.first_item_sec is not None
+            if not is_retryable(e):
+                raise
+            if attempt == attempts - 1:
+                raise RuntimeError(f"LLM 호출 실패 (최대 재시도 초과): {type(e).__name__}: {e}") from e
+            delay = backoff_delay(attempt, e)
+            print(f"[Retry {attempt+1}] timeline stream {type(e).__name__}: {e} - {delay:.1f}s 후 재시도")
+            time.sleep(delay)
+            continue
+        if emitted and on_replace is not None:
+            on_replace(timeline.model_copy(deep=True))
+        return timeline
+
+def run_pipeline(analysis_json: dict, duration: int = 30, config=None, token_budget=DEFAULT_TOKEN_BUDGET,
+                 on_timeline_item=None, on_timeline_replace=None, captions=True):
+    # 단계마다 앞 단계 결과를 넘겨 LLM은 단계별로 한 번만 호출
+    # 프롬프트에는 축약한 analysis_json 사용 (projection.py)
+    # on_timeline_item을 주면 타임라인을 스트리밍으로 받아 확정된 TimelineItem(복사본)마다 호출 (timeline_stream.py)
+    # 마지막 보정으로 내보낸 항목과 달라지면 on_timeline_replace(최종 TimelineOutput)를 한 번 호출
+    # captions=True면 대사 자막은 Whisper 단어 타임스탬프로 다시 만듦 (captions.py)
+    analysis_str = project_analysis(analysis_json, token_budget)
+
+    scenes = safe_invoke(scenes_chain, {"analysis_json": analysis_str}, config=config)
     scenes_json = scenes_to_json(scenes)
 
     split = split_duration(duration)
-    story_idea = safe_invoke(story_chain, {"analysis_json": analysis_json, "duration": duration, **split})
+    story_idea = safe_invoke(story_chain, {"scenes_json": scenes_json, "duration": duration, **split}, config=config)
     story_idea_json = to_json(story_idea)
 
-    storyline = safe_invoke(storyline_chain, {"analysis_json": analysis_json, "duration": duration})
-    timeline = safe_invoke(timeline_chain, {"analysis_json": analysis_json, "duration": duration})
-    timeline = ensure_timeline_constraints(timeline, analysis_json, duration)
+    storyline = safe_invoke(storyline_chain, {"scenes_json": scenes_json, "story_idea_json": story_idea_json}, config=config)
+    storyline_json = to_json(storyline)
+
+    timeline_payload = {
+        "analysis_json": analysis_str,
+        "storyline_json": storyline_json,
+        "duration": duration,
+        "image_ratio": 0.3,
+        "video_ratio": 0.7,
+    }
+    finalize = (lambda tl: apply_captions(tl, analysis_json)) if captions else None
+    if on_timeline_item is not None:
+        timeline = safe_stream_timeline(timeline_payload, analysis_json, duration, config=config,
+                                        on_item=on_timeline_item, on_replace=on_timeline_replace, finalize=finalize)
+    else:
+        timeline = safe_invoke(timeline_chain, timeline_payload, config=config)
+        timeline = ensure_timeline_constraints(timeline, analysis_json, duration)
+        if finalize is not None:
+            timeline = finalize(timeline)
 
-    fun_eval = safe_invoke(fun_chain, {"analysis_json": analysis_json, "duration": duration})
+    fun_eval = safe_invoke(fun_chain, {"storyline_json": storyline_json, "timeline_json": to_json(timeline)}, config=config)
 
     return {"scenes": scenes, "story_idea": story_idea, "storyline": storyline, "timeline": timeline, "fun_eval": fun_eval}
 
@@ -32,7 +94,10 @@ if __name__ == "__main__":
         analysis_json = json.load(f)
 
 
-    result = run_pipeline(analysis_json, duration=30)
+    counter = LLMCallCounter()
+    # LLM_CACHE_BYPASS=1 이면 캐시를 읽지 않고 새로 호출
+    with llm_cache.bypass() if os.environ.get("LLM_CACHE_BYPASS") == "1" else nullcontext():
+        result = run_pipeline(analysis_json, duration=30, config={"callbacks": [counter]})
 
     print("\n=== Scenes ===")
     print(scenes_to_json(result["scenes"]))
@@ -44,3 +109,7 @@ if __name__ == "__main__":
     print(to_json(result["timeline"]))
     print("\n=== Fun Evaluation ===")
     print(to_json(result["fun_eval"]))
+    print("\n=== LLM Calls (stage별) ===")
+    print(dict(counter.counts))
+    print("\n=== LLM Cache ===")
+    print(llm_cache.stats())
@@ -0,0 +1,206 @@
+import json, re
+from typing import Dict, List, Optional
+
+# ---------------------------
+# analysis_json 축약 (프롬프트 토큰 절감)
+# ---------------------------
+# parse_video_result 결과(shots/speech/segment_labels/frame_labels/objects)나
+# 그걸 묶은 analysis_json을 LLM에 넣기 전에 줄인다.
+# - 같은 라벨의 겹치는/인접 구간 병합, frame_labels는 시각 -> 구간으로 묶음
+# - 신뢰도 낮은 라벨/객체 제거, 객체 프레임 샘플(bbox) 제거
+# - Whisper 단어 타임스탬프 -> 문장 구간
+# - token_budget을 넘으면 신뢰도 기준을 올리고 목록을 잘라가며 맞춤
+
+DEFAULT_TOKEN_BUDGET = 3000
+MIN_CONFIDENCE = 0.5
+LABEL_GAP_SEC = 1.0         # 이 간격 이하로 떨어진 같은 라벨 구간은 병합
+SENTENCE_GAP_SEC = 0.8      # 단어 사이가 이만큼 비면 문장 분리
+_SENTENCE_END = re.compile(r"[.!?。？！…]$")
+
+try:
+    import tiktoken
+    _enc = tiktoken.get_encoding("o200k_base")     # gpt-4o 토크나이저
+except Exception:
+    _enc = None
+
+
+def count_tokens(text: str) -> int:
+    if _enc is not None:
+        return len(_enc.encode(text))
+    return max(1, len(text) // 3)   # tiktoken이 없으면 대략치
+
+
+def dumps_compact(obj) -> str:
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+
+
+def _conf(item: dict) -> float:
+    c = item.get("confidence", item.get("score"))
+    return 1.0 if c is None else float(c)
+
+
+def merge_intervals(items: List[dict], min_conf: float = MIN_CONFIDENCE, gap: float = LABEL_GAP_SEC) -> List[dict]:
+    """
+    [{description, confidence, start, end}] 또는 [{description, confidence, time}]
+    -> 라벨별로 겹치거나 gap 이내로 붙은 구간을 합친 [{label, start, end, conf}]
+    """
+    by_label: Dict[str, List[list]] = {}
+    for it in items:
+        if _conf(it) < min_conf:
+            continue
+        st = it.get("start", it.get("time"))
+        et = it.get("end", st)
+        if st is None:
+            continue
+        by_label.setdefault(it.get("description", ""), []).append([float(st), float(et), _conf(it)])
+
+    merged = []
+    for label, spans in by_label.items():
+        spans.sort()
+        cur = spans[0]
+        for s in spans[1:]:
+            if s[0] <= cur[1] + gap:
+                cur[1] = max(cur[1], s[1])
+                cur[2] = max(cur[2], s[2])
+            else:
+                merged.append({"label": label, "start": round(cur[0], 1), "end": round(cur[1], 1), "conf": round(cur[2], 2)})
+                cur = s
+        merged.append({"label": label, "start": round(cur[0], 1), "end": round(cur[1], 1), "conf": round(cur[2], 2)})
+
+    merged.sort(key=lambda m: (m["start"], -m["conf"]))
+    return merged
+
+
+def words_to_sentences(words: List[dict], gap: float = SENTENCE_GAP_SEC) -> List[dict]:
+    # Whisper 단어 목록 -> [{start, end, text}] 문장 구간
+    sentences = []
+    cur: List[dict] = []
+
+    def _flush():
+        if cur:
+            text = "".join(w["word"] for w in cur).strip()
+            if text:
+                sentences.append({"start": round(cur[0]["start"] or 0.0, 1),
+                                  "end": round(cur[-1]["end"] or cur[-1]["start"] or 0.0, 1),
+                                  "text": text})
+        cur.clear()
+
+    for w in words:
+        if cur and w.get("start") is not None and cur[-1].get("end") is not None \
+                and w["start"] - cur[-1]["end"] > gap:
+            _flush()
+        cur.append(w)
+        if _SENTENCE_END.search(w["word"].strip()):
+            _flush()
+    _flush()
+    return sentences
+
+
+def _speech_sentences(speech: List[dict]) -> List[dict]:
+    # speechTranscriptions 형태 -> 문장 구간 (단어 타임스탬프가 없으면 전체 transcript 한 줄)
+    sentences = []
+    for tr in speech or []:
+        for alt in tr.get("alternatives", []):
+            if alt.get("words"):
+                sentences.extend(words_to_sentences(alt["words"]))
+            elif alt.get("transcript"):
+                sentences.append({"text": alt["transcript"]})
+    return sentences
+
+
+def _project_video(parsed: dict, min_conf: float) -> dict:
+    out = {}
+    if parsed.get("shots"):
+        out["shots"] = [[s["start"], s["end"]] for s in parsed["shots"]]
+    if parsed.get("speech"):
+        out["speech"] = _speech_sentences(parsed["speech"])
+    labels = list(parsed.get("segment_labels", [])) + list(parsed.get("frame_labels", []))
+    if labels:
+        out["labels"] = merge_intervals(labels, min_conf)
+    if parsed.get("objects"):
+        objs = [{"description": o["description"], "confidence": o.get("confidence"),
+                 "start": o["segment"]["start"], "end": o["segment"]["end"]}
+                for o in parsed["objects"] if o.get("segment")]
+        out["objects"] = merge_intervals(objs, min_conf)
+    for key in ("faces", "logos"):
+        if parsed.get(key):
+            out[key] = parsed[key]
+    return out
+
+
+_VIDEO_KEYS = {"shots", "speech", "segment_labels", "frame_labels", "objects"}
+
+
+def _is_video_result(obj: dict) -> bool:
+    # 요약본(labels/objects가 문자열 목록, speech가 문자열)은 그대로 두고
+    # parse_video_result 원본(각 항목이 dict인 목록)만 축약 대상
+    keys = _VIDEO_KEYS & obj.keys()
+    return bool(keys) and all(
+        isinstance(obj[k], list) and all(isinstance(v, dict) for v in obj[k]) for k in keys
+    )
+
+
+def _project(obj, min_conf: float):
+    # parse_video_result 모양이면 축약, dict/list는 재귀, 나머지는 그대로
+    if isinstance(obj, dict):
+        if _is_video_result(obj):
+            rest = {k: _project(v, min_conf) for k, v in obj.items() if k not in _VIDEO_KEYS | {"faces", "logos"}}
+            return {**rest, **_project_video(obj, min_conf)}
+        return {k: _project(v, min_conf) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [_project(v, min_conf) for v in obj]
+    return obj
+
+
+def _longest(obj) -> int:
+    if isinstance(obj, dict):
+        return max((_longest(v) for v in obj.values()), default=0)
+    if isinstance(obj, list):
+        return max([len(obj)] + [_longest(v) for v in obj])
+    return 0
+
+
+def _spread(items: list, keep: int) -> list:
+    # 처음~끝에서 고르게 keep개 (앞쪽 keep개만 남기면 영상 뒷부분이 통째로 빠짐)
+    n = len(items)
+    if keep == 1:
+        return [items[n // 2]]
+    return [items[round(i * (n - 1) / (keep - 1))] for i in range(keep)]
+
+
+def _trim(obj, keep: int):
+    # 목록 길이 제한 (신뢰도 높은 것 우선, 신뢰도가 없으면 시간 순서대로 고르게) - 예산 맞추기용
+    if isinstance(obj, dict):
+        return {k: _trim(v, keep) for k, v in obj.items()}
+    if isinstance(obj, list):
+        items = [_trim(v, keep) for v in obj]
+        if len(items) > keep and all(isinstance(v, dict) and "conf" in v for v in items):
+            items = sorted(sorted(items, key=lambda v: -v["conf"])[:keep], key=lambda v: v.get("start", 0))
+        elif len(items) > keep:
+            items = _spread(items, keep)
+        return items
+    return obj
+
+
+def project_analysis(analysis_json, token_budget: Optional[int] = DEFAULT_TOKEN_BUDGET) -> str:
+    """
+    analysis_json(dict 또는 JSON 문자열) -> 프롬프트용 축약 JSON 문자열
+    token_budget=None이면 축약만 하고 예산 맞추기는 생략
+    """
+    analysis = json.loads(analysis_json) if isinstance(analysis_json, str) else analysis_json
+
+    # 1) 신뢰도 기준을 올려가며 예산 안으로
+    for min_conf in (MIN_CONFIDENCE, 0.6, 0.7, 0.8, 0.9):
+        projected = _project(analysis, min_conf)
+        text = dumps_compact(projected)
+        if token_budget is None or count_tokens(text) <= token_budget:
+            return text
+
+    # 2) 그래도 넘으면 가장 긴 목록 길이부터 절반씩 줄여가며
+    keep = _longest(projected) // 2
+    while keep >= 1:
+        text = dumps_compact(_trim(projected, keep))
+        if count_tokens(text) <= token_budget:
+            return text
+        keep //= 2
+    return text
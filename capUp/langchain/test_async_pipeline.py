@@ -0,0 +1,181 @@
+# test_async_pipeline.py
+# 가짜 모델(FakeListChatModel)로 재시도/한도 대기 확인 - OpenAI 호출 없음
+# 실행: python -m pytest -q test_async_pipeline.py
+import asyncio
+import functools
+import json
+import os
+import tempfile
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "test")
+os.environ.setdefault("LLM_CACHE_PATH", os.path.join(tempfile.gettempdir(), "capup_test_llm_cache.sqlite"))
+
+import pytest
+from langchain_core.exceptions import OutputParserException
+from langchain_core.language_models import FakeListChatModel
+from langchain_core.output_parsers import PydanticOutputParser
+from langchain_core.runnables import RunnableLambda
+
+import async_pipeline
+import local_langchain
+from async_pipeline import RateLimiter, arun_many, arun_pipeline
+from langchain_story import FunEvaluation, ScenesOutput, StoryIdeaOutput, StorylineOutput, TimelineOutput
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+_dim = {"score": 4, "reason": "r", "suggestions": ["s"]}
+RESPONSES = {
+    "scenes": {"scenes": [{"scene_id": 1, "summary": "인터뷰", "highlight": "첫 마디"}]},
+    "story_idea": {"tone": "밝음", "opening": "o", "development": "d", "closing": "c", "key_message": "k",
+                   "opening_sec": 6, "development_sec": 18, "closing_sec": 6, "target_subjects": ["팀"],
+                   "image_ratio": 0.3, "video_ratio": 0.7},
+    "storyline": {"story_summary": "요약", "story_flow": ["a", "b", "c"]},
+    "timeline": {"story_summary": "요약", "timeline": [
+        {"type": "video", "filename": "interview_day1.mp4", "start": 0, "end": 10},
+        {"type": "subtitle", "text": "안녕하세요", "start": 0, "end": 3},
+        {"type": "video", "filename": "office_broll.mp4", "start": 10, "end": 20},
+        {"type": "image", "filename": "logo.png", "start": 20, "end": 30},
+    ]},
+    "fun_eval": {"overall_score": 4, "verdict": "pass", "hook_strength": _dim, "pacing": _dim, "novelty": _dim,
+                 "clarity": _dim, "emotional_impact": _dim, "cta_effectiveness": _dim, "visual_variety": _dim,
+                 "sound_alignment": _dim, "weak_spots": [], "top_actions": ["a", "b", "c"]},
+}
+SCHEMAS = {"scenes": ScenesOutput, "story_idea": StoryIdeaOutput, "storyline": StorylineOutput,
+           "timeline": TimelineOutput, "fun_eval": FunEvaluation}
+
+
+def _fake_chain(stage: str, bad: int = 0):
+    # 처음 bad번은 JSON이 아닌 응답 -> OutputParserException (재시도 대상)
+    responses = ["not json"] * bad + [json.dumps(RESPONSES[stage], ensure_ascii=False)]
+    model = FakeListChatModel(responses=responses)
+    return model, async_pipeline.STAGES[stage][1] | model | PydanticOutputParser(pydantic_object=SCHEMAS[stage])
+
+
+@pytest.fixture
+def analysis_json():
+    with open(os.path.join(HERE, "analysis.json"), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+@pytest.fixture
+def fake_stages(monkeypatch):
+    # 단계별 체인을 가짜 모델로 교체, 백오프는 0초
+    def install(bad=None):
+        bad = bad or {}
+        models = {}
+        stages = {}
+        for stage, (_, prompt, output_tokens) in async_pipeline.STAGES.items():
+            models[stage], chain = _fake_chain(stage, bad.get(stage, 0))
+            stages[stage] = (chain, prompt, output_tokens)
+        monkeypatch.setattr(async_pipeline, "STAGES", stages)
+        monkeypatch.setattr(async_pipeline, "backoff_delay", lambda attempt, e=None: 0.0)
+        return models
+    return install
+
+
+def test_rate_limiter_rpm_waits_for_window():
+    limiter = RateLimiter(rpm=2, tpm=None, window=0.2)
+
+    async def run():
+        return [await limiter.acquire(10) for _ in range(3)]
+
+    t0 = time.monotonic()
+    waits = asyncio.run(run())
+    assert waits[:2] == [0.0, 0.0]
+    assert waits[2] > 0
+    assert time.monotonic() - t0 >= 0.15
+
+
+def test_rate_limiter_tpm_budget():
+    limiter = RateLimiter(rpm=None, tpm=100, window=0.2)
+
+    async def run():
+        return [await limiter.acquire(t) for t in (60, 30, 30)]
+
+    waits = asyncio.run(run())
+    assert waits[:2] == [0.0, 0.0]
+    assert waits[2] > 0     # 60 + 30 + 30 > 100 -> 첫 요청이 창 밖으로 나갈 때까지 대기
+    assert limiter._tokens <= 100
+
+
+def test_arun_pipeline_retries_parse_errors(fake_stages, analysis_json):
+    fake_stages({"scenes": 2, "timeline": 1})
+    stats = async_pipeline.PipelineStats()
+    out = asyncio.run(arun_pipeline(analysis_json, 30, RateLimiter(None, None), stats))
+
+    assert out["timeline"].timeline
+    summary = stats.summary()
+    assert summary["scenes"]["retries"] == 2
+    assert summary["timeline"]["retries"] == 1
+    assert summary["story_idea"]["retries"] == 0
+    assert all(s["calls"] == 1 and s["errors"] == 0 for s in summary.values())
+
+
+def test_arun_pipeline_gives_up_after_max_retry(fake_stages, analysis_json):
+    fake_stages({"scenes": async_pipeline.MAX_RETRY + 1})
+    stats = async_pipeline.PipelineStats()
+    with pytest.raises(OutputParserException):
+        asyncio.run(arun_pipeline(analysis_json, 30, RateLimiter(None, None), stats))
+    assert stats.retries["scenes"] == async_pipeline.MAX_RETRY
+    assert stats.errors["scenes"] == 1
+
+
+def test_arun_many_throttles_with_shared_budget(fake_stages, analysis_json, monkeypatch):
+    fake_stages()
+    monkeypatch.setattr(async_pipeline, "RateLimiter", functools.partial(RateLimiter, window=0.2))
+    jobs = [{"analysis_json": analysis_json, "duration": 30}] * 2
+
+    # 작업 2개 x 5단계 = 10회 요청, RPM 4 -> 창(0.2초)을 두 번 이상 기다려야 함
+    t0 = time.monotonic()
+    results, stats = asyncio.run(arun_many(jobs, max_concurrency=2, rpm=4, tpm=None))
+    elapsed = time.monotonic() - t0
+
+    assert not any("error" in r for r in results)
+    summary = stats.summary()
+    assert sum(s["calls"] for s in summary.values()) == 10
+    assert sum(s["rate_wait_sec"] for s in summary.values()) > 0
+    assert elapsed >= 0.4
+
+
+def test_arun_many_reports_failed_jobs(fake_stages, analysis_json):
+    models = fake_stages()
+    models["storyline"].responses = ["not json"]
+    results, stats = asyncio.run(arun_many([{"analysis_json": analysis_json}], rpm=None, tpm=None))
+    assert results[0]["error"].startswith("OutputParserException")
+    assert stats.errors["storyline"] == 1
+    assert stats.retries["storyline"] == async_pipeline.MAX_RETRY
+
+
+def test_safe_invoke_no_sleep_after_last_attempt(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(local_langchain.time, "sleep", sleeps.append)
+    monkeypatch.setattr(local_langchain, "backoff_delay", lambda attempt, e=None: 0.5)
+    _, chain = _fake_chain("scenes", bad=5)
+
+    with pytest.raises(RuntimeError) as info:
+        local_langchain.safe_invoke(chain, {"analysis_json": "{}"}, max_retry=2)
+    assert isinstance(info.value.__cause__, OutputParserException)
+    assert sleeps == [0.5]      # 2번 시도, 사이에 한 번만 대기
+
+    _, chain = _fake_chain("scenes", bad=1)
+    assert local_langchain.safe_invoke(chain, {"analysis_json": "{}"}, max_retry=2).scenes[0].scene_id == 1
+
+
+def test_arun_pipeline_retries_validation_errors(fake_stages, analysis_json, monkeypatch):
+    # 구조화 출력의 스키마 검증 실패(pydantic.ValidationError)도 재시도 대상
+    fake_stages()
+    chain, prompt, output_tokens = async_pipeline.STAGES["story_idea"]
+    calls = []
+
+    def _flaky(payload):
+        calls.append(1)
+        if len(calls) == 1:
+            StoryIdeaOutput.model_validate({"tone": "밝음"})
+        return chain.invoke(payload)
+
+    monkeypatch.setitem(async_pipeline.STAGES, "story_idea", (RunnableLambda(_flaky), prompt, output_tokens))
+    stats = async_pipeline.PipelineStats()
+    asyncio.run(arun_pipeline(analysis_json, 30, RateLimiter(None, None), stats))
+    assert len(calls) == 2
+    assert stats.retries["story_idea"] == 1
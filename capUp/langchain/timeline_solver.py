@@ -0,0 +1,274 @@
+from typing import Dict, List, Optional, Tuple
+
+# ---------------------------
+# 로컬 타임라인 솔버 (LLM 없이 길이/비율 보정)
+# ---------------------------
+# 타임라인 항목(dict, TimelineItem.model_dump() 형태)을 받아
+# - video/image 컷을 opening/development/closing 구간 예산에 맞게 순서대로 다시 배치
+# - video 컷은 3~7초, 이미지/영상 비율(image_ratio/video_ratio)에 가깝게
+# - 모자라면 분석 JSON의 샷(segments / shots)과 이미지로 채우고, 넘치면 줄이거나 뺌
+# - 새로 넣은 video 컷에 대사(speech)가 있으면 그대로 자막으로
+# 자막 텍스트를 새로 써야 하는 구간(오프닝 훅, 클로징 CTA)은 report["missing_subtitles"]로 알려주고
+# 텍스트 생성은 호출하는 쪽(LLM)에 맡긴다.
+# video 항목의 source_start는 원본 영상에서 잘라 올 시작 시각 (없으면 start와 같다고 봄)
+# video 컷은 원본 샷(세그먼트) 끝을 넘겨 늘리지 않음 (다음 샷이 섞여 들어가지 않도록)
+
+VIDEO_MIN_SEC = 3.0
+VIDEO_MAX_SEC = 7.0
+IMAGE_MIN_SEC = 1.5
+IMAGE_MAX_SEC = 5.0
+IMAGE_DEFAULT_SEC = 3.0
+CHUNK_SEC = 5.0             # 샷 정보가 없는 영상은 이 길이로 나눠 후보로 사용
+HOOK_SEC = 3.0              # 오프닝 훅 자막 길이
+CTA_SEC = 2.0               # 클로징 CTA 자막 길이
+EPS = 0.05
+
+SECTIONS = ("opening", "development", "closing")
+
+
+def shot_candidates(analysis_json: dict) -> Tuple[List[dict], Dict[str, float]]:
+    # [{filename, start, end, speech, chunk}] (원본 영상 기준 시각), {filename: 영상 길이}
+    # chunk=True는 샷 정보가 없어 고정 길이로 나눈 후보 (실제 샷 경계가 아님)
+    durations = {v["filename"]: v.get("duration") for v in analysis_json.get("videos", []) if v.get("filename")}
+    cands = []
+    for seg in analysis_json.get("segments", []):
+        if seg.get("source") and seg.get("start") is not None and seg.get("end") is not None:
+            cands.append({"filename": seg["source"], "start": float(seg["start"]), "end": float(seg["end"]),
+                          "speech": seg.get("speech") or "", "chunk": False})
+
+    for v in analysis_json.get("videos", []):
+        parsed = v.get("analysis") if isinstance(v.get("analysis"), dict) else v
+        for s in parsed.get("shots") or parsed.get("shotAnnotations") or []:
+            if isinstance(s, dict) and v.get("filename"):
+                cands.append({"filename": v["filename"], "start": float(s["start"]), "end": float(s["end"]), "speech": "",
+                              "chunk": False})
+
+    covered = {c["filename"] for c in cands}
+    for fn, dur in durations.items():
+        if fn not in covered and dur:
+            t = 0.0
+            while t + VIDEO_MIN_SEC <= dur:
+                cands.append({"filename": fn, "start": t, "end": min(dur, t + CHUNK_SEC), "speech": "", "chunk": True})
+                t += CHUNK_SEC
+    return cands, durations
+
+
+class _Cut:
+    __slots__ = ("type", "filename", "source_start", "length", "min", "max", "item", "added", "text")
+
+    def __init__(self, type_, filename, source_start, length, lo, hi, item=None, added=False, text=""):
+        self.type = type_
+        self.filename = filename
+        self.source_start = source_start
+        self.length = length
+        self.min = lo
+        self.max = hi
+        self.item = item        # 원래 항목 (유지된 컷이면)
+        self.added = added
+        self.text = text        # 새 video 컷의 대사
+
+
+def _segment_end(filename: str, source_start: float, cands: List[dict]) -> Optional[float]:
+    # source_start가 들어 있는 샷(세그먼트)의 끝 시각, 없으면 None
+    ends = [c["end"] for c in cands
+            if not c["chunk"] and c["filename"] == filename and c["start"] - EPS <= source_start < c["end"]]
+    return min(ends) if ends else None
+
+
+def _video_bounds(filename: str, source_start: float, durations: Dict[str, float],
+                  segment_end: Optional[float] = None, length: float = 0.0) -> Tuple[float, float]:
+    # segment_end가 있으면 그 이상 늘리지 않음 (원래 그보다 긴 컷(length)은 그 길이까지만 유지)
+    dur = durations.get(filename)
+    avail = VIDEO_MAX_SEC if not dur else max(0.0, dur - source_start)
+    if segment_end is not None:
+        avail = min(avail, max(segment_end - source_start, length))
+    hi = min(VIDEO_MAX_SEC, avail)
+    return min(VIDEO_MIN_SEC, hi), hi
+
+
+def _fit(cuts: List[_Cut], target: float) -> float:
+    # 컷 길이를 [min, max] 안에서 조정해 합을 target에 맞춤, 남은 차이(+: 모자람, -: 넘침) 반환
+    for _ in range(len(cuts) + 1):
+        residual = target - sum(c.length for c in cuts)
+        if abs(residual) <= EPS:
+            return 0.0
+        if residual > 0:
+            room = [(c, c.max - c.length) for c in cuts if c.max - c.length > EPS]
+        else:
+            room = [(c, c.length - c.min) for c in cuts if c.length - c.min > EPS]
+        total_room = sum(r for _, r in room)
+        if total_room <= EPS:
+            return residual
+        share = min(1.0, abs(residual) / total_room)
+        for c, r in room:
+            c.length += r * share if residual > 0 else -r * share
+    return target - sum(c.length for c in cuts)
+
+
+def solve_timeline(
+    items: List[dict],
+    analysis_json: dict,
+    duration: float,
+    sections: dict,                 # split_duration 결과 (opening_sec/development_sec/closing_sec)
+    image_ratio: float = 0.3,
+    video_ratio: float = 0.7,
+) -> Tuple[List[dict], dict]:
+    duration = float(duration)
+    bounds = []
+    t = 0.0
+    for name in SECTIONS:
+        sec = float(sections.get(f"{name}_sec", 0))
+        bounds.append((name, t, min(duration, t + sec)))
+        t += sec
+    # 반올림 등으로 합이 안 맞으면 closing이 나머지를 가짐
+    name, st, _ = bounds[-1]
+    bounds[-1] = (name, st, duration)
+
+    def _section_of(t: float) -> int:
+        for i, (_, st, et) in enumerate(bounds):
+            if t < et:
+                return i
+        return len(bounds) - 1
+
+    cands, durations = shot_candidates(analysis_json)
+    images = [im["filename"] for im in analysis_json.get("images", []) if im.get("filename")]
+    ratio_sum = (image_ratio + video_ratio) or 1.0
+    target_img = duration * image_ratio / ratio_sum
+    target_vid = duration - target_img
+
+    # 1) 기존 video/image 컷을 구간별로 나눔
+    visual = sorted((it for it in items if it.get("type") in ("video", "image")), key=lambda it: (it["start"], it["end"]))
+    section_cuts: List[List[_Cut]] = [[] for _ in bounds]
+    used = set()
+    for it in visual:
+        length = float(it["end"]) - float(it["start"])
+        if it["type"] == "video":
+            src = it.get("source_start")
+            src = float(it["start"]) if src is None else float(src)
+            fn = it.get("filename") or ""
+            lo, hi = _video_bounds(fn, src, durations, _segment_end(fn, src, cands), length)
+            cut = _Cut("video", it.get("filename"), src, min(max(length, lo), hi), lo, hi, item=it)
+            used.add((it.get("filename"), round(src, 1)))
+        else:
+            cut = _Cut("image", it.get("filename"), None, min(max(length, IMAGE_MIN_SEC), IMAGE_MAX_SEC),
+                       IMAGE_MIN_SEC, IMAGE_MAX_SEC, item=it)
+        section_cuts[_section_of(float(it["start"]))].append(cut)
+
+    def _type_sec(type_: str) -> float:
+        return sum(c.length for cuts in section_cuts for c in cuts if c.type == type_)
+
+    def _next_video(prev_file: Optional[str]) -> Optional[_Cut]:
+        # 안 쓴 샷 중에서 직전 컷과 다른 소스, 덜 쓴 소스 우선
+        counts: Dict[str, int] = {}
+        for cuts in section_cuts:
+            for c in cuts:
+                if c.type == "video":
+                    counts[c.filename] = counts.get(c.filename, 0) + 1
+        best = None
+        for i, c in enumerate(cands):
+            key = (c["filename"], round(c["start"], 1))
+            if key in used:
+                continue
+            rank = (c["filename"] == prev_file, counts.get(c["filename"], 0), i)
+            if best is None or rank < best[0]:
+                best = (rank, c)
+        if best is None:
+            return None
+        c = best[1]
+        used.add((c["filename"], round(c["start"], 1)))
+        lo, hi = _video_bounds(c["filename"], c["start"], durations, None if c["chunk"] else c["end"])
+        length = min(max(c["end"] - c["start"], lo), hi)
+        return _Cut("video", c["filename"], c["start"], length, lo, hi, added=True, text=c["speech"])
+
+    def _next_image(section: str) -> Optional[_Cut]:
+        if not images:
+            return None
+        used_imgs = {c.filename for cuts in section_cuts for c in cuts if c.type == "image"}
+        order = images[::-1] if section == "closing" else images   # 클로징은 뒤쪽(로고/단체사진) 우선
+        fn = next((f for f in order if f not in used_imgs), order[0])
+        return _Cut("image", fn, None, IMAGE_DEFAULT_SEC, IMAGE_MIN_SEC, IMAGE_MAX_SEC, added=True)
+
+    # 2) 구간별로 모자라면 채우고, 넘치면 줄이거나 뺌
+    report = {"added": 0, "dropped": 0, "unfilled_sec": 0.0, "missing_subtitles": []}
+    for i, (name, st, et) in enumerate(bounds):
+        cuts = section_cuts[i]
+        need = et - st
+        while need - sum(c.length for c in cuts) > EPS and sum(c.max for c in cuts) < need - EPS:
+            img_gap = target_img - _type_sec("image")
+            vid_gap = target_vid - _type_sec("video")
+            prefer_video = vid_gap + (1.0 if name == "development" else 0.0) >= img_gap + (0.0 if name == "development" else 1.0)
+            prev = cuts[-1].filename if cuts else None
+            cut = (_next_video(prev) or _next_image(name)) if prefer_video else (_next_image(name) or _next_video(prev))
+            if cut is None:
+                break
+            cuts.append(cut)
+            report["added"] += 1
+
+        residual = _fit(cuts, need)
+        while residual < -EPS and cuts:
+            # 넘침: 목표 비율보다 많은 쪽에서, 새로 넣은 컷 -> 뒤쪽 컷 순으로 뺌
+            over = "image" if _type_sec("image") - target_img > _type_sec("video") - target_vid else "video"
+            pool = [c for c in cuts if c.type == over] or cuts
+            victim = next((c for c in reversed(pool) if c.added), pool[-1])
+            cuts.remove(victim)
+            report["dropped"] += 1
+            residual = _fit(cuts, need)
+        if residual > EPS:
+            report["unfilled_sec"] += residual
+
+    # 3) 순서대로 붙여서 배치, 자막은 원래 컷을 따라 이동
+    out = []
+    subtitles = [dict(it) for it in items if it.get("type") == "subtitle" and it.get("text")]
+    moved = set()
+    t = 0.0
+    for cuts in section_cuts:
+        for c in cuts:
+            start, end = round(t, 2), round(t + c.length, 2)
+            t += c.length
+            item = dict(c.item) if c.item is not None else {"type": c.type, "filename": c.filename, "text": None,
+                                                            "position": None, "size": None}
+            if c.item is not None:
+                shift = start - float(c.item["start"])
+                old_st, old_et = float(c.item["start"]), float(c.item["end"])
+                for k, sub in enumerate(subtitles):
+                    if k not in moved and sub["start"] < old_et and sub["end"] > old_st:
+                        sub["start"], sub["end"] = sub["start"] + shift, sub["end"] + shift
+                        moved.add(k)
+            elif c.text:
+                subtitles.append({"type": "subtitle", "filename": None, "text": c.text,
+                                  "start": start, "end": end, "position": None, "size": None})
+                moved.add(len(subtitles) - 1)
+            item["start"], item["end"] = start, end
+            if c.type == "video":
+                item["source_start"] = round(c.source_start, 2)
+            out.append(item)
+
+    for sub in subtitles:
+        sub["start"] = round(max(0.0, sub["start"]), 2)
+        sub["end"] = round(min(duration, sub["end"]), 2)
+        if sub["end"] - sub["start"] > EPS:
+            out.append(sub)
+
+    # 4) 오디오는 전체 길이로, 없으면 분석 JSON의 첫 BGM
+    audio = [dict(it) for it in items if it.get("type") == "audio" and it.get("filename")]
+    if not audio and analysis_json.get("audio"):
+        audio = [{"type": "audio", "filename": analysis_json["audio"][0]["filename"], "text": None,
+                  "position": None, "size": None}]
+    for a in audio:
+        a["start"] = max(0.0, min(float(a.get("start", 0.0)), duration - 0.1))
+        a["end"] = duration
+        out.append(a)
+
+    # 5) 오프닝 훅 / 클로징 CTA 자막이 없으면 텍스트 생성 필요
+    subs = [it for it in out if it["type"] == "subtitle"]
+    for name, st, et in (bounds[0], bounds[-1]):
+        if et - st <= EPS or any(s["start"] < et and s["end"] > st for s in subs):
+            continue
+        if name == "opening":
+            report["missing_subtitles"].append({"section": name, "start": st, "end": round(min(et, st + HOOK_SEC), 2)})
+        else:
+            report["missing_subtitles"].append({"section": name, "start": round(max(st, et - CTA_SEC), 2), "end": et})
+
+    out.sort(key=lambda it: (it["start"], it["end"]))
+    report["unfilled_sec"] = round(report["unfilled_sec"], 2)
+    return out, report
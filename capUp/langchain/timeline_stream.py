@@ -0,0 +1,141 @@
+import json
+import time
+from typing import Callable, Iterator, List, Optional
+from pydantic import ValidationError
+
+from langchain_story import TimelineItem, TimelineOutput, timeline_stream_chain, ensure_timeline_constraints
+
+# ---------------------------
+# 타임라인 스트리밍 생성
+# ---------------------------
+# LLM이 timeline 배열을 쓰는 동안 완성된 TimelineItem부터 하나씩 검증/보정해서 내보낸다.
+# 부분 JSON에서 마지막 항목은 아직 쓰는 중일 수 있으므로, 다음 항목이 보이거나 스트림이 끝나야 확정.
+#   stream = TimelineStream(payload, analysis_json, duration, on_replace=reload)
+#   for item in stream:            # 렌더러 에셋 미리 로딩 등을 바로 시작
+#       preload(item)
+#   stream.result                  # ensure_timeline_constraints(+ finalize)까지 적용한 TimelineOutput
+# 내보낸 항목은 복사본 - 이후 보정이 이미 내보낸 객체를 바꾸지 않음.
+# 끝에서 보정(필수 image/audio 보강, 자막 교체 등)으로 내보낸 목록과 달라지면 on_replace(최종 TimelineOutput)를 한 번 호출
+
+VIDEO_MIN_SEC = 3.0
+VIDEO_MAX_SEC = 7.0
+
+
+class TimelineValidator:
+    """항목 단위 검증/보정 - video 3~7초, 전체 길이(total) 밖은 자르거나 버림"""
+
+    def __init__(self, total: float):
+        self.total = float(total)
+        self.items: List[TimelineItem] = []
+        self.dropped = 0
+
+    def feed(self, raw: dict) -> Optional[TimelineItem]:
+        # 프롬프트 기본값 규칙에 따라 빈 문자열은 None으로
+        raw = {k: (None if v == "" else v) for k, v in raw.items()}
+        try:
+            item = TimelineItem.model_validate(raw)
+        except ValidationError as e:
+            print(f"타임라인 항목 무시 (스키마 불일치): {raw} - {e.errors()[0]['msg']}")
+            self.dropped += 1
+            return None
+
+        if item.type == "video":
+            d = item.end - item.start
+            if d < VIDEO_MIN_SEC:
+                item.end = item.start + VIDEO_MIN_SEC
+            elif d > VIDEO_MAX_SEC:
+                item.end = item.start + VIDEO_MAX_SEC
+
+        if item.start >= self.total:
+            self.dropped += 1
+            return None
+        item.start = max(0.0, item.start)
+        item.end = min(item.end, self.total)
+        if item.end <= item.start:
+            self.dropped += 1
+            return None
+
+        self.items.append(item)
+        return item
+
+
+def _canonical(items: List[TimelineItem]) -> List[str]:
+    # 순서와 상관없이 비교하려고 항목별 JSON을 정렬
+    return sorted(json.dumps(it.model_dump(), sort_keys=True, ensure_ascii=False) for it in items)
+
+
+class TimelineStream:
+    """
+    timeline_stream_chain.stream 결과를 TimelineItem 단위로 내보내는 반복자
+    반복이 끝나면 result(TimelineOutput), first_item_sec / total_sec(시작부터 첫 항목/끝까지 초) 사용 가능
+    """
+
+    def __init__(self, payload: dict, analysis_json: dict, duration: int, config=None,
+                 on_item: Optional[Callable[[TimelineItem], None]] = None,
+                 on_replace: Optional[Callable[[TimelineOutput], None]] = None,
+                 finalize: Optional[Callable[[TimelineOutput], TimelineOutput]] = None):
+        self.payload = payload
+        self.analysis_json = analysis_json
+        self.duration = duration
+        self.config = config
+        self.on_item = on_item
+        self.on_replace = on_replace
+        self.finalize = finalize        # ensure_timeline_constraints 다음에 적용할 보정 (예: apply_captions)
+        self.replaced = False
+        self.validator = TimelineValidator(duration)
+        self.result: Optional[TimelineOutput] = None
+        self.first_item_sec: Optional[float] = None
+        self.total_sec: Optional[float] = None
+
+    def _emit(self, raw: dict, t0: float) -> Optional[TimelineItem]:
+        if not isinstance(raw, dict):
+            return None
+        item = self.validator.feed(raw)
+        if item is None:
+            return None
+        if self.first_item_sec is None:
+            self.first_item_sec = time.perf_counter() - t0
+        if self.on_item is not None:
+            self.on_item(item.model_copy(deep=True))
+        return item.model_copy(deep=True)
+
+    def __iter__(self) -> Iterator[TimelineItem]:
+        t0 = time.perf_counter()
+        done = 0
+        last = {}
+        for partial in timeline_stream_chain.stream(self.payload, config=self.config):
+            if not isinstance(partial, dict):
+                continue
+            last = partial
+            raw_items = partial.get("timeline") or []
+            # 마지막 항목은 아직 작성 중일 수 있음
+            while done < len(raw_items) - 1:
+                item = self._emit(raw_items[done], t0)
+                done += 1
+                if item is not None:
+                    yield item
+
+        raw_items = last.get("timeline") or []
+        while done < len(raw_items):
+            item = self._emit(raw_items[done], t0)
+            done += 1
+            if item is not None:
+                yield item
+
+        emitted = _canonical(self.validator.items)
+        tl = TimelineOutput(story_summary=last.get("story_summary") or "", timeline=list(self.validator.items))
+        tl = ensure_timeline_constraints(tl, self.analysis_json, self.duration)
+        if self.finalize is not None:
+            tl = self.finalize(tl)
+        self.result = tl
+        # 순서만 바뀐 것은 교체가 아님 (최종 목록은 시작 시각 순으로 정렬됨)
+        self.replaced = _canonical(tl.timeline) != emitted
+        if self.replaced and self.on_replace is not None:
+            self.on_replace(tl.model_copy(deep=True))
+        self.total_sec = time.perf_counter() - t0
+
+    def run(self) -> TimelineOutput:
+        # 항목별 처리는 on_item에 맡기고 끝까지 소비
+        for _ in self:
+            pass
+        return self.result
@@ -0,0 +1,351 @@
+# audio_mix.py
+# 타임라인 오디오 믹서 - CompositeAudioClip 대신
+# - 원본 파일마다 한 번만 PCM(float32, 스테레오)으로 디코딩해 공유 (긴 BGM은 디스크에 풀고 memmap, 디스크 용량 제한)
+# - 블록 단위로 NumPy 벡터 연산으로 더하고, 바로 ffmpeg 인코더 stdin으로 흘려보냄 (전체 믹스를 메모리에 두지 않음)
+# - Whisper 단어 타임스탬프로 말소리 구간을 잡아 그 아래에서 BGM을 줄임(ducking)
+# - 원본 위치(source_start)와 타임라인 위치(start)를 따로 받음
+import hashlib
+import os
+import subprocess
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+SAMPLE_RATE = 44100
+CHANNELS = 2
+BLOCK_SEC = 1.0
+DEFAULT_MAX_BYTES = int(os.environ.get("PCM_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+DEFAULT_DISK_DIR = os.environ.get("PCM_CACHE_DIR", os.path.join(tempfile.gettempdir(), "capup_pcm"))
+DEFAULT_DISK_MAX_BYTES = int(os.environ.get("PCM_DISK_MAX_BYTES", str(2 * 1024 * 1024 * 1024)))
+MMAP_MIN_BYTES = int(os.environ.get("PCM_MMAP_MIN_BYTES", str(4 * 1024 * 1024)))  # 원본(압축) 크기 기준
+
+DUCK_GAIN = 0.25            # 말소리 아래 BGM 배율
+DUCK_ATTACK_SEC = 0.1
+DUCK_RELEASE_SEC = 0.3
+SPEECH_GAP_SEC = 0.4        # 단어 사이가 이보다 짧으면 한 구간
+
+
+class PcmCache:
+    """
+    get(path) -> (샘플 수, 2) float32 배열 (읽기 전용), 소리가 없는 파일이면 None
+    - 원본 크기가 mmap_min_bytes 이상이면 disk_dir에 .f32로 풀어 memmap (여러 렌더/프로세스가 공유)
+      disk_dir의 .f32 합이 disk_max_bytes를 넘으면 오래 안 쓴 것부터 삭제 (이미 열린 memmap은 닫을 때까지 유효)
+    - 작은 파일은 메모리 LRU (바이트 기준)
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES, disk_dir: str = DEFAULT_DISK_DIR,
+                 mmap_min_bytes: int = MMAP_MIN_BYTES, sample_rate: int = SAMPLE_RATE,
+                 disk_max_bytes: int = DEFAULT_DISK_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self.mmap_min_bytes = mmap_min_bytes
+        self.sample_rate = sample_rate
+        self.disk_max_bytes = disk_max_bytes
+        self.hits = 0
+        self.decoded = 0
+        self.mmapped = 0
+        self.evicted = 0
+        self._items: "OrderedDict[tuple, Optional[np.ndarray]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def _decode_command(self, path: str, out: str) -> List[str]:
+        return ["ffmpeg", "-y", "-nostdin", "-loglevel", "error", "-i", path, "-vn",
+                "-f", "f32le", "-ac", str(CHANNELS), "-ar", str(self.sample_rate), out]
+
+    def _decode(self, path: str, size: int, mtime: float) -> Tuple[Optional[np.ndarray], bool]:
+        if size < self.mmap_min_bytes:
+            proc = subprocess.run(self._decode_command(path, "-"), stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+            if proc.returncode != 0 or not proc.stdout:
+                return None, False
+            arr = np.frombuffer(proc.stdout, dtype=np.float32).reshape(-1, CHANNELS)
+            return arr, False
+
+        os.makedirs(self.disk_dir, exist_ok=True)
+        key = hashlib.sha256(f"{path}|{mtime}|{size}|{self.sample_rate}".encode("utf-8")).hexdigest()[:32]
+        pcm_path = os.path.join(self.disk_dir, f"{key}.f32")
+        if os.path.exists(pcm_path):
+            try:
+                os.utime(pcm_path)      # 최근 사용 표시 (디스크 정리 순서)
+            except OSError:
+                pass
+        else:
+            tmp = f"{pcm_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            proc = subprocess.run(self._decode_command(path, tmp), stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+            if proc.returncode != 0 or not os.path.exists(tmp) or os.path.getsize(tmp) == 0:
+                if os.path.exists(tmp):
+                    os.remove(tmp)
+                return None, False
+            os.replace(tmp, pcm_path)
+            self._evict_disk(keep=pcm_path)
+        return np.memmap(pcm_path, dtype=np.float32, mode="r").reshape(-1, CHANNELS), True
+
+    def _evict_disk(self, keep: str) -> None:
+        # 수정 시각(최근 사용)이 오래된 .f32부터 삭제해 disk_max_bytes 이하로
+        files = []
+        for name in os.listdir(self.disk_dir):
+            if not name.endswith(".f32"):
+                continue
+            p = os.path.join(self.disk_dir, name)
+            try:
+                st = os.stat(p)
+            except FileNotFoundError:
+                continue
+            files.append((st.st_mtime, st.st_size, p))
+        total = sum(size for _, size, _ in files)
+        for _, size, p in sorted(files):
+            if total <= self.disk_max_bytes:
+                break
+            if p == keep:
+                continue
+            try:
+                os.remove(p)
+            except FileNotFoundError:
+                pass
+            except OSError:
+                continue        # 다른 프로세스가 열고 있어 지울 수 없는 경우 (Windows)
+            total -= size
+            with self._lock:
+                self.evicted += 1
+
+    def get(self, path: str) -> Optional[np.ndarray]:
+        path = os.path.abspath(path)
+        st = os.stat(path)
+        key = (path, st.st_mtime, st.st_size)
+        with self._lock:
+            if key in self._items:
+                self._items.move_to_end(key)
+                self.hits += 1
+                return self._items[key]
+
+        arr, mapped = self._decode(path, st.st_size, st.st_mtime)
+        with self._lock:
+            self.decoded += 1
+            if key in self._items:
+                return self._items[key]
+            self._items[key] = arr
+            if mapped:
+                self.mmapped += 1
+            elif arr is not None:
+                arr.setflags(write=False)
+                self._bytes += arr.nbytes
+            while self._bytes > self.max_bytes and len(self._items) > 1:
+                _, old = self._items.popitem(last=False)
+                if old is not None and not isinstance(old, np.memmap):
+                    self._bytes -= old.nbytes
+        return arr
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"hits": self.hits, "decoded": self.decoded, "mmapped": self.mmapped, "evicted": self.evicted,
+                    "entries": len(self._items), "bytes": self._bytes}
+
+
+_default: Optional[PcmCache] = None
+_default_lock = threading.Lock()
+
+
+def get_default_pcm_cache() -> PcmCache:
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = PcmCache()
+        return _default
+
+
+# ---------------------------
+# 말소리 구간 (ducking)
+# ---------------------------
+def _words(transcript) -> List[dict]:
+    # speechTranscriptions 형태(whisper_utils) 또는 단어 목록 그대로
+    if not transcript:
+        return []
+    if isinstance(transcript[0], dict) and "alternatives" in transcript[0]:
+        return [w for tr in transcript for alt in tr.get("alternatives", []) for w in alt.get("words", [])]
+    return list(transcript)
+
+
+def speech_ranges(timeline_json: dict, transcripts: Dict[str, list], gap: float = SPEECH_GAP_SEC) -> List[Tuple[float, float]]:
+    """
+    transcripts: {원본 파일명: Whisper 결과} -> 타임라인 시각 기준 말소리 구간 (병합, 정렬)
+    video 컷마다 원본 구간 안의 단어만 컷 위치로 옮김
+    """
+    by_name = {}
+    for name, tr in (transcripts or {}).items():
+        words = [w for w in _words(tr) if w.get("start") is not None]
+        by_name[name] = words
+        by_name.setdefault(os.path.basename(name), words)
+
+    spans = []
+    for it in timeline_json["timeline"]:
+        if it["type"] != "video" or not it.get("filename"):
+            continue
+        words = by_name.get(it["filename"]) or by_name.get(os.path.basename(it["filename"])) or []
+        start, end = float(it["start"]), float(it["end"])
+        src = float(it["start"] if it.get("source_start") is None else it["source_start"])
+        src_end = src + (end - start)
+        for w in words:
+            ws = float(w["start"])
+            we = float(w["end"]) if w.get("end") is not None else ws + 0.2
+            if we <= src or ws >= src_end:
+                continue
+            spans.append((start + max(ws, src) - src, start + min(we, src_end) - src))
+
+    merged: List[Tuple[float, float]] = []
+    for st, et in sorted(spans):
+        if merged and st - merged[-1][1] <= gap:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], et))
+        else:
+            merged.append((st, et))
+    return merged
+
+
+def duck_envelope(ranges: List[Tuple[float, float]], gain: float = DUCK_GAIN, attack: float = DUCK_ATTACK_SEC,
+                  release: float = DUCK_RELEASE_SEC) -> Tuple[np.ndarray, np.ndarray]:
+    # (시각, 배율) 꺾은선 - 블록마다 np.interp로 샘플 배율 계산
+    merged: List[List[float]] = []
+    for st, et in sorted(ranges):
+        if merged and st - merged[-1][1] <= attack + release:
+            merged[-1][1] = max(merged[-1][1], et)
+        else:
+            merged.append([st, et])
+    times, gains = [], []
+    for st, et in merged:
+        times += [st - attack, st, et, et + release]
+        gains += [1.0, gain, gain, 1.0]
+    return np.asarray(times, dtype=np.float64), np.asarray(gains, dtype=np.float32)
+
+
+# ---------------------------
+# 믹싱
+# ---------------------------
+def audio_tracks(timeline_json: dict, video_audio: Optional[bool] = None) -> List[dict]:
+    """
+    믹스할 항목 (timeline 항목 dict 그대로)
+    video_audio=None: audio 항목이 있으면 그것만, 없으면 video 항목 소리 (예전 set_audio 동작과 같음)
+    """
+    items = timeline_json["timeline"]
+    audio = [it for it in items if it["type"] == "audio" and it.get("filename")]
+    use_video = (not audio) if video_audio is None else video_audio
+    video = [it for it in items if it["type"] == "video" and it.get("filename")] if use_video else []
+    return video + audio
+
+
+def iter_mix(tracks: List[dict], duration: float, cache: Optional[PcmCache] = None,
+             speech: Optional[List[Tuple[float, float]]] = None, block_sec: float = BLOCK_SEC) -> Iterator[np.ndarray]:
+    """
+    (블록 샘플 수, 2) float32 블록을 차례로 생성
+    트랙 항목: filename, start, end, source_start(없으면 start), volume(기본 1.0),
+              duck(기본: speech가 있으면 audio 항목만 True)
+    """
+    cache = cache or get_default_pcm_cache()
+    sr = cache.sample_rate
+    total = int(round(duration * sr))
+
+    plan = []       # (pcm, 타임라인 시작 샘플, 끝 샘플, 원본 시작 샘플, volume, duck)
+    for it in tracks:
+        if not os.path.exists(it["filename"]):
+            print(f"오디오 파일 없음: {it['filename']}")
+            continue
+        pcm = cache.get(it["filename"])
+        if pcm is None:
+            continue
+        start, end = float(it["start"]), float(it["end"])
+        src = float(it["start"] if it.get("source_start") is None else it["source_start"])
+        duck = it.get("duck", it["type"] == "audio") and bool(speech)
+        plan.append((pcm, int(round(start * sr)), min(total, int(round(end * sr))), int(round(src * sr)),
+                     float(it.get("volume", 1.0)), duck))
+
+    env_t, env_g = duck_envelope(speech or [])
+    block = max(1, int(block_sec * sr))
+    for b0 in range(0, total, block):
+        b1 = min(total, b0 + block)
+        out = np.zeros((b1 - b0, CHANNELS), dtype=np.float32)
+        duck_gain = None
+        for pcm, t0, t1, s0, volume, duck in plan:
+            a, b = max(b0, t0), min(b1, t1)
+            if a >= b:
+                continue
+            sa = s0 + (a - t0)
+            sb = min(len(pcm), sa + (b - a))
+            if sb <= sa:
+                continue
+            b = a + (sb - sa)
+            chunk = pcm[sa:sb]
+            if duck:
+                if duck_gain is None:
+                    duck_gain = np.interp(np.arange(b0, b1) / sr, env_t, env_g, left=1.0, right=1.0).astype(np.float32) \
+                        if len(env_t) else np.ones(b1 - b0, dtype=np.float32)
+                out[a - b0:b - b0] += chunk * (duck_gain[a - b0:b - b0, None] * volume)
+            elif volume != 1.0:
+                out[a - b0:b - b0] += chunk * volume
+            else:
+                out[a - b0:b - b0] += chunk
+        np.clip(out, -1.0, 1.0, out=out)
+        yield out
+
+
+def mix_timeline_audio(
+    timeline_json: dict,
+    output_path: str,
+    duration: Optional[float] = None,
+    transcripts: Optional[Dict[str, list]] = None,
+    video_audio: Optional[bool] = None,
+    cache: Optional[PcmCache] = None,
+    bitrate: str = "192k",
+    stats: Optional[Dict[str, float]] = None,
+) -> Optional[str]:
+    """
+    타임라인 오디오를 믹싱해 AAC(output_path)로 인코딩, 믹스할 소리가 없으면 None
+    duration: 없으면 video/image/subtitle 끝 시각
+    transcripts: {원본 파일명: Whisper 결과}가 있으면 말소리 아래에서 audio 항목(BGM) ducking
+                 (영상 소리가 믹스에 들어갈 때만 - audio 항목이 있으면 video_audio=True도 함께)
+    video_audio: audio_tracks 참고 - BGM 아래에 영상 소리(말소리)도 섞으려면 True
+    """
+    t0 = time.perf_counter()
+    cache = cache or get_default_pcm_cache()
+    if duration is None:
+        visual = [float(it["end"]) for it in timeline_json["timeline"] if it["type"] in ("video", "image", "subtitle")]
+        duration = max(visual, default=0.0)
+    tracks = audio_tracks(timeline_json, video_audio)
+    if not tracks or duration <= 0:
+        return None
+    speech = speech_ranges(timeline_json, transcripts) if transcripts else []
+    if speech and not any(it["type"] == "video" for it in tracks):
+        # 말소리(영상 소리)가 믹스에 없으면 BGM만 이유 없이 줄어듦 -> ducking 생략
+        print("영상 소리를 믹싱하지 않아 ducking 생략 (말소리를 섞으려면 video_audio=True)")
+        speech = []
+
+    # 디코딩을 먼저 해서 소리 있는 트랙이 없으면 인코더를 띄우지 않음
+    if all(not os.path.exists(it["filename"]) or cache.get(it["filename"]) is None for it in tracks):
+        return None
+
+    command = [
+        "ffmpeg", "-y", "-nostdin", "-loglevel", "error",
+        "-f", "f32le", "-ar", str(cache.sample_rate), "-ac", str(CHANNELS), "-i", "-",
+        "-c:a", "aac", "-b:a", bitrate, output_path,
+    ]
+    proc = subprocess.Popen(command, stdin=subprocess.PIPE, stderr=subprocess.PIPE)
+    try:
+        for block in iter_mix(tracks, duration, cache, speech):
+            proc.stdin.write(block.tobytes())
+        proc.stdin.close()
+    except BrokenPipeError:
+        pass
+    err = proc.stderr.read()
+    if proc.wait() != 0:
+        raise RuntimeError(f"오디오 인코딩 실패: {err.decode('utf-8', errors='replace')}")
+
+    if stats is not None:
+        stats.update({"audio_sec": round(time.perf_counter() - t0, 3), "audio_tracks": len(tracks),
+                      "speech_ranges": len(speech), "pcm": cache.stats()})
+    return output_path
@@ -0,0 +1,429 @@
+# benchmark.py
+# 렌더링 성능 측정용 스크립트 (movie_maker 디렉터리에서 실행)
+#   python benchmark.py reader-pool [--cuts 8 --sources 2 --resolution 540x960]
+#   python benchmark.py raster-cache [--subtitles 20 --resolution 540x960]  (자막은 ImageMagick 필요)
+#   python benchmark.py backends [--seconds 30 --subtitles 10 --resolution 1080x1920]
+#   python benchmark.py segments [--seconds 60 --workers 1 2 4 8 --resolution 540x960]
+#   python benchmark.py variants [--seconds 20 --scale 0.5]
+#   python benchmark.py preview [--seconds 30]
+#   python benchmark.py audio-mix [--seconds 60 --tracks 6 --bgm-seconds 180]
+import argparse
+import json
+import os
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from typing import List, Tuple
+
+import movie
+from audio_mix import PcmCache, mix_timeline_audio
+from clip_pool import ClipPool
+from multi_render import render_variants
+from preview import PreviewRenderer
+from raster_cache import RasterCache
+
+
+def _parse_resolution(text: str) -> Tuple[int, int]:
+    w, h = text.lower().split("x")
+    return int(w), int(h)
+
+
+def make_test_source(path: str, seconds: float = 20.0, size: str = "640x360", fps: int = 30, freq: int = 440) -> str:
+    # 테스트용 원본 (컬러바 + 사인파)
+    command = [
+        "ffmpeg", "-y", "-nostdin", "-loglevel", "error",
+        "-f", "lavfi", "-i", f"testsrc2=size={size}:rate={fps}:duration={seconds}",
+        "-f", "lavfi", "-i", f"sine=frequency={freq}:duration={seconds}",
+        "-c:v", "libx264", "-preset", "ultrafast", "-pix_fmt", "yuv420p",
+        "-c:a", "aac", "-shortest",
+        path,
+    ]
+    subprocess.run(command, check=True)
+    return path
+
+
+def repeated_source_timeline(sources: List[str], cuts: int, cut_sec: float = 3.0) -> dict:
+    # 같은 소스에서 여러 구간을 번갈아 잘라 쓰는 타임라인
+    timeline = []
+    for i in range(cuts):
+        start = i * cut_sec
+        timeline.append({
+            "type": "video",
+            "filename": sources[i % len(sources)],
+            "start": start,
+            "end": start + cut_sec,
+            "source_start": (i // len(sources)) * cut_sec,
+        })
+    return {"timeline": timeline}
+
+
+def make_test_image(path: str, size: str = "1920x1080") -> str:
+    command = [
+        "ffmpeg", "-y", "-nostdin", "-loglevel", "error",
+        "-f", "lavfi", "-i", f"testsrc2=size={size}:rate=1",
+        "-frames:v", "1",
+        path,
+    ]
+    subprocess.run(command, check=True)
+    return path
+
+
+def subtitle_timeline(video: str, images: List[str], seconds: float = 30.0, subtitles: int = 20) -> dict:
+    # 영상 컷 5초씩 + 이미지 오버레이 + 자막 여러 개 (CTA 등 같은 문구 반복)
+    texts = ["지금 시작합니다", "AI로 리뷰 분석", "정확도 92%", "한국어/영어 지원", "팀이 만든 결과",
+             "매주 목요일 배포", "구독하고 더 보기!", "좋아요 부탁해요"]
+    timeline = []
+    t = 0.0
+    while t < seconds:
+        timeline.append({"type": "video", "filename": video, "start": t, "end": min(seconds, t + 5.0), "source_start": t})
+        t += 5.0
+    for i, img in enumerate(images * 2):
+        st = 2.0 + i * (seconds - 4.0) / (len(images) * 2)
+        timeline.append({"type": "image", "filename": img, "start": st, "end": st + 2.0,
+                         "position": {"x": 40, "y": 40}})
+    step = seconds / subtitles
+    for i in range(subtitles):
+        timeline.append({"type": "subtitle", "text": texts[i % len(texts)], "start": i * step, "end": (i + 1) * step})
+    return {"timeline": timeline}
+
+
+class _PopenCounter:
+    # 렌더 중 생성된 ffmpeg 프로세스 수 집계
+    def __init__(self):
+        self.count = 0
+        self._orig = subprocess.Popen
+
+    def __enter__(self):
+        counter = self
+        orig = self._orig
+
+        class _Popen(orig):
+            def __init__(self, args, *a, **kw):
+                if args and "ffmpeg" in os.path.basename(str(args[0])):
+                    counter.count += 1
+                super().__init__(args, *a, **kw)
+
+        subprocess.Popen = _Popen
+        return self
+
+    def __exit__(self, *exc):
+        subprocess.Popen = self._orig
+
+
+def bench_reader_pool(cuts: int = 8, sources: int = 2, resolution=(540, 960), fps: int = 30) -> List[dict]:
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = [make_test_source(os.path.join(tmp, f"src_{i}.mp4"), seconds=cuts * 3.0, freq=300 + 100 * i)
+                 for i in range(sources)]
+        timeline = repeated_source_timeline(paths, cuts)
+        duration = cuts * 3.0
+
+        rows = []
+        for mode, reuse in (("per-item", False), ("pooled", True)):
+            stats = {}
+            with _PopenCounter() as counter, ClipPool(reuse=reuse) as pool:
+                movie.render_shorts_from_timeline(timeline, os.path.join(tmp, f"out_{mode}.mp4"),
+                                                  resolution=resolution, fps=fps, clip_pool=pool, stats=stats)
+            row = {
+                "mode": mode,
+                "cuts": cuts,
+                "sources": sources,
+                "video_readers": stats["video_readers"],
+                "ffmpeg_processes": counter.count,
+                "render_sec": stats["render_sec"],
+                "x_realtime": round(duration / stats["render_sec"], 2),
+            }
+            print(json.dumps(row))
+            rows.append(row)
+        return rows
+
+
+def bench_raster_cache(subtitles: int = 20, resolution=(540, 960), fps: int = 30, seconds: float = 30.0) -> List[dict]:
+    # 래스터 단계만(클립 구성) + 전체 렌더: 빈 캐시(cold) vs 같은 캐시로 재렌더(warm)
+    with tempfile.TemporaryDirectory() as tmp:
+        video = make_test_source(os.path.join(tmp, "src.mp4"), seconds=seconds)
+        images = [make_test_image(os.path.join(tmp, f"img_{i}.png")) for i in range(3)]
+        timeline = subtitle_timeline(video, images, seconds, subtitles)
+
+        cache = RasterCache(disk_dir=None)
+        rows = []
+        for mode in ("cold", "warm"):
+            with ClipPool() as pool:
+                t0 = time.perf_counter()
+                movie._build_clips(timeline, resolution, "NanumGothic", pool, cache)
+                build_sec = time.perf_counter() - t0
+            if mode == "cold":
+                cache.clear()       # 전체 렌더도 빈 캐시에서 시작
+            cache.hits = cache.disk_hits = cache.misses = 0
+            stats = {}
+            movie.render_shorts_from_timeline(timeline, os.path.join(tmp, f"out_{mode}.mp4"), resolution=resolution,
+                                              fps=fps, raster_cache=cache, stats=stats)
+            row = {
+                "mode": mode,
+                "subtitles": subtitles,
+                "raster_build_sec": round(build_sec, 3),
+                "render_sec": stats["render_sec"],
+                "x_realtime": round(seconds / stats["render_sec"], 2),
+                "cache": stats["raster"],
+            }
+            print(json.dumps(row, ensure_ascii=False))
+            rows.append(row)
+        return rows
+
+
+def bench_backends(seconds: float = 30.0, subtitles: int = 10, resolution=(1080, 1920), fps: int = 30,
+                   font: str = "NanumGothic") -> List[dict]:
+    # 같은 타임라인(컷 + 이미지 + 자막 + BGM)을 백엔드별로 렌더링, 실시간 대비 배속
+    with tempfile.TemporaryDirectory() as tmp:
+        video = make_test_source(os.path.join(tmp, "src.mp4"), seconds=seconds)
+        bgm = make_test_source(os.path.join(tmp, "bgm.mp4"), seconds=seconds, freq=220)
+        images = [make_test_image(os.path.join(tmp, f"img_{i}.png")) for i in range(2)]
+        timeline = subtitle_timeline(video, images, seconds, subtitles)
+        timeline["timeline"].append({"type": "audio", "filename": bgm, "start": 0.0, "end": seconds})
+
+        rows = []
+        for backend in ("moviepy", "ffmpeg"):
+            stats = {}
+            movie.render_shorts_from_timeline(timeline, os.path.join(tmp, f"out_{backend}.mp4"), resolution=resolution,
+                                              fps=fps, font=font, stats=stats, backend=backend)
+            row = {
+                "backend": stats["backend"],
+                "seconds": seconds,
+                "render_sec": stats["render_sec"],
+                "x_realtime": round(seconds / stats["render_sec"], 2),
+            }
+            print(json.dumps(row))
+            rows.append(row)
+        return rows
+
+
+def bench_segments(seconds: float = 60.0, workers: List[int] = (1, 2, 4, 8), resolution=(540, 960), fps: int = 30,
+                   font: str = "NanumGothic") -> List[dict]:
+    # 같은 타임라인을 한 번에(write_videofile 하나) vs 구간 병렬(workers개 프로세스) 렌더링
+    with tempfile.TemporaryDirectory() as tmp:
+        video = make_test_source(os.path.join(tmp, "src.mp4"), seconds=seconds)
+        bgm = make_test_source(os.path.join(tmp, "bgm.mp4"), seconds=seconds, freq=220)
+        images = [make_test_image(os.path.join(tmp, f"img_{i}.png")) for i in range(2)]
+        timeline = subtitle_timeline(video, images, seconds, subtitles=max(1, int(seconds // 3)))
+        timeline["timeline"].append({"type": "audio", "filename": bgm, "start": 0.0, "end": seconds})
+
+        rows = []
+        base = None
+        for n in workers:
+            stats = {}
+            movie.render_shorts_from_timeline(timeline, os.path.join(tmp, f"out_{n}.mp4"), resolution=resolution,
+                                              fps=fps, font=font, stats=stats, workers=n)
+            base = base or stats["render_sec"]
+            row = {
+                "workers": n,
+                "cpus": os.cpu_count(),
+                "segments": stats.get("segments", 1),
+                "render_sec": stats["render_sec"],
+                "speedup": round(base / stats["render_sec"], 2),
+                "x_realtime": round(seconds / stats["render_sec"], 2),
+            }
+            print(json.dumps(row))
+            rows.append(row)
+        return rows
+
+
+def bench_variants(seconds: float = 20.0, scale: float = 1.0, font: str = "NanumGothic") -> List[dict]:
+    # 쇼츠 + 미리보기 + 스크럽 세 규격: 독립 렌더 3번 vs render_variants 한 번
+    # scale < 1이면 모든 해상도를 줄여서 (느린 환경용)
+    def _res(w, h):
+        return int(w * scale) // 2 * 2, int(h * scale) // 2 * 2
+
+    with tempfile.TemporaryDirectory() as tmp:
+        video = make_test_source(os.path.join(tmp, "src.mp4"), seconds=seconds)
+        images = [make_test_image(os.path.join(tmp, f"img_{i}.png")) for i in range(2)]
+        timeline = subtitle_timeline(video, images, seconds, subtitles=max(1, int(seconds // 3)))
+        outputs = [
+            {"path": os.path.join(tmp, "shorts.mp4"), "resolution": _res(1080, 1920), "fps": 30},
+            {"path": os.path.join(tmp, "preview.mp4"), "resolution": _res(720, 1280), "fps": 30, "preset": "veryfast"},
+            {"path": os.path.join(tmp, "scrub.mp4"), "resolution": _res(270, 480), "fps": 10, "bitrate": "300k"},
+        ]
+
+        cache = RasterCache(disk_dir=None)
+        t0 = time.perf_counter()
+        for out in outputs:
+            movie.render_shorts_from_timeline(timeline, out["path"], resolution=out["resolution"], fps=out["fps"],
+                                              font=font, raster_cache=cache)
+        independent = time.perf_counter() - t0
+
+        cache = RasterCache(disk_dir=None)
+        stats = {}
+        render_variants(timeline, outputs, font=font, raster_cache=cache, stats=stats)
+
+        rows = [
+            {"mode": "independent", "outputs": len(outputs), "render_sec": round(independent, 3)},
+            {"mode": "single-pass", "outputs": len(outputs), "render_sec": stats["render_sec"],
+             "frames_composited": stats["frames"]},
+        ]
+        rows[1]["speedup"] = round(independent / stats["render_sec"], 2)
+        for row in rows:
+            print(json.dumps(row))
+        return rows
+
+
+def bench_preview(seconds: float = 30.0, font: str = "NanumGothic") -> List[dict]:
+    # 전체 품질 렌더 vs 미리보기 첫 렌더 vs 자막 하나 고친 뒤 미리보기 vs 포스터(cold/warm)
+    with tempfile.TemporaryDirectory() as tmp:
+        video = make_test_source(os.path.join(tmp, "src.mp4"), seconds=seconds)
+        images = [make_test_image(os.path.join(tmp, f"img_{i}.png")) for i in range(2)]
+        timeline = subtitle_timeline(video, images, seconds, subtitles=max(1, int(seconds // 3)))
+        edited = json.loads(json.dumps(timeline))
+        subs = [it for it in edited["timeline"] if it["type"] == "subtitle"]
+        subs[len(subs) // 2]["text"] = "수정된 자막"
+
+        rows = []
+        stats = {}
+        movie.render_shorts_from_timeline(timeline, os.path.join(tmp, "full.mp4"), font=font, stats=stats)
+        rows.append({"mode": "full-quality", "render_sec": stats["render_sec"]})
+
+        preview = PreviewRenderer(os.path.join(tmp, "preview_cache"), font=font)
+        for mode, tl in (("preview-first", timeline), ("preview-edit", edited)):
+            stats = {}
+            preview.render(tl, os.path.join(tmp, f"{mode}.mp4"), stats)
+            rows.append({"mode": mode, "render_sec": stats["render_sec"], "chunks": stats["chunks"],
+                         "rendered_chunks": stats["rendered_chunks"]})
+
+        for mode in ("posters-cold", "posters-warm"):
+            t0 = time.perf_counter()
+            posters = preview.posters(edited)
+            rows.append({"mode": mode, "render_sec": round(time.perf_counter() - t0, 3),
+                         "posters": sum(p is not None for p in posters)})
+
+        for row in rows:
+            print(json.dumps(row, ensure_ascii=False))
+        return rows
+
+
+def make_test_audio(path: str, seconds: float = 10.0, freq: int = 440) -> str:
+    command = [
+        "ffmpeg", "-y", "-nostdin", "-loglevel", "error",
+        "-f", "lavfi", "-i", f"sine=frequency={freq}:duration={seconds}",
+        "-ac", "2", "-c:a", "aac", path,
+    ]
+    subprocess.run(command, check=True)
+    return path
+
+
+def bench_audio_mix(seconds: float = 60.0, tracks: int = 6, bgm_seconds: float = 180.0) -> List[dict]:
+    # BGM(긴 파일, 중간부터) + 효과음/내레이션 여러 개: CompositeAudioClip vs audio_mix (시간, 파이썬 쪽 최대 메모리)
+    from moviepy.editor import AudioFileClip, CompositeAudioClip
+
+    with tempfile.TemporaryDirectory() as tmp:
+        video = make_test_source(os.path.join(tmp, "src.mp4"), seconds=seconds)
+        bgm = make_test_audio(os.path.join(tmp, "bgm.m4a"), seconds=bgm_seconds, freq=220)
+        sfx = [make_test_audio(os.path.join(tmp, f"sfx_{i}.m4a"), seconds=seconds, freq=500 + 100 * i)
+               for i in range(max(1, tracks - 2))]
+        timeline = [{"type": "video", "filename": video, "start": 0.0, "end": seconds, "source_start": 0.0},
+                    {"type": "audio", "filename": bgm, "start": 0.0, "end": seconds, "source_start": 30.0, "volume": 0.6}]
+        step = seconds / len(sfx)
+        for i, path in enumerate(sfx):
+            timeline.append({"type": "audio", "filename": path, "start": i * step, "end": (i + 1) * step,
+                             "source_start": 0.0, "duck": False})
+        timeline_json = {"timeline": timeline}
+        # 2초마다 1초씩 말하는 Whisper 결과
+        words = [{"word": f" 단어{i}", "start": float(t), "end": t + 1.0} for i, t in enumerate(range(0, int(seconds), 2))]
+        transcripts = {video: words}
+
+        rows = []
+
+        def _measure(mode, fn):
+            tracemalloc.start()
+            t0 = time.perf_counter()
+            fn()
+            sec = time.perf_counter() - t0
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            row = {"mode": mode, "tracks": len(timeline), "seconds": seconds, "mix_sec": round(sec, 3),
+                   "peak_mb": round(peak / 1024 / 1024, 1)}
+            print(json.dumps(row))
+            rows.append(row)
+
+        def _composite():
+            clips = [AudioFileClip(it["filename"]).subclip(it["source_start"], it["source_start"] + it["end"] - it["start"])
+                     .set_start(it["start"]) for it in timeline]
+            try:
+                CompositeAudioClip(clips).write_audiofile(os.path.join(tmp, "composite.m4a"), fps=44100,
+                                                          codec="aac", logger=None)
+            finally:
+                for c in clips:
+                    c.close()
+
+        _measure("CompositeAudioClip", _composite)
+        cache = PcmCache(disk_dir=os.path.join(tmp, "pcm"), mmap_min_bytes=1024 * 1024)
+        _measure("audio_mix-cold", lambda: mix_timeline_audio(timeline_json, os.path.join(tmp, "mix.m4a"),
+                                                              duration=seconds, video_audio=True, cache=cache))
+        _measure("audio_mix-warm", lambda: mix_timeline_audio(timeline_json, os.path.join(tmp, "mix.m4a"),
+                                                              duration=seconds, video_audio=True, cache=cache))
+        _measure("audio_mix-ducking", lambda: mix_timeline_audio(timeline_json, os.path.join(tmp, "duck.m4a"),
+                                                                 duration=seconds, transcripts=transcripts,
+                                                                 video_audio=True, cache=cache))
+        print(json.dumps({"pcm": cache.stats()}))
+        return rows
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("reader-pool", help="원본 리더 재사용 전/후 프로세스 수, 렌더 시간")
+    p.add_argument("--cuts", type=int, default=8)
+    p.add_argument("--sources", type=int, default=2)
+    p.add_argument("--resolution", default="540x960")
+    p.add_argument("--fps", type=int, default=30)
+
+    p = sub.add_parser("raster-cache", help="자막/이미지 래스터 캐시 cold vs warm")
+    p.add_argument("--subtitles", type=int, default=20)
+    p.add_argument("--resolution", default="540x960")
+    p.add_argument("--fps", type=int, default=30)
+
+    p = sub.add_parser("backends", help="moviepy vs ffmpeg 백엔드 렌더 속도 (x 실시간)")
+    p.add_argument("--seconds", type=float, default=30.0)
+    p.add_argument("--subtitles", type=int, default=10)
+    p.add_argument("--resolution", default="1080x1920")
+    p.add_argument("--fps", type=int, default=30)
+    p.add_argument("--font", default="NanumGothic")
+
+    p = sub.add_parser("segments", help="구간 병렬 렌더링 프로세스 수별 렌더 시간")
+    p.add_argument("--seconds", type=float, default=60.0)
+    p.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    p.add_argument("--resolution", default="540x960")
+    p.add_argument("--fps", type=int, default=30)
+    p.add_argument("--font", default="NanumGothic")
+
+    p = sub.add_parser("variants", help="여러 출력 규격: 독립 렌더 vs 합성 한 번 + 다중 출력")
+    p.add_argument("--seconds", type=float, default=20.0)
+    p.add_argument("--scale", type=float, default=1.0)
+    p.add_argument("--font", default="NanumGothic")
+
+    p = sub.add_parser("preview", help="전체 렌더 vs 미리보기(첫 렌더/수정 후) vs 포스터")
+    p.add_argument("--seconds", type=float, default=30.0)
+    p.add_argument("--font", default="NanumGothic")
+
+    p = sub.add_parser("audio-mix", help="CompositeAudioClip vs audio_mix 믹싱 시간/메모리")
+    p.add_argument("--seconds", type=float, default=60.0)
+    p.add_argument("--tracks", type=int, default=6)
+    p.add_argument("--bgm-seconds", type=float, default=180.0)
+
+    args = parser.parse_args()
+    if args.command == "reader-pool":
+        bench_reader_pool(args.cuts, args.sources, _parse_resolution(args.resolution), args.fps)
+    elif args.command == "raster-cache":
+        bench_raster_cache(args.subtitles, _parse_resolution(args.resolution), args.fps)
+    elif args.command == "backends":
+        bench_backends(args.seconds, args.subtitles, _parse_resolution(args.resolution), args.fps, args.font)
+    elif args.command == "segments":
+        bench_segments(args.seconds, args.workers, _parse_resolution(args.resolution), args.fps, args.font)
+    elif args.command == "variants":
+        bench_variants(args.seconds, args.scale, args.font)
+    elif args.command == "preview":
+        bench_preview(args.seconds, args.font)
+    elif args.command == "audio-mix":
+        bench_audio_mix(args.seconds, args.tracks, args.bgm_seconds)
+
+
+if __name__ == "__main__":
+    main()
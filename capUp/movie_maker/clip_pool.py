@@ -0,0 +1,75 @@
+# clip_pool.py
+# 렌더링 중 원본 파일별로 VideoFileClip/AudioFileClip을 한 번만 열어 재사용
+# 같은 소스에서 여러 컷을 잘라도 ffmpeg 리더 프로세스는 파일당 하나
+import os
+import threading
+from typing import Dict, Tuple
+from moviepy.editor import VideoFileClip, AudioFileClip
+
+
+class ClipPool:
+    """
+    with ClipPool() as pool:
+        clip = pool.video("a.mp4").subclip(3, 7)
+    - subclip은 원본 리더를 공유하므로 subclip 쪽에서 close하지 말 것 (풀이 닫음)
+    - 여러 렌더에 걸쳐 쓰려면 직접 만들어 render_shorts_from_timeline(clip_pool=pool)로 넘기고 다 쓰면 close()
+    - 파일이 바뀌면(mtime) 새로 엶
+    - reuse=False면 요청마다 새로 엶 (비교용, 예전 동작)
+    """
+
+    def __init__(self, reuse: bool = True):
+        self.reuse = reuse
+        self._clips: Dict[Tuple[str, str, float], object] = {}
+        self._extra = []            # reuse=False일 때 연 클립
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.opened = {"video": 0, "audio": 0}
+
+    def _get(self, kind: str, filename: str, opener):
+        path = os.path.abspath(filename)
+        key = (kind, path, os.path.getmtime(path))
+        with self._lock:
+            self.requests += 1
+            if not self.reuse:
+                clip = opener(path)
+                self._extra.append(clip)
+                self.opened[kind] += 1
+                return clip
+            clip = self._clips.get(key)
+            if clip is None:
+                clip = opener(path)
+                self._clips[key] = clip
+                self.opened[kind] += 1
+            return clip
+
+    def video(self, filename: str) -> VideoFileClip:
+        return self._get("video", filename, VideoFileClip)
+
+    def audio(self, filename: str) -> AudioFileClip:
+        return self._get("audio", filename, AudioFileClip)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "video_readers": self.opened["video"],
+                "audio_readers": self.opened["audio"],
+                "open": len(self._clips) + len(self._extra),
+            }
+
+    def close(self):
+        with self._lock:
+            clips = list(self._clips.values()) + self._extra
+            self._clips.clear()
+            self._extra = []
+        for c in clips:
+            try:
+                c.close()
+            except Exception as e:
+                print(f"클립 닫기 실패: {e}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
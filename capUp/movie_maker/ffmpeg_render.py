@@ -0,0 +1,265 @@
+# ffmpeg_render.py
+# 타임라인 JSON -> ffmpeg filter_complex 한 번으로 렌더링 (moviepy처럼 프레임을 파이썬으로 가져오지 않음)
+# 지원: video(컷, source_start), image(정지 이미지, 위치), subtitle(drawtext 또는 래스터 PNG)
+# 오디오는 moviepy 백엔드와 같은 audio_mix로 따로 믹싱해 입력으로 붙임 (ducking/video_audio 동작이 백엔드와 무관)
+# 지원하지 않는 항목이 있으면 UnsupportedTimeline -> movie.render_shorts_from_timeline이 moviepy로 대체
+import functools
+import os
+import subprocess
+import tempfile
+import time
+from typing import Dict, List, Optional, Tuple
+
+from PIL import Image
+
+from audio_mix import mix_timeline_audio
+from raster_cache import RasterCache, get_default_cache, subtitle_raster
+
+VIDEO_FADE_SEC = 0.2        # moviepy 백엔드의 crossfadein과 같은 값
+IMAGE_FADE_SEC = 0.3
+SUBTITLE_FADE_SEC = 0.3
+SUBTITLE_FONTSIZE = 48
+SUBTITLE_BOX = (820, 140)   # moviepy 백엔드의 자막 배경 크기
+SUBTITLE_LINE_CHARS = 16    # drawtext는 자동 줄바꿈이 없어서 글자 수로 나눔
+
+
+class UnsupportedTimeline(Exception):
+    pass
+
+
+@functools.lru_cache(maxsize=None)
+def _ffmpeg_filters() -> frozenset:
+    out = subprocess.run(["ffmpeg", "-hide_banner", "-filters"], stdout=subprocess.PIPE,
+                         stderr=subprocess.DEVNULL).stdout.decode("utf-8", errors="replace")
+    names = set()
+    for line in out.splitlines():
+        parts = line.split()
+        if len(parts) >= 3 and "->" in parts[2]:
+            names.add(parts[1])
+    return frozenset(names)
+
+
+def _wrap(text: str, width: int = SUBTITLE_LINE_CHARS) -> str:
+    lines = []
+    for para in text.splitlines() or [""]:
+        line = ""
+        for word in para.split(" "):
+            cand = f"{line} {word}".strip()
+            if len(cand) <= width:
+                line = cand
+                continue
+            if line:
+                lines.append(line)
+            while len(word) > width:
+                lines.append(word[:width])
+                word = word[width:]
+            line = word
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def _anchor(value, default: str, big: str, small: str) -> str:
+    # moviepy set_pos 값(center/left/right/top/bottom/숫자) -> 왼쪽/위 좌표 식
+    # big: 화면 크기(W/H 또는 w/h), small: 올릴 것의 크기
+    v = default if value is None else value
+    if isinstance(v, (int, float)):
+        return f"{float(v):.3f}"
+    if v == "center":
+        return f"({big}-{small})/2"
+    if v in ("left", "top"):
+        return "0"
+    if v in ("right", "bottom"):
+        return f"{big}-{small}"
+    raise UnsupportedTimeline(f"지원하지 않는 위치: {v}")
+
+
+def _escape(value: str) -> str:
+    # filtergraph 옵션 값 이스케이프
+    return value.replace("\\", "\\\\").replace(":", "\\:").replace("'", "\\'").replace(",", "\\,")
+
+
+def build_command(
+    timeline_json: dict,
+    output_path: str,
+    workdir: str,
+    resolution: Tuple[int, int] = (1080, 1920),
+    fps: int = 30,
+    font: str = "NanumGothic",
+    raster_cache: Optional[RasterCache] = None,
+    preset: str = "fast",
+    crf: int = 20,
+    threads: int = 4,
+    subtitle_file: Optional[str] = None,
+    audio_path: Optional[str] = None,
+) -> List[str]:
+    """
+    타임라인 -> ffmpeg 명령 (입력 목록 + filter_complex)
+    workdir: 자막 텍스트/PNG/필터 스크립트 임시 파일 위치 (만들고 지우는 것은 호출하는 쪽, 예: TemporaryDirectory)
+    subtitle_file: SRT/ASS 자막 파일 (captions.write_sidecar)을 마지막에 번인 (libass)
+    audio_path: 믹싱이 끝난 오디오 (mix_timeline_audio 결과), 없으면 무음 - audio 항목은 여기서 무시
+    """
+    W, H = resolution
+    items = sorted(timeline_json["timeline"], key=lambda x: (float(x["start"]), float(x["end"])))
+    visual = [it for it in items if it["type"] in ("video", "image", "subtitle")]
+    if not visual:
+        raise ValueError("타임라인에 video/image/subtitle이 없음")
+    total = max(float(it["end"]) for it in visual)
+    filters_available = _ffmpeg_filters()
+
+    inputs: List[str] = []
+    graph: List[str] = [f"color=c=black:s={W}x{H}:r={fps}:d={total:.3f},format=yuv420p[base0]"]
+    cur = "base0"
+    n_in = 0
+    n_layer = 0
+
+    def _overlay(src_label: str, x: str = "0", y: str = "0"):
+        nonlocal cur, n_layer
+        n_layer += 1
+        out = f"base{n_layer}"
+        graph.append(f"[{cur}][{src_label}]overlay=x={x}:y={y}:eof_action=pass:format=auto[{out}]")
+        cur = out
+
+    for item in items:
+        t = item["type"]
+        start, end = float(item["start"]), float(item["end"])
+        dur = max(0.1, end - start)
+        pos = item.get("position") or {}
+
+        if t == "video":
+            if not item.get("filename"):
+                continue
+            path = item["filename"]
+            if not os.path.exists(path):
+                raise UnsupportedTimeline(f"파일 없음: {path}")
+            src = item.get("source_start")
+            src = start if src is None else float(src)
+            inputs += ["-ss", f"{src:.3f}", "-t", f"{dur:.3f}", "-i", path]
+            graph.append(
+                f"[{n_in}:v]scale={W}:{H},setsar=1,fps={fps},format=yuva420p,"
+                f"fade=t=in:st=0:d={VIDEO_FADE_SEC}:alpha=1,setpts=PTS-STARTPTS+{start:.3f}/TB[v{n_in}]"
+            )
+            _overlay(f"v{n_in}")
+            n_in += 1
+
+        elif t == "image":
+            if not item.get("filename"):
+                continue
+            path = item["filename"]
+            if not os.path.exists(path):
+                raise UnsupportedTimeline(f"파일 없음: {path}")
+            inputs += ["-loop", "1", "-framerate", str(fps), "-t", f"{dur:.3f}", "-i", path]
+            graph.append(
+                f"[{n_in}:v]scale={W}:{H},setsar=1,format=yuva420p,"
+                f"fade=t=in:st=0:d={IMAGE_FADE_SEC}:alpha=1,setpts=PTS-STARTPTS+{start:.3f}/TB[v{n_in}]"
+            )
+            _overlay(f"v{n_in}", _anchor(pos.get("x"), "center", "W", "w"), _anchor(pos.get("y"), "center", "H", "h"))
+            n_in += 1
+
+        elif t == "subtitle":
+            if not item.get("text"):
+                continue
+            bw, bh = SUBTITLE_BOX
+            fade_in = f"if(lt(t\\,{start:.3f}+{SUBTITLE_FADE_SEC})\\,(t-{start:.3f})/{SUBTITLE_FADE_SEC}\\,1)"
+
+            if "drawtext" in filters_available:
+                fd, text_path = tempfile.mkstemp(suffix=".txt", dir=workdir)
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    f.write(_wrap(item["text"]))
+                font_opt = f"fontfile='{_escape(font)}'" if os.path.isfile(font) else f"font='{_escape(font)}'"
+                # moviepy 백엔드처럼 SUBTITLE_BOX 상자 위치를 잡고 그 가운데에 글자
+                box_x = _anchor(pos.get("x"), "center", "w", str(bw))
+                box_y = _anchor(pos.get("y"), "bottom", "h", str(bh))
+                n_layer += 1
+                out = f"base{n_layer}"
+                graph.append(
+                    f"[{cur}]drawtext={font_opt}:textfile='{_escape(text_path)}':expansion=none:"
+                    f"fontsize={SUBTITLE_FONTSIZE}:fontcolor=white:line_spacing=8:"
+                    f"box=1:boxcolor=black@0.6:boxborderw=10:"
+                    f"x={box_x}+({bw}-text_w)/2:y={box_y}+({bh}-text_h)/2:"
+                    f"alpha='{fade_in}':enable='between(t,{start:.3f},{end:.3f})'[{out}]"
+                )
+                cur = out
+            else:
+                # drawtext가 없는 빌드: moviepy 백엔드와 같은 자막 래스터(PNG)를 오버레이
+                try:
+                    rgba = subtitle_raster(raster_cache or get_default_cache(), item["text"], font)
+                except Exception as e:
+                    raise UnsupportedTimeline(f"자막 래스터 실패: {e}")
+                fd, png_path = tempfile.mkstemp(suffix=".png", dir=workdir)
+                os.close(fd)
+                Image.fromarray(rgba).save(png_path)
+                inputs += ["-loop", "1", "-framerate", str(fps), "-t", f"{dur:.3f}", "-i", png_path]
+                graph.append(
+                    f"[{n_in}:v]format=yuva420p,fade=t=in:st=0:d={SUBTITLE_FADE_SEC}:alpha=1,"
+                    f"setpts=PTS-STARTPTS+{start:.3f}/TB[v{n_in}]"
+                )
+                _overlay(f"v{n_in}", _anchor(pos.get("x"), "center", "W", "w"), _anchor(pos.get("y"), "bottom", "H", "h"))
+                n_in += 1
+
+        elif t == "audio":
+            continue        # audio_path로 (audio_mix)
+
+        else:
+            raise UnsupportedTimeline(f"지원하지 않는 타입: {t}")
+
+    if subtitle_file:
+        if "subtitles" not in filters_available:
+            raise UnsupportedTimeline("subtitles 필터가 없는 ffmpeg 빌드")
+        n_layer += 1
+        graph.append(f"[{cur}]subtitles=filename='{_escape(os.path.abspath(subtitle_file))}'[base{n_layer}]")
+        cur = f"base{n_layer}"
+
+    graph.append(f"[{cur}]format=yuv420p[vout]")
+    maps = ["-map", "[vout]"]
+    if audio_path:
+        inputs += ["-i", audio_path]
+        maps += ["-map", f"{n_in}:a", "-c:a", "copy"]
+
+    script = os.path.join(workdir, "filter_complex.txt")
+    with open(script, "w", encoding="utf-8") as f:
+        f.write(";\n".join(graph))
+
+    return [
+        "ffmpeg", "-y", "-nostdin", "-loglevel", "error",
+        *inputs,
+        "-filter_complex_script", script,
+        *maps,
+        "-c:v", "libx264", "-preset", preset, "-crf", str(crf),
+        "-r", str(fps), "-t", f"{total:.3f}",
+        "-threads", str(threads),
+        "-movflags", "+faststart",
+        output_path,
+    ]
+
+
+def render_ffmpeg(
+    timeline_json: dict,
+    output_path: str = "output.mp4",
+    resolution: Tuple[int, int] = (1080, 1920),
+    fps: int = 30,
+    font: str = "NanumGothic",
+    raster_cache: Optional[RasterCache] = None,
+    stats: Optional[Dict[str, float]] = None,
+    subtitle_file: Optional[str] = None,
+    transcripts: Optional[dict] = None,
+    video_audio: Optional[bool] = None,
+    **encode,
+) -> str:
+    # transcripts / video_audio는 mix_timeline_audio와 같음 (moviepy 백엔드와 같은 소리)
+    t0 = time.perf_counter()
+    audio_stats: Dict[str, float] = {}
+    with tempfile.TemporaryDirectory(prefix="capup_ffrender_") as workdir:
+        visual = [float(it["end"]) for it in timeline_json["timeline"] if it["type"] in ("video", "image", "subtitle")]
+        audio_path = mix_timeline_audio(timeline_json, os.path.join(workdir, "audio.m4a"),
+                                        duration=max(visual, default=0.0), transcripts=transcripts,
+                                        video_audio=video_audio, stats=audio_stats)
+        command = build_command(timeline_json, output_path, workdir, resolution, fps, font, raster_cache,
+                                subtitle_file=subtitle_file, audio_path=audio_path, **encode)
+        try:
+            subprocess.run(command, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        except subprocess.CalledProcessError as e:
+            raise RuntimeError(f"ffmpeg 렌더링 실패: {e.stderr.decode('utf-8', errors='replace')}")
+    if stats is not None:
+        stats.update({"render_sec": round(time.perf_counter() - t0, 3), "ffmpeg_inputs": command.count("-i"),
+                      **audio_stats})
+    return output_path
@@ -1,36 +1,36 @@
 import json
 import os
+import sys
+import tempfile
+import time
+from typing import Dict, Optional
 from moviepy.editor import (
     VideoFileClip, AudioFileClip, ImageClip, TextClip,
-    CompositeVideoClip, CompositeAudioClip, vfx
+    CompositeVideoClip, vfx
 )
 
+# 공용 모듈(capUp/shared) - 상위 폴더를 뒤에 추가해 이 폴더의 같은 이름 모듈(benchmark.py 등)을 가리지 않음
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from shared.timeline_index import TimelineIndex
+from audio_mix import mix_timeline_audio
+from clip_pool import ClipPool
+from raster_cache import RasterCache, get_default_cache, image_raster, subtitle_raster, to_clip
+from ffmpeg_render import UnsupportedTimeline, render_ffmpeg
 
-def render_shorts_from_timeline(
-    timeline_json: dict,
-    output_path: str = "output.mp4",
-    resolution=(1080, 1920),
-    fps: int = 30,
-    font: str = "NanumGothic",   # 시스템에 설치된 한글 폰트
-    instruction: str = None,
-):
-    """
-    Timeline JSON을 받아 최종 쇼츠 mp4 영상으로 합성
-    - 영상/이미지 해상도 통일 (기본: 1080x1920)
-    - 오디오 여러 개면 CompositeAudioClip으로 믹싱
-    - 자막 반투명 배경 포함 + 한국어 폰트 지정
-    - 타임라인 정렬로 안정적 처리
-    - 메모리 해제 고려
-    """
+RENDER_BACKEND = os.environ.get("RENDER_BACKEND", "moviepy")
+RENDER_WORKERS = int(os.environ.get("RENDER_WORKERS", "1"))   # 2 이상이면 구간 병렬 렌더링 (0: CPU 수)
 
-    
-    
 
+def _build_clips(timeline_json: dict, resolution, font: str, pool: ClipPool, raster: RasterCache):
+    # 화면 클립만 (오디오는 audio_mix에서 따로 믹싱)
     clips = []
-    audio_tracks = []
 
-    # 타임라인 정렬 (시작시간 기준)
-    sorted_items = sorted(timeline_json["timeline"], key=lambda x: float(x["start"]))
+    # 타임라인 정렬 (시작시간 기준) + 화면이 비는 구간 확인
+    index = TimelineIndex(timeline_json["timeline"])
+    sorted_items = [span.item for span in index.items()]
+    blank = index.gaps(("video", "image"), 0.0, index.end(), min_gap=0.05)
+    if blank:
+        print(f"화면이 비는 구간: {[(round(a, 2), round(b, 2)) for a, b in blank]}")
 
     for item in sorted_items:
         t = item["type"]
@@ -39,73 +39,129 @@ def render_shorts_from_timeline(
 
         # --- Video ---
         if t == "video" and item.get("filename"):
-            clip = VideoFileClip(item["filename"]).subclip(start, end)
+            # source_start: 원본에서 잘라 올 위치 (없으면 타임라인 시각과 같음)
+            src = item.get("source_start")
+            src = start if src is None else float(src)
+            clip = pool.video(item["filename"]).subclip(src, src + (end - start))
             clip = clip.resize(resolution)
             clip = clip.set_start(start).crossfadein(0.2)  # 전환 효과
             clips.append(clip)
 
         # --- Image ---
         elif t == "image" and item.get("filename"):
-            img = ImageClip(item["filename"], duration=duration).resize(resolution)
-            pos = (item.get("position", {}).get("x", "center"),
-                   item.get("position", {}).get("y", "center"))
+            img = to_clip(image_raster(raster, item["filename"], resolution), duration)
+            pos = ((item.get("position") or {}).get("x", "center"),
+                   (item.get("position") or {}).get("y", "center"))
             img = img.set_start(start).set_pos(pos).crossfadein(0.3)
             clips.append(img)
 
         # --- Subtitle ---
         elif t == "subtitle" and item.get("text"):
-            txt = TextClip(
-                item["text"],
-                fontsize=48,
-                font=font,
-                color="white",
-                size=(800, 120),
-                method="caption"
-            )
-            # 반투명 배경 추가
-            txt = txt.on_color(
-                size=(820, 140), color=(0, 0, 0), col_opacity=0.6
-            )
+            # 같은 텍스트/스타일은 한 번만 그림 (반투명 배경 포함)
+            txt = to_clip(subtitle_raster(raster, item["text"], font), duration)
 
-            pos = (item.get("position", {}).get("x", "center"),
-                   item.get("position", {}).get("y", "bottom"))
+            pos = ((item.get("position") or {}).get("x", "center"),
+                   (item.get("position") or {}).get("y", "bottom"))
 
-            txt_clip = txt.set_duration(duration).set_start(start).set_pos(pos).crossfadein(0.3)
+            txt_clip = txt.set_start(start).set_pos(pos).crossfadein(0.3)
             clips.append(txt_clip)
 
-        # --- Audio ---
-        elif t == "audio" and item.get("filename"):
-            aud = AudioFileClip(item["filename"]).subclip(start, end)
-            audio_tracks.append(aud.set_start(start))
-
-    # 영상 합치기
-    if clips:
-        video = CompositeVideoClip(clips, size=resolution)
-    else:
-        raise ValueError("타임라인에 video/image/subtitle이 없음")
-
-    # 오디오 합치기
-    if audio_tracks:
-        final_audio = CompositeAudioClip(audio_tracks)
-        video = video.set_audio(final_audio)
-
-    #  최종 출력 (속도 최적화 preset 포함)
-    video.write_videofile(
-        output_path,
-        codec="libx264",
-        audio_codec="aac",
-        fps=fps,
-        preset="fast",
-        threads=4
-    )
-
-    #  자원 해제
-    for c in clips:
-        c.close()
-    if audio_tracks:
-        for a in audio_tracks:
-            a.close()
-    video.close()
+    return clips
+
+
+def render_shorts_from_timeline(
+    timeline_json: dict,
+    output_path: str = "output.mp4",
+    resolution=(1080, 1920),
+    fps: int = 30,
+    font: str = "NanumGothic",   # 시스템에 설치된 한글 폰트
+    instruction: str = None,
+    clip_pool: Optional[ClipPool] = None,   # 여러 렌더에서 원본 리더를 공유하려면 지정 (닫는 건 호출한 쪽)
+    raster_cache: Optional[RasterCache] = None,     # 없으면 프로세스 기본 캐시
+    stats: Optional[Dict[str, float]] = None,
+    backend: str = RENDER_BACKEND,          # "moviepy" | "ffmpeg"
+    workers: int = RENDER_WORKERS,          # moviepy 백엔드 구간 병렬 렌더링 프로세스 수
+    transcripts: Optional[dict] = None,     # {원본 파일명: Whisper 결과} -> 말소리 아래 BGM ducking
+    video_audio: Optional[bool] = None,     # True면 audio 항목(BGM)이 있어도 영상 소리를 함께 믹싱 (audio_mix.audio_tracks)
+    subtitle_file: Optional[str] = None,    # SRT/ASS 자막 파일 (ffmpeg 백엔드에서 번인)
+):
+    """
+    Timeline JSON을 받아 최종 쇼츠 mp4 영상으로 합성
+    - 영상/이미지 해상도 통일 (기본: 1080x1920)
+    - 오디오는 audio_mix로 믹싱 (원본별 PCM 한 번 디코딩, 블록 단위로 인코더에 바로 전달)
+    - 자막 반투명 배경 포함 + 한국어 폰트 지정
+    - 타임라인 정렬로 안정적 처리
+    - 원본 파일별 리더 재사용 (ClipPool), 끝나면(실패해도) 해제
+    - 자막/이미지 래스터 캐시 (RasterCache)
+    - backend="ffmpeg"이면 filter_complex 한 번으로 렌더링, 지원하지 않는 타임라인이거나 ffmpeg가 실패하면 moviepy로 대체
+    - workers != 1이면 샷 경계로 나눠 프로세스 풀에서 렌더링 후 재인코딩 없이 이어 붙임 (segment_render)
+    """
+    if backend == "ffmpeg":
+        if workers != 1:
+            print(f"ffmpeg 백엔드는 프로세스 하나로 렌더링 (workers={workers}는 moviepy 백엔드에서만 사용)")
+        try:
+            # 오디오는 moviepy 백엔드와 같은 mix_timeline_audio (transcripts/video_audio 그대로)
+            render_ffmpeg(timeline_json, output_path, resolution, fps, font, raster_cache, stats,
+                          subtitle_file=subtitle_file, transcripts=transcripts, video_audio=video_audio)
+            if stats is not None:
+                stats["backend"] = "ffmpeg"
+            return
+        except UnsupportedTimeline as e:
+            print(f"ffmpeg 백엔드 미지원 -> moviepy로 렌더링: {e}")
+        except RuntimeError as e:
+            print(f"ffmpeg 백엔드 실패 -> moviepy로 렌더링: {e}")
+    elif backend != "moviepy":
+        raise ValueError(f"알 수 없는 backend: {backend}")
+    if subtitle_file:
+        print(f"moviepy 백엔드는 자막 파일을 번인하지 않음 (타임라인 subtitle 항목만 사용): {subtitle_file}")
+
+    if workers != 1:
+        # segment_render가 이 모듈의 _build_clips를 쓰므로 여기서 import
+        from segment_render import render_segmented
+        render_segmented(timeline_json, output_path, resolution, fps, font, workers=workers or None,
+                         transcripts=transcripts, video_audio=video_audio, stats=stats)
+        if stats is not None:
+            stats["backend"] = "moviepy-segments"
+        return
+
+    t0 = time.perf_counter()
+    pool = clip_pool if clip_pool is not None else ClipPool()
+    raster = raster_cache if raster_cache is not None else get_default_cache()
+    video = None
+    audio_stats = {}
+    try:
+        clips = _build_clips(timeline_json, resolution, font, pool, raster)
+
+        # 영상 합치기
+        if clips:
+            video = CompositeVideoClip(clips, size=resolution)
+        else:
+            raise ValueError("타임라인에 video/image/subtitle이 없음")
+
+        with tempfile.TemporaryDirectory(prefix="capup_audio_") as tmp:
+            # 오디오 믹싱 (없으면 무음)
+            audio_path = mix_timeline_audio(timeline_json, os.path.join(tmp, "audio.m4a"), duration=video.duration,
+                                            transcripts=transcripts, video_audio=video_audio, stats=audio_stats)
+
+            #  최종 출력 (속도 최적화 preset 포함)
+            video.write_videofile(
+                output_path,
+                codec="libx264",
+                audio=audio_path or False,
+                fps=fps,
+                preset="fast",
+                threads=4
+            )
+    finally:
+        #  자원 해제: subclip들은 원본 리더를 공유하므로 합성 클립과 풀만 닫음
+        if video is not None:
+            video.close()
+        if clip_pool is None:
+            pool.close()
+
+    if stats is not None:
+        stats.update({"render_sec": round(time.perf_counter() - t0, 3), **pool.stats(),
+                      "raster": raster.stats(), "backend": "moviepy", **audio_stats})
 
 
 # movie.py 직접 실행 시 데모
@@ -0,0 +1,137 @@
+# multi_render.py
+# 같은 타임라인을 여러 규격(쇼츠 1080x1920, 미리보기 720x1280, 저비트레이트 스크럽 등)으로 한 번에 출력
+# 합성(moviepy)은 가장 큰 해상도/fps로 한 번만 하고, 프레임을 ffmpeg 하나에 넘겨
+# split -> 출력별 scale/fps -> 출력별 인코더 (한 프로세스에서 여러 파일)
+# 오디오도 한 번만 만들어 모든 출력에 그대로 복사
+import os
+import subprocess
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+from moviepy.editor import CompositeVideoClip
+
+from audio_mix import mix_timeline_audio
+from clip_pool import ClipPool
+from movie import _build_clips
+from raster_cache import RasterCache, get_default_cache
+
+DEFAULT_OUTPUT = {"fps": None, "codec": "libx264", "preset": "fast", "bitrate": None, "crf": 20, "audio": True}
+
+
+def _normalize(outputs: List[dict]) -> List[dict]:
+    """
+    출력 규격 dict: path(필수), resolution(필수, (w, h)),
+    fps(없으면 합성 fps), codec, preset, bitrate("800k" 등, 없으면 crf), crf, audio(False면 소리 없음)
+    """
+    if not outputs:
+        raise ValueError("출력 규격이 없음")
+    specs = []
+    for out in outputs:
+        if not out.get("path") or not out.get("resolution"):
+            raise ValueError(f"path/resolution이 없는 출력 규격: {out}")
+        spec = {**DEFAULT_OUTPUT, **out}
+        spec["resolution"] = tuple(int(v) for v in spec["resolution"])
+        specs.append(spec)
+    return specs
+
+
+def build_encode_command(specs: List[dict], size, fps: int, audio_path: Optional[str]) -> List[str]:
+    # 표준 입력으로 rgb24 원시 프레임을 받아 출력마다 인코딩
+    W, H = size
+    n = len(specs)
+    graph = [f"[0:v]split={n}" + "".join(f"[s{i}]" for i in range(n)) if n > 1 else "[0:v]null[s0]"]
+    for i, spec in enumerate(specs):
+        w, h = spec["resolution"]
+        chain = f"[s{i}]"
+        if w * H != h * W:
+            # 화면비가 다르면 늘리지 않고 비율 유지 축소 후 검은 여백 (레터박스/필러박스)
+            chain += (f"scale={w}:{h}:force_original_aspect_ratio=decrease:flags=bicubic,"
+                      f"pad={w}:{h}:(ow-iw)/2:(oh-ih)/2,")
+        elif (w, h) != (W, H):
+            chain += f"scale={w}:{h}:flags=bicubic,"
+        chain += f"fps={spec['fps']}," if spec["fps"] and spec["fps"] != fps else ""
+        graph.append(f"{chain}format=yuv420p[o{i}]")
+
+    command = [
+        "ffmpeg", "-y", "-nostdin", "-loglevel", "error",
+        "-f", "rawvideo", "-pix_fmt", "rgb24", "-s", f"{W}x{H}", "-r", str(fps), "-i", "-",
+    ]
+    if audio_path:
+        command += ["-i", audio_path]
+    command += ["-filter_complex", ";".join(graph)]
+    for i, spec in enumerate(specs):
+        command += ["-map", f"[o{i}]", "-c:v", spec["codec"], "-preset", spec["preset"]]
+        if spec["bitrate"]:
+            command += ["-b:v", str(spec["bitrate"]), "-maxrate", str(spec["bitrate"]), "-bufsize", str(spec["bitrate"])]
+        else:
+            command += ["-crf", str(spec["crf"])]
+        if audio_path and spec["audio"]:
+            command += ["-map", "1:a", "-c:a", "copy"]
+        command += ["-movflags", "+faststart", spec["path"]]
+    return command
+
+
+def render_variants(
+    timeline_json: dict,
+    outputs: List[dict],
+    font: str = "NanumGothic",
+    clip_pool: Optional[ClipPool] = None,
+    raster_cache: Optional[RasterCache] = None,
+    transcripts: Optional[dict] = None,
+    video_audio: Optional[bool] = None,
+    stats: Optional[Dict[str, float]] = None,
+) -> List[str]:
+    """
+    render_variants(timeline_json, [
+        {"path": "shorts.mp4", "resolution": (1080, 1920), "fps": 30},
+        {"path": "preview.mp4", "resolution": (720, 1280), "preset": "veryfast"},
+        {"path": "scrub.mp4", "resolution": (270, 480), "fps": 10, "bitrate": "300k", "audio": False},
+    ])
+    합성 해상도는 출력 중 가장 큰 것 (작은 출력은 축소), fps도 가장 큰 것
+    화면비가 합성 해상도와 다른 출력은 늘리지 않고 여백을 넣음 (예: 1080x1920 합성에서 1080x1080)
+    """
+    specs = _normalize(outputs)
+    size = max((s["resolution"] for s in specs), key=lambda r: r[0] * r[1])
+    fps = max(s["fps"] or 30 for s in specs)
+
+    t0 = time.perf_counter()
+    pool = clip_pool if clip_pool is not None else ClipPool()
+    raster = raster_cache if raster_cache is not None else get_default_cache()
+    video = None
+    frames = 0
+    try:
+        clips = _build_clips(timeline_json, size, font, pool, raster)
+        if not clips:
+            raise ValueError("타임라인에 video/image/subtitle이 없음")
+        video = CompositeVideoClip(clips, size=size)
+
+        with tempfile.TemporaryDirectory(prefix="capup_variants_") as tmp:
+            audio_path = None
+            if any(s["audio"] for s in specs):
+                audio_path = mix_timeline_audio(timeline_json, os.path.join(tmp, "audio.m4a"), duration=video.duration,
+                                                transcripts=transcripts, video_audio=video_audio)
+
+            proc = subprocess.Popen(build_encode_command(specs, size, fps, audio_path),
+                                    stdin=subprocess.PIPE, stderr=subprocess.PIPE)
+            try:
+                for frame in video.iter_frames(fps=fps, dtype="uint8"):
+                    proc.stdin.write(frame.tobytes())
+                    frames += 1
+                proc.stdin.close()
+            except BrokenPipeError:
+                pass
+            err = proc.stderr.read()
+            if proc.wait() != 0:
+                raise RuntimeError(f"ffmpeg 다중 출력 실패: {err.decode('utf-8', errors='replace')}")
+    finally:
+        if video is not None:
+            video.close()
+        if clip_pool is None:
+            pool.close()
+
+    if stats is not None:
+        stats.update({"render_sec": round(time.perf_counter() - t0, 3), "outputs": len(specs),
+                      "composite_size": list(size), "composite_fps": fps, "frames": frames,
+                      **pool.stats(), "raster": raster.stats()})
+    return [s["path"] for s in specs]
@@ -0,0 +1,239 @@
+# preview.py
+# 편집기용 빠른 미리보기 - 낮은 해상도/fps + ultrafast 인코딩
+# - 타임라인을 고정 길이 조각(chunk)으로 나눠 조각마다 인코딩, concat(-c copy)으로 이어 붙임
+# - 조각 파일 이름은 그 구간에 보이는 항목 + 렌더 설정의 해시 -> 타임라인을 고쳐도 바뀐 구간만 다시 렌더링
+# - 항목별 포스터 프레임(jpg)도 항목 내용 해시로 캐시
+# - 렌더러마다 cache_dir 아래 자기 하위 폴더를 씀 (다른 렌더러의 파일을 지우지 않도록), close() 또는 종료 시 삭제
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+import weakref
+from typing import Dict, List, Optional, Tuple
+
+from PIL import Image
+
+from raster_cache import get_default_cache, subtitle_raster
+from segment_render import mix_audio, render_segment, segment_timeline, snap_time
+
+PREVIEW_CACHE_DIR = os.environ.get("PREVIEW_CACHE_DIR", os.path.join(tempfile.gettempdir(), "capup_preview"))
+PREVIEW_RESOLUTION = (270, 480)
+PREVIEW_FPS = 12
+CHUNK_SEC = 2.0
+POSTER_SIZE = (180, 320)
+
+
+def _hash(payload) -> str:
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()[:24]
+
+
+def _file_stamp(item: dict):
+    # 같은 경로라도 파일이 바뀌면 다른 해시
+    path = item.get("filename")
+    if not path or not os.path.exists(path):
+        return None
+    st = os.stat(path)
+    return [os.path.abspath(path), st.st_mtime, st.st_size]
+
+
+def _canonical(item: dict) -> str:
+    return json.dumps({**item, "_file": _file_stamp(item)}, sort_keys=True, ensure_ascii=False)
+
+
+class PreviewRenderer:
+    """
+    preview = PreviewRenderer()
+    preview.render(timeline_json, "preview.mp4", stats)   # 처음: 전체 조각 렌더링
+    preview.render(edited_json, "preview.mp4", stats)     # 다음: 바뀐 조각만 (stats["rendered_chunks"])
+    preview.posters(edited_json)                          # 항목별 포스터 jpg 경로 (없으면 None)
+    preview.close()                                       # 캐시 폴더 삭제
+    """
+
+    def __init__(self, cache_dir: str = PREVIEW_CACHE_DIR, resolution: Tuple[int, int] = PREVIEW_RESOLUTION,
+                 fps: int = PREVIEW_FPS, chunk_sec: float = CHUNK_SEC, font: str = "NanumGothic"):
+        os.makedirs(cache_dir, exist_ok=True)
+        self.cache_dir = tempfile.mkdtemp(prefix="renderer_", dir=cache_dir)
+        self.resolution = tuple(resolution)
+        self.fps = fps
+        self.chunk_sec = chunk_sec
+        self.font = font
+        self._keep: set = set()          # 직전 렌더에서 쓴 조각 (되돌리기 대비로 한 번 더 보관)
+        self._poster_keep: set = set()   # 직전 posters()에서 쓴 포스터
+        self._lock = threading.Lock()
+        self._cleanup = weakref.finalize(self, shutil.rmtree, self.cache_dir, True)
+
+    def close(self):
+        self._cleanup()
+
+    def _settings(self) -> dict:
+        return {"resolution": list(self.resolution), "fps": self.fps, "font": self.font}
+
+    def chunks(self, timeline_json: dict) -> List[Tuple[float, float]]:
+        visual = [it for it in timeline_json["timeline"] if it["type"] in ("video", "image", "subtitle")]
+        if not visual:
+            raise ValueError("타임라인에 video/image/subtitle이 없음")
+        total = snap_time(max(float(it["end"]) for it in visual), self.fps)
+        points = []
+        t = 0.0
+        while t < total - 1e-6:
+            points.append(t)
+            t = snap_time(t + self.chunk_sec, self.fps)
+        points.append(total)
+        return list(zip(points, points[1:]))
+
+    def _chunk_key(self, part: dict, duration: float) -> str:
+        items = sorted(_canonical(it) for it in part["timeline"])
+        return _hash({"kind": "chunk", "items": items, "duration": round(duration, 6), **self._settings()})
+
+    def _audio_key(self, timeline_json: dict, duration: float) -> str:
+        # 소리에 영향을 주는 항목 (audio 항목, 없으면 video 항목) + 믹싱 길이 (-shortest라 짧으면 영상이 잘림)
+        items = [it for it in timeline_json["timeline"] if it["type"] == "audio"]
+        if not items:
+            items = [it for it in timeline_json["timeline"] if it["type"] == "video"]
+        return _hash({"kind": "audio", "items": sorted(_canonical(it) for it in items), "duration": round(duration, 6)})
+
+    def render(self, timeline_json: dict, output_path: str = "preview.mp4",
+               stats: Optional[Dict[str, float]] = None) -> str:
+        with self._lock:
+            t0 = time.perf_counter()
+            files, rendered = [], 0
+            chunks = self.chunks(timeline_json)
+            for a, b in chunks:
+                part = segment_timeline(timeline_json, a, b)
+                path = os.path.join(self.cache_dir, f"chunk_{self._chunk_key(part, b - a)}.mp4")
+                if not os.path.exists(path):
+                    tmp = f"{path}.{os.getpid()}.tmp.mp4"
+                    render_segment(part, b - a, tmp, resolution=self.resolution, fps=self.fps, font=self.font,
+                                   threads=1, preset="ultrafast")
+                    os.replace(tmp, path)
+                    rendered += 1
+                files.append(path)
+
+            total = chunks[-1][1]
+            audio_path = os.path.join(self.cache_dir, f"audio_{self._audio_key(timeline_json, total)}.m4a")
+            has_audio = os.path.exists(audio_path)
+            if not has_audio:
+                tmp = f"{audio_path}.{os.getpid()}.tmp.m4a"
+                has_audio = mix_audio(timeline_json, total, tmp)
+                if has_audio:
+                    os.replace(tmp, audio_path)
+
+            list_path = os.path.join(self.cache_dir, f"concat_{os.getpid()}.txt")
+            with open(list_path, "w", encoding="utf-8") as f:
+                for path in files:
+                    f.write(f"file '{path}'\n")
+            command = ["ffmpeg", "-y", "-nostdin", "-loglevel", "error", "-f", "concat", "-safe", "0", "-i", list_path]
+            if has_audio:
+                command += ["-i", audio_path, "-map", "0:v", "-map", "1:a", "-shortest"]
+            command += ["-c", "copy", "-movflags", "+faststart", output_path]
+            try:
+                subprocess.run(command, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+            except subprocess.CalledProcessError as e:
+                raise RuntimeError(f"미리보기 이어 붙이기 실패: {e.stderr.decode('utf-8', errors='replace')}")
+
+            used = set(files) | ({audio_path} if has_audio else set())
+            self._prune(("chunk_", "audio_"), used | self._keep)
+            self._keep = used
+
+            if stats is not None:
+                stats.update({
+                    "render_sec": round(time.perf_counter() - t0, 3),
+                    "chunks": len(files),
+                    "rendered_chunks": rendered,
+                })
+            return output_path
+
+    def _prune(self, prefixes: Tuple[str, ...], keep: set):
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            if name.startswith(prefixes) and ".tmp" not in name and path not in keep:
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+
+    # ---------------------------
+    # 포스터 프레임
+    # ---------------------------
+    def poster(self, item: dict) -> Optional[str]:
+        t = item.get("type")
+        if t in ("video", "image") and _file_stamp(item) is None:
+            return None
+        if t == "subtitle" and not item.get("text"):
+            return None
+        if t not in ("video", "image", "subtitle"):
+            return None
+
+        # 포스터에 영향을 주는 값만 해시 (자막 시각이 바뀌어도 같은 그림)
+        src = item.get("source_start")
+        src = float(item["start"]) if src is None else float(src)
+        payload = {"type": t, "file": _file_stamp(item), "text": item.get("text"), "size": list(POSTER_SIZE),
+                   "font": self.font}
+        if t == "video":
+            payload["at"] = round(src + (float(item["end"]) - float(item["start"])) / 2, 3)
+        path = os.path.join(self.cache_dir, f"poster_{_hash(payload)}.jpg")
+        if os.path.exists(path):
+            return path
+
+        tmp = f"{path}.{os.getpid()}.tmp.jpg"
+        w, h = POSTER_SIZE
+        if t == "video":
+            # 컷 가운데 프레임 (원본 위치 기준)
+            command = [
+                "ffmpeg", "-y", "-nostdin", "-loglevel", "error",
+                "-ss", f"{payload['at']:.3f}", "-i", item["filename"],
+                "-frames:v", "1", "-vf", f"scale={w}:{h}:force_original_aspect_ratio=decrease,"
+                                         f"pad={w}:{h}:(ow-iw)/2:(oh-ih)/2", tmp,
+            ]
+            if subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL).returncode != 0:
+                return None
+        elif t == "image":
+            try:
+                with Image.open(item["filename"]) as img:
+                    img = img.convert("RGB")
+                    img.thumbnail(POSTER_SIZE)
+                    img.save(tmp, "JPEG", quality=80)
+            except Exception as e:
+                print(f"이미지 포스터 실패: {item['filename']} - {e}")
+                if os.path.exists(tmp):
+                    os.remove(tmp)
+                return None
+        else:
+            try:
+                rgba = subtitle_raster(get_default_cache(), item["text"], self.font)
+            except Exception as e:
+                print(f"자막 포스터 실패: {e}")
+                return None
+            img = Image.fromarray(rgba).convert("RGB")
+            img.thumbnail(POSTER_SIZE)
+            img.save(tmp, "JPEG", quality=80)
+        os.replace(tmp, path)
+        return path
+
+    def posters(self, timeline_json: dict) -> List[Optional[str]]:
+        # timeline_json["timeline"]과 같은 순서, 이번/직전 호출에서 쓰지 않은 포스터는 삭제
+        paths = [self.poster(it) for it in timeline_json["timeline"]]
+        with self._lock:
+            used = {p for p in paths if p}
+            self._prune(("poster_",), used | self._poster_keep)
+            self._poster_keep = used
+        return paths
+
+
+_renderers: Dict[tuple, PreviewRenderer] = {}
+_renderers_lock = threading.Lock()
+
+
+def render_preview(timeline_json: dict, output_path: str = "preview.mp4", cache_dir: str = PREVIEW_CACHE_DIR,
+                   stats: Optional[Dict[str, float]] = None, **kwargs) -> str:
+    # 같은 캐시 디렉터리/설정이면 같은 PreviewRenderer를 재사용 (직전 타임라인과 비교)
+    key = (cache_dir, tuple(sorted((k, str(v)) for k, v in kwargs.items())))
+    with _renderers_lock:
+        renderer = _renderers.get(key)
+        if renderer is None:
+            renderer = _renderers[key] = PreviewRenderer(cache_dir, **kwargs)
+    return renderer.render(timeline_json, output_path, stats)
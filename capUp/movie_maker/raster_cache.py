@@ -0,0 +1,187 @@
+# raster_cache.py
+# 자막/이미지 래스터 캐시 - 같은 자막(텍스트+스타일)과 같은 이미지(경로+mtime+크기)는 한 번만 그림
+# 메모리 LRU(바이트 기준) + 선택적으로 디스크(.npy)
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+import numpy as np
+from moviepy.editor import ImageClip, TextClip
+
+DEFAULT_MAX_BYTES = int(os.environ.get("RASTER_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+DEFAULT_DISK_DIR = os.environ.get("RASTER_CACHE_DIR")      # 없으면 메모리만 사용
+DEFAULT_DISK_MAX_BYTES = int(os.environ.get("RASTER_CACHE_DISK_MAX_BYTES", str(2 * 1024 * 1024 * 1024)))
+
+
+def make_key(kind: str, params: Dict[str, Any]) -> str:
+    payload = json.dumps({"kind": kind, "params": params}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class RasterCache:
+    """
+    get_or_render(key, render) -> uint8 배열 (H, W, 3) 또는 알파가 있으면 (H, W, 4)
+    반환 배열은 읽기 전용 (여러 클립이 공유)
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES, disk_dir: Optional[str] = DEFAULT_DISK_DIR,
+                 disk_max_bytes: int = DEFAULT_DISK_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self.disk_max_bytes = disk_max_bytes
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._items: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, f"{key}.npy")
+
+    def _remember(self, key: str, arr: np.ndarray) -> None:
+        with self._lock:
+            if key in self._items:
+                return
+            self._items[key] = arr
+            self._bytes += arr.nbytes
+            while self._bytes > self.max_bytes and len(self._items) > 1:
+                _, old = self._items.popitem(last=False)
+                self._bytes -= old.nbytes
+
+    def get_or_render(self, key: str, render: Callable[[], np.ndarray]) -> np.ndarray:
+        with self._lock:
+            arr = self._items.get(key)
+            if arr is not None:
+                self._items.move_to_end(key)
+                self.hits += 1
+                return arr
+
+        if self.disk_dir:
+            path = self._disk_path(key)
+            try:
+                arr = np.load(path)
+                os.utime(path)  # LRU 기준 갱신
+                arr.setflags(write=False)
+                with self._lock:
+                    self.disk_hits += 1
+                self._remember(key, arr)
+                return arr
+            except (FileNotFoundError, ValueError, OSError):
+                pass
+
+        with self._lock:
+            self.misses += 1
+        arr = np.ascontiguousarray(render(), dtype=np.uint8)
+        arr.setflags(write=False)
+        self._remember(key, arr)
+
+        if self.disk_dir:
+            path = self._disk_path(key)
+            tmp = f"{path}.{threading.get_ident()}.tmp.npy"
+            np.save(tmp, arr)
+            os.replace(tmp, path)
+            self._evict_disk()
+        return arr
+
+    def _evict_disk(self) -> None:
+        entries = []
+        for name in os.listdir(self.disk_dir):
+            if not name.endswith(".npy") or ".tmp" in name:
+                continue
+            try:
+                st = os.stat(os.path.join(self.disk_dir, name))
+            except FileNotFoundError:
+                continue
+            entries.append((st.st_mtime, st.st_size, name))
+        total = sum(e[1] for e in entries)
+        for _, size, name in sorted(entries):
+            if total <= self.disk_max_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.disk_dir, name))
+                total -= size
+            except FileNotFoundError:
+                pass
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.disk_hits + self.misses
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": round((self.hits + self.disk_hits) / total, 3) if total else 0.0,
+                "entries": len(self._items),
+                "bytes": self._bytes,
+            }
+
+
+_default: Optional[RasterCache] = None
+_default_lock = threading.Lock()
+
+
+def get_default_cache() -> RasterCache:
+    # 프로세스 안에서 렌더끼리 공유 (punch_up 뒤 재렌더 등)
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = RasterCache()
+        return _default
+
+
+def _rgba(clip) -> np.ndarray:
+    # 클립 첫 프레임 -> RGB, 마스크가 있으면 알파를 붙여 RGBA
+    rgb = clip.get_frame(0).astype(np.uint8)
+    if clip.mask is None:
+        return rgb
+    alpha = np.clip(clip.mask.get_frame(0) * 255.0, 0, 255).astype(np.uint8)
+    if alpha.min() == 255:
+        return rgb
+    return np.dstack([rgb, alpha])
+
+
+def to_clip(arr: np.ndarray, duration: float) -> ImageClip:
+    # RGBA면 ImageClip이 알파를 마스크로 분리
+    return ImageClip(arr, duration=duration)
+
+
+def subtitle_raster(cache: RasterCache, text: str, font: str, fontsize: int = 48, color: str = "white",
+                    size: Tuple[int, int] = (800, 120), bg_size: Tuple[int, int] = (820, 140),
+                    bg_color: Tuple[int, int, int] = (0, 0, 0), bg_opacity: float = 0.6) -> np.ndarray:
+    params = {"text": text, "font": font, "fontsize": fontsize, "color": color, "size": list(size),
+              "bg_size": list(bg_size), "bg_color": list(bg_color), "bg_opacity": bg_opacity}
+
+    def _render():
+        txt = TextClip(text, fontsize=fontsize, font=font, color=color, size=size, method="caption")
+        # 반투명 배경 추가
+        txt = txt.on_color(size=bg_size, color=bg_color, col_opacity=bg_opacity)
+        try:
+            return _rgba(txt)
+        finally:
+            txt.close()
+
+    return cache.get_or_render(make_key("subtitle", params), _render)
+
+
+def image_raster(cache: RasterCache, path: str, resolution: Tuple[int, int]) -> np.ndarray:
+    path = os.path.abspath(path)
+    params = {"path": path, "mtime": os.path.getmtime(path), "size": list(resolution)}
+
+    def _render():
+        img = ImageClip(path).resize(resolution)
+        try:
+            return _rgba(img)
+        finally:
+            img.close()
+
+    return cache.get_or_render(make_key("image", params), _render)
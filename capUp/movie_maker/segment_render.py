@@ -0,0 +1,168 @@
+# segment_render.py
+# 타임라인을 샷 경계에서 여러 구간으로 나눠 프로세스 풀에서 동시에 렌더링하고
+# ffmpeg concat(-c copy, 재인코딩 없음)으로 이어 붙임. 오디오는 전체 길이로 한 번만 믹싱
+# - 경계는 video 시작 시각(샷 경계) 중 균등 분할 지점에 가까운 것, 프레임 격자에 맞춤
+# - 경계에 걸친 항목(이전 샷 꼬리, 이미지/자막)은 다음 구간에서 시작 시각을 음수로 옮겨 그대로 이어서 그림
+#   (crossfadein은 클립 자체 시간 기준이라 구간이 바뀌어도 페이드가 끊기지 않음)
+import os
+import subprocess
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from moviepy.editor import CompositeVideoClip
+
+from audio_mix import mix_timeline_audio
+from clip_pool import ClipPool
+from movie import _build_clips
+from raster_cache import get_default_cache
+
+MIN_SEGMENT_SEC = 1.0
+
+
+def snap_time(t: float, fps: int) -> float:
+    # 구간 길이가 프레임 수로 딱 떨어져야 이어 붙였을 때 시각이 밀리지 않음
+    return round(t * fps) / fps
+
+
+def split_points(timeline_json: dict, segments: int, fps: int = 30) -> List[float]:
+    """
+    [0, t1, t2, ..., total] (샷 경계 기준 구간 경계)
+    샷 경계가 부족하면 구간 수가 segments보다 적을 수 있음
+    """
+    items = timeline_json["timeline"]
+    visual = [it for it in items if it["type"] in ("video", "image", "subtitle")]
+    if not visual:
+        raise ValueError("타임라인에 video/image/subtitle이 없음")
+    total = snap_time(max(float(it["end"]) for it in visual), fps)
+    shots = sorted({snap_time(float(it["start"]), fps) for it in items if it["type"] == "video"})
+    shots = [t for t in shots if MIN_SEGMENT_SEC <= t <= total - MIN_SEGMENT_SEC]
+
+    points = [0.0]
+    for k in range(1, max(1, segments)):
+        target = total * k / segments
+        cand = [t for t in shots if t - points[-1] >= MIN_SEGMENT_SEC]
+        if not cand:
+            break
+        best = min(cand, key=lambda t: abs(t - target))
+        if best - points[-1] < MIN_SEGMENT_SEC or total - best < MIN_SEGMENT_SEC:
+            continue
+        points.append(best)
+    points.append(total)
+    return points
+
+
+def segment_timeline(timeline_json: dict, a: float, b: float) -> dict:
+    # [a, b)에 보이는 항목만 남기고 a를 0으로 옮김, 끝은 b에서 자름 (오디오는 전체 믹싱에서 처리)
+    out = []
+    for it in timeline_json["timeline"]:
+        if it["type"] == "audio":
+            continue
+        start, end = float(it["start"]), float(it["end"])
+        if end <= a or start >= b:
+            continue
+        moved = dict(it)
+        moved["start"] = start - a
+        moved["end"] = min(end, b) - a
+        if it["type"] == "video":
+            # 원본 위치는 그대로 (source_start가 없던 항목은 원래 타임라인 시각)
+            moved["source_start"] = start if it.get("source_start") is None else float(it["source_start"])
+        out.append(moved)
+    return {"timeline": out}
+
+
+def render_segment(timeline_json: dict, duration: float, output_path: str, resolution: Tuple[int, int] = (1080, 1920),
+                   fps: int = 30, font: str = "NanumGothic", threads: int = 1, preset: str = "fast") -> float:
+    # 구간 하나(segment_timeline 결과)를 소리 없이 인코딩, 걸린 시간 반환
+    t0 = time.perf_counter()
+    video = None
+    with ClipPool() as pool:
+        try:
+            clips = _build_clips(timeline_json, resolution, font, pool, get_default_cache())
+            video = CompositeVideoClip(clips, size=resolution).set_duration(duration)
+            video.write_videofile(output_path, codec="libx264", fps=fps, preset=preset, threads=threads,
+                                  audio=False, logger=None)
+        finally:
+            if video is not None:
+                video.close()
+    return time.perf_counter() - t0
+
+
+def _render_job(job: Tuple[dict, float, str, Tuple[int, int], int, str, int, str]) -> float:
+    # 프로세스 풀 작업 (jobs 튜플 순서 그대로)
+    timeline_json, duration, output_path, resolution, fps, font, threads, preset = job
+    return render_segment(timeline_json, duration, output_path, resolution=resolution, fps=fps, font=font,
+                          threads=threads, preset=preset)
+
+
+def mix_audio(timeline_json: dict, duration: float, output_path: str, transcripts: Optional[dict] = None,
+              video_audio: Optional[bool] = None) -> bool:
+    # 전체 길이 오디오 한 번 (movie.py와 같은 믹서)
+    return mix_timeline_audio(timeline_json, output_path, duration=duration, transcripts=transcripts,
+                              video_audio=video_audio) is not None
+
+
+def render_segmented(
+    timeline_json: dict,
+    output_path: str = "output.mp4",
+    resolution=(1080, 1920),
+    fps: int = 30,
+    font: str = "NanumGothic",
+    workers: Optional[int] = None,
+    segments: Optional[int] = None,
+    preset: str = "fast",
+    transcripts: Optional[dict] = None,
+    video_audio: Optional[bool] = None,
+    stats: Optional[Dict[str, float]] = None,
+) -> str:
+    """
+    workers: 프로세스 수 (기본: CPU 수), segments: 구간 수 (기본: workers)
+    각 프로세스의 x264 스레드는 CPU 수 / workers
+    """
+    t0 = time.perf_counter()
+    cpus = os.cpu_count() or 1
+    workers = max(1, workers or cpus)
+    segments = max(1, segments or workers)
+    threads = max(1, cpus // workers)
+    points = split_points(timeline_json, segments, fps)
+
+    with tempfile.TemporaryDirectory(prefix="capup_segments_") as tmp:
+        jobs = []
+        for i, (a, b) in enumerate(zip(points, points[1:])):
+            jobs.append((segment_timeline(timeline_json, a, b), b - a, os.path.join(tmp, f"seg_{i:03d}.mp4"),
+                         tuple(resolution), fps, font, threads, preset))
+
+        with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as ex:
+            audio_future = ex.submit(mix_audio, timeline_json, points[-1], os.path.join(tmp, "audio.m4a"), transcripts,
+                                     video_audio)
+            segment_sec = list(ex.map(_render_job, jobs))
+            has_audio = audio_future.result()
+        encode_sec = time.perf_counter() - t0
+
+        t1 = time.perf_counter()
+        list_path = os.path.join(tmp, "segments.txt")
+        with open(list_path, "w", encoding="utf-8") as f:
+            for job in jobs:
+                f.write(f"file '{job[2]}'\n")
+        command = ["ffmpeg", "-y", "-nostdin", "-loglevel", "error", "-f", "concat", "-safe", "0", "-i", list_path]
+        if has_audio:
+            command += ["-i", os.path.join(tmp, "audio.m4a"), "-map", "0:v", "-map", "1:a", "-shortest"]
+        command += ["-c", "copy", "-movflags", "+faststart", output_path]
+        try:
+            subprocess.run(command, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        except subprocess.CalledProcessError as e:
+            raise RuntimeError(f"구간 이어 붙이기 실패: {e.stderr.decode('utf-8', errors='replace')}")
+        concat_sec = time.perf_counter() - t1
+
+    if stats is not None:
+        stats.update({
+            "render_sec": round(time.perf_counter() - t0, 3),
+            "workers": workers,
+            "segments": len(jobs),
+            "split_points": [round(p, 3) for p in points],
+            "segment_sec": [round(s, 3) for s in segment_sec],
+            "encode_sec": round(encode_sec, 3),
+            "concat_sec": round(concat_sec, 3),
+        })
+    return output_path
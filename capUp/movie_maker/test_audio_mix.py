@@ -0,0 +1,49 @@
+# test_audio_mix.py
+# BGM + transcripts 조합에서 ducking이 영상 소리가 섞일 때만 적용되는지 확인 (ffmpeg 필요)
+# 실행: python -m pytest -q test_audio_mix.py
+import subprocess
+
+import pytest
+
+from audio_mix import PcmCache, mix_timeline_audio
+
+SECONDS = 4.0
+TRANSCRIPTS = {"speech.mp4": [{"word": "안녕하세요", "start": 1.0, "end": 2.0}]}
+
+
+def _ffmpeg(*args):
+    subprocess.run(["ffmpeg", "-y", "-nostdin", "-loglevel", "error", *args], check=True)
+
+
+@pytest.fixture
+def timeline(tmp_path):
+    video = str(tmp_path / "speech.mp4")
+    bgm = str(tmp_path / "bgm.m4a")
+    _ffmpeg("-f", "lavfi", "-i", f"testsrc=s=64x64:d={SECONDS}", "-f", "lavfi", "-i", f"sine=frequency=300:duration={SECONDS}",
+            "-shortest", "-c:v", "libx264", "-c:a", "aac", video)
+    _ffmpeg("-f", "lavfi", "-i", f"sine=frequency=500:duration={SECONDS}", "-ac", "2", "-c:a", "aac", bgm)
+    return {"timeline": [
+        {"type": "video", "filename": video, "start": 0.0, "end": SECONDS},
+        {"type": "audio", "filename": bgm, "start": 0.0, "end": SECONDS},
+    ]}
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return PcmCache(disk_dir=str(tmp_path / "pcm"))
+
+
+def test_bgm_transcripts_without_video_audio_skips_ducking(timeline, cache, tmp_path):
+    stats = {}
+    out = mix_timeline_audio(timeline, str(tmp_path / "mix.m4a"), transcripts=TRANSCRIPTS, cache=cache, stats=stats)
+    assert out is not None
+    assert stats["audio_tracks"] == 1       # BGM만 (영상 소리는 video_audio=True일 때만)
+    assert stats["speech_ranges"] == 0      # 말소리가 없는 믹스에서 BGM을 줄이지 않음
+
+
+def test_bgm_transcripts_with_video_audio_ducks(timeline, cache, tmp_path):
+    stats = {}
+    mix_timeline_audio(timeline, str(tmp_path / "mix.m4a"), transcripts=TRANSCRIPTS, video_audio=True,
+                       cache=cache, stats=stats)
+    assert stats["audio_tracks"] == 2
+    assert stats["speech_ranges"] == 1
@@ -0,0 +1 @@
+# 여러 폴더(langchain, movie_maker)가 함께 쓰는 순수 파이썬 모듈
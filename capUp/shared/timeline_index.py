@@ -0,0 +1,192 @@
+import math
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+# ---------------------------
+# 타임라인 구간 인덱스
+# ---------------------------
+# 타입(트랙)별로 시작 시각 정렬 배열 + 서브트리 최대 end를 둔 구간 트리(배열형)
+# - overlapping(a, b): [a, b)와 겹치는 항목 O(log n + k)
+# - active_at(t): t 시점에 보이는 항목
+# - coverage(types): 트랙 합집합 길이 (겹치는 구간 중복 없이)
+# - gaps(types): 아무것도 없는 빈 구간
+# 항목은 TimelineItem(pydantic)이든 dict(timeline_json)이든 상관없이 Span으로 감싸서 보관
+# 순수 파이썬만 사용 - langchain, movie_maker 모두 shared.timeline_index로 import
+
+Types = Union[None, str, Iterable[str]]
+
+
+def _get(item, key, default=None):
+    if isinstance(item, dict):
+        return item.get(key, default)
+    return getattr(item, key, default)
+
+
+class Span:
+    __slots__ = ("start", "end", "type", "item")
+
+    def __init__(self, start: float, end: float, type_: str, item=None):
+        self.start = start
+        self.end = end
+        self.type = type_
+        self.item = item        # 원래 타임라인 항목
+
+    def __repr__(self):
+        return f"Span({self.type}, {self.start}, {self.end})"
+
+
+class _Track:
+    __slots__ = ("spans", "max_end", "dirty", "_union")
+
+    def __init__(self):
+        self.spans: List[Span] = []
+        self.max_end: List[float] = []
+        self.dirty = False
+        self._union: Optional[List[Tuple[float, float]]] = None
+
+    def add(self, span: Span):
+        self.spans.append(span)
+        self.dirty = True
+
+    def build(self):
+        if not self.dirty:
+            return
+        self.spans.sort(key=lambda s: (s.start, s.end))
+        self.max_end = [0.0] * len(self.spans)
+        self._build(0, len(self.spans))
+        self._union = None
+        self.dirty = False
+
+    def _build(self, lo: int, hi: int) -> float:
+        # mid 노드에 [lo, hi) 서브트리의 최대 end 저장
+        if lo >= hi:
+            return -math.inf
+        mid = (lo + hi) // 2
+        m = max(self.spans[mid].end, self._build(lo, mid), self._build(mid + 1, hi))
+        self.max_end[mid] = m
+        return m
+
+    def query(self, a: float, b: float, out: List[Span]):
+        self.build()
+        self._query(0, len(self.spans), a, b, out)
+
+    def _query(self, lo: int, hi: int, a: float, b: float, out: List[Span]):
+        if lo >= hi:
+            return
+        mid = (lo + hi) // 2
+        if self.max_end[mid] <= a:      # 서브트리 전체가 a 이전에 끝남
+            return
+        self._query(lo, mid, a, b, out)
+        if self.spans[mid].start < b:   # 오른쪽은 시작이 더 늦으므로 여기서 b 이후면 볼 필요 없음
+            if self.spans[mid].end > a:
+                out.append(self.spans[mid])
+            self._query(mid + 1, hi, a, b, out)
+
+    def union(self) -> List[Tuple[float, float]]:
+        self.build()
+        if self._union is None:
+            merged: List[Tuple[float, float]] = []
+            for s in self.spans:
+                if s.end <= s.start:
+                    continue
+                if merged and s.start <= merged[-1][1]:
+                    if s.end > merged[-1][1]:
+                        merged[-1] = (merged[-1][0], s.end)
+                else:
+                    merged.append((s.start, s.end))
+            self._union = merged
+        return self._union
+
+
+def _merge(intervals: List[Tuple[float, float]]) -> List[Tuple[float, float]]:
+    merged: List[Tuple[float, float]] = []
+    for st, et in sorted(intervals):
+        if merged and st <= merged[-1][1]:
+            if et > merged[-1][1]:
+                merged[-1] = (merged[-1][0], et)
+        else:
+            merged.append((st, et))
+    return merged
+
+
+class TimelineIndex:
+    """
+    index = TimelineIndex(tl.timeline)            # TimelineItem 목록 또는 timeline_json["timeline"]
+    index.active_at(12.0, "subtitle")             # 12초에 떠 있는 자막
+    index.coverage(("video", "image"))            # 화면이 채워진 총 길이
+    index.gaps(("video", "image"), 0, duration)   # 빈 화면 구간
+    """
+
+    def __init__(self, items: Iterable = ()):
+        self.tracks: Dict[str, _Track] = {}
+        for it in items:
+            self.add(it)
+
+    def add(self, item) -> Span:
+        span = Span(float(_get(item, "start")), float(_get(item, "end")), _get(item, "type"), item)
+        self.tracks.setdefault(span.type, _Track()).add(span)
+        return span
+
+    def __len__(self) -> int:
+        return sum(len(t.spans) for t in self.tracks.values())
+
+    def _tracks(self, types: Types) -> List[_Track]:
+        if types is None:
+            return list(self.tracks.values())
+        if isinstance(types, str):
+            types = (types,)
+        return [self.tracks[t] for t in types if t in self.tracks]
+
+    def types(self) -> set:
+        return {t for t, track in self.tracks.items() if track.spans}
+
+    def items(self, types: Types = None) -> List[Span]:
+        # 시작 시각 순서
+        tracks = self._tracks(types)
+        for track in tracks:
+            track.build()
+        spans = [s for track in tracks for s in track.spans]
+        if len(tracks) > 1:
+            spans.sort(key=lambda s: (s.start, s.end))
+        return spans
+
+    def end(self, types: Types = None) -> float:
+        return max((track.union()[-1][1] for track in self._tracks(types) if track.union()), default=0.0)
+
+    def overlapping(self, a: float, b: float, types: Types = None) -> List[Span]:
+        out: List[Span] = []
+        for track in self._tracks(types):
+            track.query(a, b, out)
+        out.sort(key=lambda s: (s.start, s.end))
+        return out
+
+    def active_at(self, t: float, types: Types = None) -> List[Span]:
+        return self.overlapping(t, math.nextafter(t, math.inf), types)
+
+    def union(self, types: Types = None) -> List[Tuple[float, float]]:
+        tracks = self._tracks(types)
+        if len(tracks) == 1:
+            return tracks[0].union()
+        return _merge([iv for track in tracks for iv in track.union()])
+
+    def coverage(self, types: Types = None, a: float = 0.0, b: float = math.inf) -> float:
+        total = 0.0
+        for st, et in self.union(types):
+            total += max(0.0, min(et, b) - max(st, a))
+        return total
+
+    def gaps(self, types: Types = None, a: float = 0.0, b: Optional[float] = None,
+             min_gap: float = 0.0) -> List[Tuple[float, float]]:
+        b = self.end(types) if b is None else b
+        out = []
+        cur = a
+        for st, et in self.union(types):
+            if et <= cur:
+                continue
+            if st >= b or cur >= b:
+                break
+            if st - cur > min_gap:
+                out.append((cur, st))
+            cur = max(cur, et)
+        if b - cur > min_gap:
+            out.append((cur, b))
+        return out
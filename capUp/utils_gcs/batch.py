@@ -0,0 +1,172 @@
+# batch.py
+# 디렉터리/매니페스트 단위 일괄 처리 (utils_gcs 디렉터리에서 실행)
+#   python batch.py ./campaign_videos --out results --workers 4 --cpu 2 --network 8
+#   python batch.py manifest.txt --out results      # 한 줄에 파일 경로 하나 (또는 JSON 배열)
+# 중간에 죽어도 같은 --out으로 다시 실행하면 checkpoint.jsonl 기준으로 완료된 파일은 건너뜀
+import argparse
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, List, Set
+
+from file_utils import check_file_type
+from main import process_file
+from result_cache import get_default_cache
+from stage_limits import StageLimits
+
+CHECKPOINT_NAME = "checkpoint.jsonl"
+
+
+def collect_inputs(source: str) -> List[str]:
+    # 디렉터리면 지원 확장자 파일 전부, 아니면 매니페스트(.json 배열 또는 줄 단위 경로)
+    if os.path.isdir(source):
+        paths = []
+        for root, _, files in os.walk(source):
+            for name in files:
+                path = os.path.join(root, name)
+                if check_file_type(path) != "unknown":
+                    paths.append(path)
+        return sorted(os.path.abspath(p) for p in paths)
+
+    base = os.path.dirname(os.path.abspath(source))
+    with open(source, "r", encoding="utf-8") as f:
+        if source.endswith(".json"):
+            entries = json.load(f)
+        else:
+            entries = [line.strip() for line in f if line.strip() and not line.startswith("#")]
+    return [os.path.abspath(os.path.join(base, p)) for p in entries]
+
+
+def output_dir_for(local_path: str, out_root: str) -> str:
+    # 파일명이 같아도 경로가 다르면 다른 디렉터리
+    stem = os.path.splitext(os.path.basename(local_path))[0]
+    digest = hashlib.sha1(local_path.encode("utf-8")).hexdigest()[:8]
+    return os.path.join(out_root, f"{stem}_{digest}")
+
+
+def load_checkpoint(out_root: str) -> Set[str]:
+    done = set()
+    path = os.path.join(out_root, CHECKPOINT_NAME)
+    if not os.path.exists(path):
+        return done
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue    # 기록 도중 죽어서 잘린 줄
+            if entry.get("status") == "done":
+                done.add(entry["path"])
+    return done
+
+
+def run_batch(
+    paths: List[str],
+    out_root: str = "results",
+    workers: int = 4,
+    cpu_limit: int = None,
+    network_limit: int = 8,
+    report_interval: float = 10.0,
+    bypass_cache: bool = False,
+    use_proxy: bool = False,
+    video_backend: str = "remote",
+) -> Dict[str, int]:
+    os.makedirs(out_root, exist_ok=True)
+    if cpu_limit is None:
+        cpu_limit = max(1, (os.cpu_count() or 1) // 4)
+    limits = StageLimits(cpu=cpu_limit, network=network_limit)
+
+    done = load_checkpoint(out_root)
+    pending = [p for p in paths if p not in done]
+    print(f"[batch] 전체 {len(paths)}개, 완료 {len(paths) - len(pending)}개 건너뜀, 처리 {len(pending)}개")
+
+    ckpt_lock = threading.Lock()
+    ckpt = open(os.path.join(out_root, CHECKPOINT_NAME), "a", encoding="utf-8")
+    counts = {"done": 0, "failed": 0, "skipped": len(paths) - len(pending)}
+    t0 = time.perf_counter()
+    stop = threading.Event()
+
+    def _record(entry: dict):
+        with ckpt_lock:
+            ckpt.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            ckpt.flush()
+            os.fsync(ckpt.fileno())
+
+    def _report():
+        elapsed = time.perf_counter() - t0
+        rate = counts["done"] / elapsed * 60 if elapsed > 0 else 0.0
+        print(f"[batch] {counts['done'] + counts['failed']}/{len(pending)} "
+              f"({rate:.1f} files/min) stages={limits.snapshot()}")
+
+    def _reporter():
+        while not stop.wait(report_interval):
+            _report()
+
+    def _one(path: str):
+        out_dir = output_dir_for(path, out_root)
+        try:
+            result = process_file(
+                path, output_dir=out_dir, limits=limits, bypass_cache=bypass_cache,
+                use_proxy=use_proxy, video_backend=video_backend,
+            )
+        except Exception as e:
+            _record({"path": path, "status": "error", "error": str(e)})
+            raise
+        _record({
+            "path": path,
+            "status": "done",
+            "output_dir": out_dir,
+            "cache_hit": result["cache_hit"],
+            "timings": result["timings"],
+        })
+
+    reporter = threading.Thread(target=_reporter, daemon=True)
+    reporter.start()
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as ex:
+            futures = {ex.submit(_one, p): p for p in pending}
+            for fut in as_completed(futures):
+                try:
+                    fut.result()
+                    counts["done"] += 1
+                except Exception as e:
+                    counts["failed"] += 1
+                    print(f"[batch] 실패: {futures[fut]} - {e}")
+    finally:
+        stop.set()
+        ckpt.close()
+
+    _report()
+    print(f"[batch] 완료 {counts['done']}, 실패 {counts['failed']}, 건너뜀 {counts['skipped']}, "
+          f"캐시 {get_default_cache().stats()}")
+    return counts
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="utils_gcs 일괄 처리")
+    parser.add_argument("source", help="입력 디렉터리 또는 매니페스트 파일")
+    parser.add_argument("--out", default="results")
+    parser.add_argument("--workers", type=int, default=4, help="동시에 처리할 파일 수")
+    parser.add_argument("--cpu", type=int, default=None, help="ffmpeg/Whisper 동시 실행 수")
+    parser.add_argument("--network", type=int, default=8, help="업로드/원격 분석 동시 실행 수")
+    parser.add_argument("--report-interval", type=float, default=10.0)
+    parser.add_argument("--no-cache", action="store_true", help="결과 캐시를 읽지 않고 새로 분석")
+    parser.add_argument("--proxy", action="store_true", help="저해상도 프록시로 영상 분석")
+    parser.add_argument("--video-backend", choices=["remote", "hybrid", "local"], default="remote",
+                        help="샷 전환 분석 위치 (main.VIDEO_BACKENDS 참고)")
+    args = parser.parse_args()
+
+    run_batch(
+        collect_inputs(args.source),
+        out_root=args.out,
+        workers=args.workers,
+        cpu_limit=args.cpu,
+        network_limit=args.network,
+        report_interval=args.report_interval,
+        bypass_cache=args.no_cache,
+        use_proxy=args.proxy,
+        video_backend=args.video_backend,
+    )
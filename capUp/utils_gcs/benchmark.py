@@ -0,0 +1,256 @@
+# benchmark.py
+# 성능 측정용 스크립트 (utils_gcs 디렉터리에서 실행)
+#   python benchmark.py whisper-pool a.wav b.wav c.wav --model-size medium
+#   python benchmark.py whisper-many clips/*.wav --batch-sizes 1 4 8 16 --workers 2
+#   python benchmark.py audio-extract long_video.mp4 [--model-size medium]
+#   python benchmark.py proxy video.mp4 --bucket my-bucket [--height 360 --fps 10]
+#   python benchmark.py shots video.mp4 [--reference raw_result.json] [--tolerance 0.5]
+import argparse
+import json
+import os
+import resource
+import shutil
+import subprocess
+import tempfile
+import sys
+import time
+from typing import List
+
+import whisper_utils
+
+
+def bench_whisper_pool(audio_paths: List[str], model_size: str = "medium") -> dict:
+    # cold: 매 파일마다 모델을 새로 로딩 (기존 동작)
+    cold = []
+    for path in audio_paths:
+        whisper_utils.clear_models()
+        t0 = time.perf_counter()
+        whisper_utils.transcribe_whisper(path, model_size=model_size)
+        cold.append(time.perf_counter() - t0)
+
+    # warm: preload 후 풀에 있는 모델 재사용
+    whisper_utils.clear_models()
+    t0 = time.perf_counter()
+    whisper_utils.preload(model_size)
+    preload_sec = time.perf_counter() - t0
+
+    warm = []
+    for path in audio_paths:
+        t0 = time.perf_counter()
+        whisper_utils.transcribe_whisper(path, model_size=model_size)
+        warm.append(time.perf_counter() - t0)
+
+    print(f"[whisper-pool] files={len(audio_paths)} model={model_size}")
+    print(f"  preload: {preload_sec:.2f}s")
+    for i, (c, w) in enumerate(zip(cold, warm)):
+        print(f"  file {i}: cold {c:.2f}s / warm {w:.2f}s")
+    print(f"  total: cold {sum(cold):.2f}s / warm {sum(warm):.2f}s (+preload {preload_sec:.2f}s)")
+    return {"cold": cold, "warm": warm, "preload": preload_sec}
+
+
+def bench_whisper_many(
+    audio_paths: List[str],
+    model_size: str = "medium",
+    batch_sizes: List[int] = (1, 4, 8, 16),
+    workers: int = None,
+) -> List[dict]:
+    # batch_size별 처리량(오디오 초 / 실제 초) 비교, 첫 실행은 모델 로딩 포함이라 버림
+    whisper_utils.transcribe_many(audio_paths, model_size=model_size, workers=workers)
+    rows = []
+    for bs in batch_sizes:
+        stats = {}
+        whisper_utils.transcribe_many(
+            audio_paths, model_size=model_size, batch_size=bs, workers=workers, stats=stats
+        )
+        rows.append(stats)
+
+    print(f"[whisper-many] files={len(audio_paths)} model={model_size}")
+    for r in rows:
+        print(f"  batch_size={r['batch_size']:>3} workers={r['workers']} "
+              f"wall={r['wall_sec']:.2f}s throughput={r['throughput']:.2f}x")
+    return rows
+
+
+def _run_audio_extract(video_path: str, mode: str, model_size: str = None) -> dict:
+    # 별도 프로세스에서 실행되어 해당 방식의 peak RSS만 측정
+    import file_utils
+
+    t0 = time.perf_counter()
+    if mode == "wav":
+        from faster_whisper import decode_audio
+        audio_path = file_utils.extract_audio(video_path)
+        audio = decode_audio(audio_path)
+        os.remove(audio_path)
+    else:
+        audio = file_utils.load_audio(video_path)
+    extract_sec = time.perf_counter() - t0
+
+    if model_size:
+        whisper_utils.transcribe_whisper(audio, model_size=model_size)
+
+    return {
+        "mode": mode,
+        "samples": int(len(audio)),
+        "extract_sec": extract_sec,
+        "wall_sec": time.perf_counter() - t0,
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+
+def bench_audio_extract(video_path: str, model_size: str = None) -> List[dict]:
+    # temp.wav 경유(기존) vs ffmpeg stdout 스트리밍 비교
+    rows = []
+    for mode in ("wav", "stream"):
+        cmd = [sys.executable, os.path.abspath(__file__), "_audio-extract-run", video_path, mode]
+        if model_size:
+            cmd += ["--model-size", model_size]
+        out = subprocess.run(cmd, check=True, stdout=subprocess.PIPE, text=True).stdout
+        rows.append(json.loads(out.strip().splitlines()[-1]))
+
+    print(f"[audio-extract] {video_path} (whisper: {model_size or '미포함'})")
+    for r in rows:
+        print(f"  {r['mode']:>6}: extract {r['extract_sec']:.2f}s / wall {r['wall_sec']:.2f}s "
+              f"/ peak RSS {r['peak_rss_mb']:.0f}MB")
+    return rows
+
+
+def bench_proxy(video_path: str, bucket: str, height: int = 360, fps: int = 10) -> List[dict]:
+    # 원본 vs 프록시: 업로드 크기, 업로드/분석 시간, 샷 수 비교
+    import proxy
+    from gcs_upload import upload_to_gcs
+    from video import analyze_video
+
+    scratch = tempfile.mkdtemp(prefix="capup_bench_")
+    rows = []
+    try:
+        stem = os.path.splitext(os.path.basename(video_path))[0]
+        t0 = time.perf_counter()
+        proxy_path = proxy.make_proxy(video_path, os.path.join(scratch, f"{stem}_proxy.mp4"), height, fps)
+        transcode_sec = time.perf_counter() - t0
+
+        for mode, path in (("original", video_path), ("proxy", proxy_path)):
+            t0 = time.perf_counter()
+            gcs_uri = upload_to_gcs(path, bucket, "bench")
+            upload_sec = time.perf_counter() - t0
+
+            t0 = time.perf_counter()
+            result = analyze_video(gcs_uri)
+            annotate_sec = time.perf_counter() - t0
+            if mode == "proxy":
+                proxy.map_to_original(result, proxy.probe_video(video_path), proxy.probe_video(proxy_path), fps)
+
+            rows.append({
+                "mode": mode,
+                "bytes": os.path.getsize(path),
+                "transcode_sec": transcode_sec if mode == "proxy" else 0.0,
+                "upload_sec": upload_sec,
+                "annotate_sec": annotate_sec,
+                "shots": len(result["shotAnnotations"]),
+            })
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    print(f"[proxy] {video_path} (proxy {height}p@{fps}fps)")
+    for r in rows:
+        print(f"  {r['mode']:>8}: {r['bytes'] / 1e6:.1f}MB transcode {r['transcode_sec']:.1f}s "
+              f"upload {r['upload_sec']:.1f}s annotate {r['annotate_sec']:.1f}s shots {r['shots']}")
+    return rows
+
+
+def _boundary_scores(predicted: List[float], reference: List[float], tolerance: float) -> dict:
+    # 경계 시각을 tolerance 이내에서 1:1 매칭
+    unmatched = list(reference)
+    tp = 0
+    for t in predicted:
+        best = min(unmatched, key=lambda r: abs(r - t), default=None)
+        if best is not None and abs(best - t) <= tolerance:
+            unmatched.remove(best)
+            tp += 1
+    precision = tp / len(predicted) if predicted else 1.0
+    recall = tp / len(reference) if reference else 1.0
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+    return {"precision": precision, "recall": recall, "f1": f1}
+
+
+def bench_shots(video_path: str, reference_path: str = None, tolerance: float = 0.5) -> dict:
+    # 로컬 샷 감지 처리 속도 + (기준 결과가 있으면) Video Intelligence 대비 정확도
+    import shots
+
+    stats = {}
+    t0 = time.perf_counter()
+    local = shots.detect_shots(video_path, stats=stats)
+    wall = time.perf_counter() - t0
+    video_sec = local[-1]["end"] if local else 0.0
+
+    row = {
+        "shots": len(local),
+        "wall_sec": wall,
+        "frames_per_sec": stats.get("frames", 0) / wall if wall > 0 else 0.0,
+        "realtime_x": video_sec / wall if wall > 0 else 0.0,
+    }
+    print(f"[shots] {video_path}: {row['shots']} shots, {wall:.2f}s, "
+          f"{row['frames_per_sec']:.0f} frames/s (분석 {shots.ANALYSIS_FPS}fps), {row['realtime_x']:.1f}x 실시간")
+
+    if reference_path:
+        with open(reference_path, "r", encoding="utf-8") as f:
+            reference = json.load(f).get("shotAnnotations", [])
+        # 첫 샷 시작(0초)은 경계가 아니므로 제외
+        ref_bounds = [s["start"] for s in reference if s["start"] > 0]
+        pred_bounds = [s["start"] for s in local if s["start"] > 0]
+        row.update(_boundary_scores(pred_bounds, ref_bounds, tolerance))
+        print(f"  vs reference ({len(reference)} shots, ±{tolerance}s): precision {row['precision']:.2f} "
+              f"recall {row['recall']:.2f} f1 {row['f1']:.2f}")
+    return row
+
+
+def main():
+    parser = argparse.ArgumentParser(description="utils_gcs 벤치마크")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("whisper-pool", help="모델 풀 cold vs warm 파일당 지연")
+    p.add_argument("audio_paths", nargs="+")
+    p.add_argument("--model-size", default="medium")
+
+    p = sub.add_parser("whisper-many", help="transcribe_many batch_size별 처리량")
+    p.add_argument("audio_paths", nargs="+")
+    p.add_argument("--model-size", default="medium")
+    p.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 4, 8, 16])
+    p.add_argument("--workers", type=int, default=None)
+
+    p = sub.add_parser("audio-extract", help="temp.wav 경유 vs 스트리밍 오디오 추출 (시간, peak RSS)")
+    p.add_argument("video_path")
+    p.add_argument("--model-size", default=None)
+
+    p = sub.add_parser("_audio-extract-run")
+    p.add_argument("video_path")
+    p.add_argument("mode", choices=["wav", "stream"])
+    p.add_argument("--model-size", default=None)
+
+    p = sub.add_parser("proxy", help="원본 vs 프록시 업로드 크기/분석 소요 시간")
+    p.add_argument("video_path")
+    p.add_argument("--bucket", required=True)
+    p.add_argument("--height", type=int, default=360)
+    p.add_argument("--fps", type=int, default=10)
+
+    p = sub.add_parser("shots", help="로컬 샷 감지 처리 속도/정확도")
+    p.add_argument("video_path")
+    p.add_argument("--reference", default=None, help="Video Intelligence raw_result.json")
+    p.add_argument("--tolerance", type=float, default=0.5)
+
+    args = parser.parse_args()
+    if args.command == "whisper-pool":
+        bench_whisper_pool(args.audio_paths, args.model_size)
+    elif args.command == "whisper-many":
+        bench_whisper_many(args.audio_paths, args.model_size, args.batch_sizes, args.workers)
+    elif args.command == "audio-extract":
+        bench_audio_extract(args.video_path, args.model_size)
+    elif args.command == "proxy":
+        bench_proxy(args.video_path, args.bucket, args.height, args.fps)
+    elif args.command == "shots":
+        bench_shots(args.video_path, args.reference, args.tolerance)
+    elif args.command == "_audio-extract-run":
+        print(json.dumps(_run_audio_extract(args.video_path, args.mode, args.model_size)))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,11 @@
+import hashlib
 import os
 import subprocess
+import tempfile
+from typing import Optional
+import numpy as np
+
+SAMPLE_RATE = 16000
 
 # 확장자 판별
 def check_file_type(file_path: str):
@@ -11,9 +17,22 @@ def check_file_type(file_path: str):
     else:
         return "unknown"
     
-def extract_audio(file_path: str, audio_path: str = "temp.wav") -> str:
+def file_sha256(file_path: str, chunk_size: int = 1 << 20) -> str:
+    # 파일 전체를 메모리에 올리지 않고 청크 단위로 해시
+    h = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+def extract_audio(file_path: str, audio_path: Optional[str] = None) -> str:
     file_type = check_file_type(file_path)
 
+    # 경로를 안 주면 작업마다 고유한 임시 파일 사용 (동시 실행 시 temp.wav 충돌 방지)
+    if audio_path is None and file_type == "video":
+        fd, audio_path = tempfile.mkstemp(prefix="capup_", suffix=".wav")
+        os.close(fd)
+
     # 음성 추출
     if file_type == "video":
         print("영상입니다.")
@@ -22,7 +41,7 @@ def extract_audio(file_path: str, audio_path: str = "temp.wav") -> str:
             "-i", file_path,
             "-vn",                  
             "-acodec", "pcm_s16le", 
-            "-ar", "16000",         
+            "-ar", str(SAMPLE_RATE),
             "-ac", "1",             
             audio_path
         ]
@@ -35,4 +54,61 @@ def extract_audio(file_path: str, audio_path: str = "temp.wav") -> str:
         print("이미지입니다.")
         return None
     else:
-        raise ValueError("지원하지 않는 파일 형식")
\ No newline at end of file
+        raise ValueError("지원하지 않는 파일 형식")
+
+
+def load_audio(file_path: str, chunk_size: int = 1 << 20) -> Optional[np.ndarray]:
+    # ffmpeg stdout(16kHz mono s16le)을 청크 단위로 읽어 float32 배열로 바로 변환 - wav 파일을 거치지 않음
+    file_type = check_file_type(file_path)
+
+    if file_type == "image":
+        print("이미지입니다.")
+        return None
+    if file_type != "video":
+        raise ValueError("지원하지 않는 파일 형식")
+
+    print("영상입니다.")
+    command = [
+        "ffmpeg", "-nostdin",
+        "-loglevel", "error",   # stderr 파이프가 가득 차 멈추지 않도록 에러만 출력
+        "-i", file_path,
+        "-vn",
+        "-f", "s16le",
+        "-acodec", "pcm_s16le",
+        "-ar", str(SAMPLE_RATE),
+        "-ac", "1",
+        "-",
+    ]
+    proc = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+
+    # 버퍼는 필요할 때마다 2배로 키우고, 청크 경계에서 잘린 1바이트는 다음 청크로 넘김
+    buf = np.empty(SAMPLE_RATE * 60, dtype=np.float32)
+    n = 0
+    pending = b""
+    try:
+        while True:
+            chunk = proc.stdout.read(chunk_size)
+            if not chunk:
+                break
+            if pending:
+                chunk = pending + chunk
+            usable = len(chunk) - (len(chunk) % 2)
+            pending = chunk[usable:]
+            samples = np.frombuffer(chunk, dtype=np.int16, count=usable // 2)
+
+            if n + len(samples) > len(buf):
+                new_buf = np.empty(max(len(buf) * 2, n + len(samples)), dtype=np.float32)
+                new_buf[:n] = buf[:n]
+                buf = new_buf
+            np.multiply(samples, 1.0 / 32768.0, out=buf[n:n + len(samples)], casting="unsafe")
+            n += len(samples)
+    finally:
+        proc.stdout.close()
+        stderr = proc.stderr.read()
+        proc.stderr.close()
+        proc.wait()
+
+    if proc.returncode != 0:
+        raise RuntimeError(f"오디오 추출 실패: {stderr.decode('utf-8', errors='replace')}")
+
+    return buf[:n].copy() if n < len(buf) // 2 else buf[:n]
@@ -1,24 +1,124 @@
+from google.api_core.exceptions import NotFound
 from google.cloud import storage
+from google.auth.credentials import AnonymousCredentials
+from google.auth.transport.requests import AuthorizedSession
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+import math
 import os
-import uuid
+import threading
+import google.auth
+import requests
 
-def upload_to_gcs(local_path: str, bucket_name: str, destination_dir: str = "") -> str:
-    client = storage.Client()
-    bucket = client.bucket(bucket_name)
+from file_utils import file_sha256
+
+# 로컬 fake GCS 서버로 테스트할 때는 STORAGE_EMULATOR_HOST=http://localhost:4443 설정 (인증 생략됨)
+POOL_SIZE = int(os.environ.get("GCS_POOL_SIZE", "16"))
+CHUNK_SIZE = 8 * 1024 * 1024                # resumable 업로드 청크 (256KB 배수)
+COMPOSITE_THRESHOLD = 256 * 1024 * 1024     # 이 크기 이상이면 병렬 composite 업로드
+COMPOSITE_PART_SIZE = 64 * 1024 * 1024
+COMPOSITE_MAX_PARTS = 32                    # compose 한 번에 합칠 수 있는 최대 개수
+COMPOSITE_WORKERS = 8
+
+_client: Optional[storage.Client] = None
+_client_lock = threading.Lock()
+
+
+def _pooled_session(credentials) -> AuthorizedSession:
+    # 동시 업로드(조각 병렬 포함) 수만큼 연결을 유지하는 세션
+    session = AuthorizedSession(credentials)
+    adapter = requests.adapters.HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
 
-    
+
+def get_client() -> storage.Client:
+    # 프로세스 전체에서 클라이언트 하나를 공유 (연결 재사용), 세션은 _http 인자로 전달
+    global _client
+    with _client_lock:
+        if _client is None:
+            if os.environ.get("STORAGE_EMULATOR_HOST"):
+                _client = storage.Client(_http=_pooled_session(AnonymousCredentials()))
+            else:
+                credentials, project = google.auth.default(scopes=storage.Client.SCOPE)
+                _client = storage.Client(project=project, credentials=credentials,
+                                         _http=_pooled_session(credentials))
+        return _client
+
+
+def _blob_path(local_path: str, destination_dir: str, content_hash: str) -> str:
+    # 내용 해시를 이름에 포함 - 같은 파일은 같은 blob, 이름만 같은 다른 파일은 다른 blob
     filename = os.path.basename(local_path)
-    # 파일명은 고유해야함
-    gcs_filename = f"{filename}"
+    gcs_filename = f"{content_hash[:16]}_{filename}"
 
     if destination_dir:
-        blob_path = f"test/{gcs_filename}"
-    else:
-        blob_path = gcs_filename
+        return f"{destination_dir.strip('/')}/{gcs_filename}"
+    return gcs_filename
+
 
-    blob = bucket.blob(blob_path)
-    blob.upload_from_filename(local_path)
+def _upload_part(bucket: storage.Bucket, part_path: str, local_path: str, offset: int, length: int) -> storage.Blob:
+    part = bucket.blob(part_path)
+    with open(local_path, "rb") as f:
+        f.seek(offset)
+        part.upload_from_file(f, size=length)
+    return part
 
+
+def _composite_upload(bucket: storage.Bucket, blob: storage.Blob, local_path: str,
+                      size: int, part_size: int, workers: int) -> None:
+    # 파일을 조각으로 나눠 병렬 업로드 후 compose로 합치고 조각 삭제
+    part_size = max(part_size, math.ceil(size / COMPOSITE_MAX_PARTS))
+    offsets = list(range(0, size, part_size))
+    part_names = [f"{blob.name}.parts/{i:04d}" for i in range(len(offsets))]
+
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as ex:
+            parts = list(ex.map(
+                lambda i: _upload_part(bucket, part_names[i], local_path,
+                                       offsets[i], min(part_size, size - offsets[i])),
+                range(len(offsets)),
+            ))
+        blob.compose(parts)
+    finally:
+        # 조각 업로드 중 하나가 실패해도 이미 올라간 조각이 남지 않도록 이름으로 전부 삭제
+        # (with 블록을 나올 때 나머지 업로드는 모두 끝나 있음)
+        for name in part_names:
+            try:
+                bucket.blob(name).delete()
+            except NotFound:
+                pass
+            except Exception as e:
+                print(f"조각 삭제 실패: {name} - {e}")
+
+
+def upload_to_gcs(
+    local_path: str,
+    bucket_name: str,
+    destination_dir: str = "",
+    content_hash: Optional[str] = None,     # 이미 계산한 sha256이 있으면 재사용
+    chunk_size: int = CHUNK_SIZE,
+    composite_threshold: int = COMPOSITE_THRESHOLD,
+) -> str:
+    client = get_client()
+    bucket = client.bucket(bucket_name)
+
+    content_hash = content_hash or file_sha256(local_path)
+    blob_path = _blob_path(local_path, destination_dir, content_hash)
     gcs_uri = f"gs://{bucket_name}/{blob_path}"
+
+    blob = bucket.blob(blob_path, chunk_size=chunk_size)
+    # 같은 내용이 이미 올라가 있으면 업로드 생략
+    if blob.exists():
+        print(f"Already uploaded: {gcs_uri}")
+        return gcs_uri
+
+    size = os.path.getsize(local_path)
+    if size >= composite_threshold:
+        _composite_upload(bucket, blob, local_path, size, COMPOSITE_PART_SIZE, COMPOSITE_WORKERS)
+    else:
+        # chunk_size가 지정된 blob은 큰 파일을 resumable 청크 업로드로 전송
+        blob.upload_from_filename(local_path)
+
     print(f"Uploaded to {gcs_uri}")
-    return gcs_uri
\ No newline at end of file
+    return gcs_uri
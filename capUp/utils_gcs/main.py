@@ -1,46 +1,205 @@
 import json
-from file_utils import check_file_type, extract_audio
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from typing import Dict, Optional
+import proxy
+import shots
+import video
+import vision
+from file_utils import check_file_type, file_sha256, load_audio
 from whisper_utils import transcribe_whisper
 from gcs_upload import upload_to_gcs
 from video import analyze_video
 from vision import analyze_image
 from parsing import parse_video_result, parse_image_result
+from result_cache import ResultCache, get_default_cache, make_key
+from stage_limits import StageLimits
 
 BUCKET_NAME = ""  # GCS 버킷 이름으로 변경
 
-def process_file(local_path: str):
+WHISPER_MODEL_SIZE = "medium"
+WHISPER_VAD_FILTER = True
+
+# 영상 분석 백엔드
+#   remote: Video Intelligence가 샷/라벨/객체 전부 분석 (기존)
+#   hybrid: 샷 전환은 로컬(shots.py), 라벨/객체만 Video Intelligence
+#   local : 샷 전환만 로컬 분석, 업로드/Video Intelligence 호출 없음 (라벨/객체 비어 있음)
+VIDEO_BACKENDS = ("remote", "hybrid", "local")
+
+def _timed(timings: Dict[str, float], limits: Optional[StageLimits], stage: str, fn, *args, **kwargs):
+    # 단계별 소요 시간 기록 (limits가 있으면 슬롯을 얻은 뒤부터 측정)
+    with limits.stage(stage) if limits else nullcontext():
+        t0 = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            timings[stage] = round(time.perf_counter() - t0, 3)
+
+
+def _video_features(video_backend: str):
+    # hybrid면 샷 전환은 로컬에서 하므로 요청에서 제외
+    if video_backend == "hybrid":
+        return [f for f in video.FEATURES if f != video.vi.Feature.SHOT_CHANGE_DETECTION]
+    return video.FEATURES
+
+
+def _remote_video(local_path: str, content_hash: str, timings: Dict[str, float],
+                  limits: Optional[StageLimits], use_proxy: bool = False,
+                  video_backend: str = "remote") -> dict:
+    # 업로드 -> Video Intelligence (네트워크 단계)
+    features = _video_features(video_backend)
+    if not use_proxy:
+        gcs_uri = _timed(timings, limits, "upload", upload_to_gcs, local_path, BUCKET_NAME, "test",
+                         content_hash=content_hash)
+        return _timed(timings, limits, "analyze_video", analyze_video, gcs_uri, features)
+
+    # 저해상도 프록시만 업로드/분석 후 시간을 원본 기준으로 되돌림
+    scratch = tempfile.mkdtemp(prefix="capup_")
+    try:
+        stem = os.path.splitext(os.path.basename(local_path))[0]
+        proxy_path = _timed(timings, limits, "proxy", proxy.make_proxy, local_path,
+                            os.path.join(scratch, f"{stem}_proxy.mp4"))
+        gcs_uri = _timed(timings, limits, "upload", upload_to_gcs, proxy_path, BUCKET_NAME, "test")
+        # 프록시는 fps가 낮아 프레임 인덱스 간격이 달라지므로 객체 추적은 1초 간격으로 샘플링
+        result = _timed(timings, limits, "analyze_video", analyze_video, gcs_uri, features,
+                        object_sample_sec=proxy.OBJECT_SAMPLE_SEC)
+        return proxy.map_to_original(result, proxy.probe_video(local_path), proxy.probe_video(proxy_path))
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+
+def _local_stt(local_path: str, timings: Dict[str, float], limits: Optional[StageLimits]):
+    # 오디오 추출 -> Whisper (로컬 CPU 단계, 업로드/원격 분석과 무관)
+    # ffmpeg 출력을 메모리로 바로 읽음, temp.wav 미사용
+    audio = _timed(timings, limits, "extract_audio", load_audio, local_path)
+    # whisper로 STT 추출
+    return _timed(
+        timings, limits, "whisper", transcribe_whisper, audio,
+        language=None, model_size=WHISPER_MODEL_SIZE, vad_filter=WHISPER_VAD_FILTER,
+    )
+
+
+def _local_shots(local_path: str, output_dir: str, timings: Dict[str, float],
+                 limits: Optional[StageLimits]) -> list:
+    # 로컬 샷 전환 감지 + 샷별 대표 프레임 저장
+    # 대표 프레임 경로는 output_dir 기준 상대 경로로 (캐시된 결과를 다른 output_dir에서 재사용해도 맞도록)
+    result = _timed(timings, limits, "shots", shots.detect_shots, local_path,
+                    keyframe_dir=os.path.join(output_dir, "keyframes"))
+    for shot in result:
+        if shot["keyframe"]["path"]:
+            shot["keyframe"]["path"] = os.path.relpath(shot["keyframe"]["path"], output_dir)
+    return result
+
+
+def _cache_config(file_type: str, use_proxy: bool = False, video_backend: str = "remote") -> dict:
+    # 결과에 영향을 주는 설정만 캐시 키에 포함
+    if file_type == "video":
+        config = {
+            "type": "video",
+            "video": video.analysis_config(_video_features(video_backend)),
+            "whisper": {"model_size": WHISPER_MODEL_SIZE, "vad_filter": WHISPER_VAD_FILTER, "language": None},
+        }
+        if use_proxy and video_backend != "local":
+            config["proxy"] = proxy.proxy_config()
+        if video_backend != "remote":
+            config["backend"] = video_backend
+            config["shots"] = shots.detector_config()
+        return config
+    return {"type": "image", "vision": vision.analysis_config()}
+
+
+def _write_results(output_dir: str, raw_result: dict, parsed_result: dict) -> None:
+    os.makedirs(output_dir, exist_ok=True)
+    with open(os.path.join(output_dir, "raw_result.json"), "w", encoding="utf-8") as f:
+        json.dump(raw_result, f, ensure_ascii=False, indent=2)
+
+    with open(os.path.join(output_dir, "parsed_result.json"), "w", encoding="utf-8") as f:
+        json.dump(parsed_result, f, ensure_ascii=False, indent=2)
+
+
+def process_file(
+    local_path: str,
+    output_dir: str = ".",
+    limits: Optional[StageLimits] = None,
+    cache: Optional[ResultCache] = None,
+    bypass_cache: bool = False,     # True면 캐시를 읽지 않고 새로 분석 (결과는 다시 저장)
+    use_proxy: bool = False,        # True면 저해상도 프록시로 영상 분석 (proxy.py)
+    video_backend: str = "remote",  # VIDEO_BACKENDS 참고
+) -> dict:
+    if video_backend not in VIDEO_BACKENDS:
+        raise ValueError(f"지원하지 않는 video_backend: {video_backend}")
+
+    timings: Dict[str, float] = {}
+    t0 = time.perf_counter()
 
     # 확장자 판별
     file_type = check_file_type(local_path)
+    if file_type == "unknown":
+        raise ValueError("지원하지 않는 파일 형식")
 
-    # 파일 업로드
-    gcs_uri = upload_to_gcs(local_path, BUCKET_NAME, "test")
+    # 캐시 조회 - 히트면 업로드/원격 분석/STT 전부 생략
+    cache = cache or get_default_cache()
+    content_hash = _timed(timings, None, "hash", file_sha256, local_path)
+    cache_key = make_key(content_hash, _cache_config(file_type, use_proxy, video_backend))
+    cached = None if bypass_cache else cache.get(cache_key)
+    if cached is not None:
+        if file_type == "video" and video_backend != "remote":
+            # 대표 프레임은 캐시에 없음 - 이번 output_dir에 없으면 다시 추출
+            _timed(timings, limits, "keyframes", shots.restore_keyframes, local_path,
+                   cached["raw_result"]["shotAnnotations"], output_dir)
+        timings["total"] = round(time.perf_counter() - t0, 3)
+        print(f"[process_file] {local_path} cache hit {cache.stats()}")
+        _write_results(output_dir, cached["raw_result"], cached["parsed_result"])
+        return {**cached, "timings": timings, "cache_hit": True}
 
     if file_type == "video":
+        # 원격(업로드+영상 분석)과 로컬(오디오 추출+STT, 로컬 샷 감지)을 동시에 실행
+        with ThreadPoolExecutor(max_workers=3) as ex:
+            remote = None
+            if video_backend != "local":
+                remote = ex.submit(_remote_video, local_path, content_hash, timings, limits,
+                                   use_proxy, video_backend)
+            local_shots = None
+            if video_backend != "remote":
+                local_shots = ex.submit(_local_shots, local_path, output_dir, timings, limits)
+            local = ex.submit(_local_stt, local_path, timings, limits)
 
-        #오디오 추출
-        audio_path = extract_audio(local_path, "temp.wav")
-
-        raw_result = analyze_video(gcs_uri)
+            if remote is not None:
+                raw_result = remote.result()
+            else:
+                raw_result = {
+                    "shotAnnotations": [],
+                    "speechTranscriptions": [],
+                    "segmentLabels": [],
+                    "frameLabels": [],
+                    "objectAnnotations": [],
+                }
+            if local_shots is not None:
+                raw_result["shotAnnotations"] = local_shots.result()
+            whisper_stt = local.result()
 
-        # whisper로 STT 추출
-        whisper_stt = transcribe_whisper(audio_path, language=None, model_size="medium")
         raw_result["speechTranscriptions"] = whisper_stt
-
         parsed_result = parse_video_result(raw_result)
 
-    elif file_type == "image":
-        raw_result = analyze_image(gcs_uri)
+    else:   # image
+        # 파일 업로드
+        gcs_uri = _timed(timings, limits, "upload", upload_to_gcs, local_path, BUCKET_NAME, "test",
+                         content_hash=content_hash)
+        raw_result = _timed(timings, limits, "analyze_image", analyze_image, gcs_uri)
         parsed_result = parse_image_result(raw_result)
 
-    else:
-        raise ValueError("지원하지 않는 파일 형식")
+    cache.put(cache_key, {"raw_result": raw_result, "parsed_result": parsed_result})
 
-    with open("raw_result.json", "w", encoding="utf-8") as f:
-        json.dump(raw_result, f, ensure_ascii=False, indent=2)
+    timings["total"] = round(time.perf_counter() - t0, 3)
+    print(f"[process_file] {local_path} timings: {timings}")
 
-    with open("parsed_result.json", "w", encoding="utf-8") as f:
-        json.dump(parsed_result, f, ensure_ascii=False, indent=2)
+    _write_results(output_dir, raw_result, parsed_result)
+
+    return {"raw_result": raw_result, "parsed_result": parsed_result, "timings": timings, "cache_hit": False}
 
 if __name__ == "__main__":
     local_file = ""  # 로컬 파일 경로 지정
@@ -0,0 +1,100 @@
+# proxy.py
+# Video Intelligence 분석용 저해상도/저fps 프록시 생성 + 분석 결과 시간을 원본 타임라인으로 되돌림
+import json
+import os
+import subprocess
+import tempfile
+from typing import Optional
+
+PROXY_HEIGHT = 360      # 세로 해상도 (가로는 비율 유지)
+PROXY_FPS = 10          # 샷 전환/라벨/객체 추적에는 충분
+PROXY_CRF = 30
+OBJECT_SAMPLE_SEC = 1.0     # 프록시 분석 시 객체 추적 프레임 샘플링 간격
+
+
+def proxy_config(height: int = PROXY_HEIGHT, fps: int = PROXY_FPS, crf: int = PROXY_CRF) -> dict:
+    # 결과 캐시 키에 사용
+    return {"height": height, "fps": fps, "crf": crf, "object_sample_sec": OBJECT_SAMPLE_SEC}
+
+
+def probe_video(file_path: str) -> dict:
+    command = [
+        "ffprobe", "-v", "error",
+        "-select_streams", "v:0",
+        "-show_entries", "format=duration,start_time",
+        "-of", "json",
+        file_path,
+    ]
+    try:
+        out = subprocess.run(command, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE).stdout
+    except subprocess.CalledProcessError as e:
+        raise RuntimeError(f"영상 정보 조회 실패: {e.stderr.decode('utf-8')}")
+    fmt = json.loads(out).get("format", {})
+    return {
+        "duration": float(fmt.get("duration") or 0.0),
+        "start_time": float(fmt.get("start_time") or 0.0),
+    }
+
+
+def make_proxy(
+    file_path: str,
+    out_path: Optional[str] = None,
+    height: int = PROXY_HEIGHT,
+    fps: int = PROXY_FPS,
+    crf: int = PROXY_CRF,
+) -> str:
+    # 경로를 안 주면 작업마다 고유한 임시 파일
+    if out_path is None:
+        fd, out_path = tempfile.mkstemp(prefix="capup_proxy_", suffix=".mp4")
+        os.close(fd)
+
+    command = [
+        "ffmpeg", "-y", "-nostdin",
+        "-loglevel", "error",
+        "-i", file_path,
+        "-an",                          # 오디오는 Whisper가 로컬에서 처리
+        "-vf", f"scale=-2:{height},fps={fps}",
+        "-c:v", "libx264",
+        "-preset", "veryfast",
+        "-crf", str(crf),
+        "-pix_fmt", "yuv420p",
+        out_path,
+    ]
+    try:
+        subprocess.run(command, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    except subprocess.CalledProcessError as e:
+        raise RuntimeError(f"프록시 생성 실패: {e.stderr.decode('utf-8')}")
+    return out_path
+
+
+def map_to_original(result: dict, original: dict, proxy: dict, fps: int = PROXY_FPS) -> dict:
+    # 프록시 기준 시간(초) -> 원본 기준 시간(초)
+    offset = original["start_time"] - proxy["start_time"]
+    orig_dur = original["duration"]
+    # 끝 시각이 프록시 끝 한 프레임 이내면 원본 끝으로 붙임 (fps를 낮추며 생긴 오차)
+    # 시작 시각/프레임 시각은 붙이지 않음 (마지막 프레임에서 시작하는 샷이 길이 0이 되지 않게)
+    tail = proxy["duration"] - 1.0 / fps
+
+    def _t(t, is_end: bool = False):
+        if t is None:
+            return None
+        if is_end and orig_dur and t >= tail:
+            return round(orig_dur, 3)
+        mapped = max(0.0, t + offset)
+        return round(min(mapped, orig_dur) if orig_dur else mapped, 3)
+
+    for shot in result.get("shotAnnotations", []):
+        shot["start"], shot["end"] = _t(shot["start"]), _t(shot["end"], True)
+
+    for seg in result.get("segmentLabels", []):
+        seg["start"], seg["end"] = _t(seg["start"]), _t(seg["end"], True)
+
+    for fr in result.get("frameLabels", []):
+        fr["time"] = _t(fr["time"])
+
+    for obj in result.get("objectAnnotations", []):
+        obj["segment"]["start"], obj["segment"]["end"] = _t(obj["segment"]["start"]), _t(obj["segment"]["end"], True)
+        for f in obj.get("frames_sampled", []):
+            f["time"] = _t(f["time"])
+
+    return result
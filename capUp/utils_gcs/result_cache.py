@@ -0,0 +1,98 @@
+# result_cache.py
+# 분석 결과 로컬 캐시 - 파일 내용 해시 + 분석 설정으로 키를 만들어 같은 파일은 업로드/원격 분석/STT 생략
+import hashlib
+import json
+import os
+import threading
+from typing import Any, Dict, Optional
+
+DEFAULT_CACHE_DIR = os.environ.get("CAPUP_CACHE_DIR", ".capup_cache")
+DEFAULT_MAX_BYTES = int(os.environ.get("CAPUP_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+
+
+def make_key(content_hash: str, config: Dict[str, Any]) -> str:
+    payload = json.dumps({"content": content_hash, "config": config}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def get(self, key: str) -> Optional[dict]:
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                value = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            with self._lock:
+                self.misses += 1
+            return None
+
+        try:
+            os.utime(path)  # LRU 기준 갱신
+        except FileNotFoundError:
+            pass  # 읽은 직후 다른 쪽에서 정리(evict)됨 - 읽은 값은 그대로 사용
+        with self._lock:
+            self.hits += 1
+        return value
+
+    def put(self, key: str, value: dict) -> None:
+        path = self._path(key)
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(value, f, ensure_ascii=False)
+        os.replace(tmp, path)
+        self._evict()
+
+    def _evict(self) -> None:
+        # 최대 크기를 넘으면 가장 오래 안 쓴 항목부터 삭제
+        with self._lock:
+            entries = []
+            for name in os.listdir(self.cache_dir):
+                if not name.endswith(".json"):
+                    continue
+                try:
+                    st = os.stat(os.path.join(self.cache_dir, name))
+                except FileNotFoundError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, name))
+
+            total = sum(size for _, size, _ in entries)
+            for _, size, name in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(os.path.join(self.cache_dir, name))
+                except FileNotFoundError:
+                    pass
+                total -= size
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 3) if total else 0.0,
+            }
+
+
+_default_cache: Optional[ResultCache] = None
+_default_lock = threading.Lock()
+
+
+def get_default_cache() -> ResultCache:
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = ResultCache()
+        return _default_cache
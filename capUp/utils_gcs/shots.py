@@ -0,0 +1,161 @@
+# shots.py
+# 로컬 CPU 샷 전환 감지 - Video Intelligence shotAnnotations 대체용
+# 축소된 프레임을 ffmpeg에서 파이프로 받아 색 히스토그램 차이 + 픽셀 차이로 컷을 찾음
+import os
+import subprocess
+from typing import Dict, List, Optional
+import numpy as np
+
+ANALYSIS_FPS = 10           # 샷 경계 정밀도 = 1 / ANALYSIS_FPS 초
+FRAME_SIZE = (64, 36)       # (가로, 세로) 축소 해상도
+THRESHOLD = 0.35            # 컷 판정 점수 (0~1)
+MIN_SHOT_SEC = 0.5          # 이보다 짧은 샷은 만들지 않음
+BATCH_FRAMES = 256
+
+
+def detector_config(fps: int = ANALYSIS_FPS, threshold: float = THRESHOLD,
+                    min_shot_sec: float = MIN_SHOT_SEC) -> dict:
+    # 결과 캐시 키에 사용
+    return {"fps": fps, "frame_size": list(FRAME_SIZE), "threshold": threshold, "min_shot_sec": min_shot_sec}
+
+
+def _histograms(frames: np.ndarray) -> np.ndarray:
+    # (N, H, W, 3) uint8 -> (N, 64) 정규화 히스토그램 (채널당 4단계 양자화)
+    n = frames.shape[0]
+    q = (frames >> 6).astype(np.int32)
+    idx = (q[..., 0] * 16 + q[..., 1] * 4 + q[..., 2]).reshape(n, -1)
+    idx += (np.arange(n, dtype=np.int32) * 64)[:, None]
+    hist = np.bincount(idx.ravel(), minlength=n * 64).reshape(n, 64)
+    return hist.astype(np.float32) / idx.shape[1]
+
+
+def _decode_frames(file_path: str, fps: int):
+    # 축소 RGB 프레임을 BATCH_FRAMES 단위로 반환
+    w, h = FRAME_SIZE
+    frame_bytes = w * h * 3
+    command = [
+        "ffmpeg", "-nostdin",
+        "-loglevel", "error",
+        "-i", file_path,
+        "-an",
+        "-vf", f"fps={fps},scale={w}:{h}",
+        "-f", "rawvideo",
+        "-pix_fmt", "rgb24",
+        "-",
+    ]
+    proc = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    try:
+        while True:
+            data = proc.stdout.read(frame_bytes * BATCH_FRAMES)
+            n = len(data) // frame_bytes
+            if n == 0:
+                break
+            yield np.frombuffer(data, dtype=np.uint8, count=n * frame_bytes).reshape(n, h, w, 3)
+    finally:
+        proc.stdout.close()
+        stderr = proc.stderr.read()
+        proc.stderr.close()
+        proc.wait()
+    if proc.returncode != 0:
+        raise RuntimeError(f"프레임 디코딩 실패: {stderr.decode('utf-8', errors='replace')}")
+
+
+def _extract_keyframe(file_path: str, t: float, out_path: str) -> str:
+    command = [
+        "ffmpeg", "-y", "-nostdin",
+        "-loglevel", "error",
+        "-ss", f"{t:.3f}",
+        "-i", file_path,
+        "-frames:v", "1",
+        out_path,
+    ]
+    try:
+        subprocess.run(command, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    except subprocess.CalledProcessError as e:
+        raise RuntimeError(f"키프레임 추출 실패: {e.stderr.decode('utf-8')}")
+    return out_path
+
+
+def detect_shots(
+    file_path: str,
+    fps: int = ANALYSIS_FPS,
+    threshold: float = THRESHOLD,
+    min_shot_sec: float = MIN_SHOT_SEC,
+    keyframe_dir: Optional[str] = None,     # 지정하면 샷별 대표 프레임 jpg 저장
+    stats: Optional[Dict[str, float]] = None,
+) -> List[dict]:
+    # 반환: [{"start", "end", "keyframe": {"time", "path"}}] - analyze_video의 shotAnnotations와 같은 start/end
+    hists = []
+    scores = []
+    prev_frame = None
+    prev_hist = None
+
+    for frames in _decode_frames(file_path, fps):
+        hist = _histograms(frames)
+        small = frames.astype(np.int16)
+
+        # 직전 배치 마지막 프레임과 이어서 차이 계산
+        if prev_frame is not None:
+            hist_prev = np.concatenate([prev_hist[None], hist[:-1]])
+            frame_prev = np.concatenate([prev_frame[None], small[:-1]])
+        else:
+            hist_prev = np.concatenate([hist[:1], hist[:-1]])
+            frame_prev = np.concatenate([small[:1], small[:-1]])
+
+        hist_diff = np.abs(hist - hist_prev).sum(axis=1) / 2.0               # 0~1
+        pixel_diff = np.abs(small - frame_prev).mean(axis=(1, 2, 3)) / 255.0  # 0~1
+        scores.append(0.5 * hist_diff + 0.5 * pixel_diff)
+        hists.append(hist)
+
+        prev_frame = small[-1]
+        prev_hist = hist[-1]
+
+    if not hists:
+        return []
+
+    hists = np.concatenate(hists)
+    scores = np.concatenate(scores)
+    n = len(scores)
+
+    # 점수가 임계값을 넘고 직전 컷과 충분히 떨어진 프레임을 컷으로
+    min_gap = max(1, int(round(min_shot_sec * fps)))
+    cuts = [0]
+    for i in np.flatnonzero(scores > threshold):
+        if i - cuts[-1] >= min_gap:
+            cuts.append(int(i))
+    bounds = cuts + [n]
+
+    shots = []
+    for k, (a, b) in enumerate(zip(bounds[:-1], bounds[1:])):
+        # 샷 평균 히스토그램에 가장 가까운 프레임을 대표 프레임으로
+        seg = hists[a:b]
+        rep = a + int(np.abs(seg - seg.mean(axis=0)).sum(axis=1).argmin())
+        t_rep = round(rep / fps, 3)
+
+        keyframe = {"time": t_rep, "path": None}
+        if keyframe_dir:
+            os.makedirs(keyframe_dir, exist_ok=True)
+            keyframe["path"] = _extract_keyframe(file_path, t_rep, os.path.join(keyframe_dir, f"shot_{k:04d}.jpg"))
+
+        shots.append({"start": round(a / fps, 3), "end": round(b / fps, 3), "keyframe": keyframe})
+
+    if stats is not None:
+        stats.update({"frames": n, "shots": len(shots)})
+
+    return shots
+
+
+def restore_keyframes(file_path: str, shots: List[dict], base_dir: str) -> int:
+    # keyframe.path(base_dir 기준 상대 경로)에 파일이 없으면 keyframe.time에서 다시 추출, 추출한 개수 반환
+    restored = 0
+    for shot in shots:
+        keyframe = shot.get("keyframe") or {}
+        if not keyframe.get("path"):
+            continue
+        out_path = os.path.join(base_dir, keyframe["path"])
+        if os.path.exists(out_path):
+            continue
+        os.makedirs(os.path.dirname(out_path), exist_ok=True)
+        _extract_keyframe(file_path, keyframe["time"], out_path)
+        restored += 1
+    return restored
@@ -0,0 +1,44 @@
+# stage_limits.py
+# CPU 단계(ffmpeg, 프록시 인코딩, 로컬 샷 감지, Whisper)와 네트워크 단계(업로드, 원격 분석)의 동시 실행 수 제한 + 대기열 깊이 집계
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Dict
+
+CPU_STAGES = {"extract_audio", "proxy", "shots", "keyframes", "whisper"}
+NETWORK_STAGES = {"upload", "analyze_video", "analyze_image"}
+
+
+class StageLimits:
+    def __init__(self, cpu: int = 1, network: int = 8):
+        self._sems = {
+            "cpu": threading.BoundedSemaphore(max(1, cpu)),
+            "network": threading.BoundedSemaphore(max(1, network)),
+        }
+        self._lock = threading.Lock()
+        self._waiting: Dict[str, int] = defaultdict(int)
+        self._running: Dict[str, int] = defaultdict(int)
+
+    @contextmanager
+    def stage(self, name: str):
+        sem = self._sems["cpu" if name in CPU_STAGES else "network"]
+
+        with self._lock:
+            self._waiting[name] += 1
+        sem.acquire()
+        with self._lock:
+            self._waiting[name] -= 1
+            self._running[name] += 1
+
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._running[name] -= 1
+            sem.release()
+
+    def snapshot(self) -> Dict[str, Dict[str, int]]:
+        # {stage: {"waiting": 대기 중, "running": 실행 중}}
+        with self._lock:
+            names = sorted(set(self._waiting) | set(self._running))
+            return {n: {"waiting": self._waiting[n], "running": self._running[n]} for n in names}
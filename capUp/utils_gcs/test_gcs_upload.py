@@ -0,0 +1,66 @@
+# test_gcs_upload.py
+# fake GCS 서버(fake-gcs-server 등)로 업로드 경로 확인 - utils_gcs 디렉터리에서 실행
+#   docker run -d -p 4443:4443 fsouza/fake-gcs-server -scheme http
+#   STORAGE_EMULATOR_HOST=http://localhost:4443 python -m pytest -q test_gcs_upload.py
+# STORAGE_EMULATOR_HOST가 없으면 건너뜀
+import os
+import uuid
+
+import pytest
+
+pytestmark = pytest.mark.skipif(not os.environ.get("STORAGE_EMULATOR_HOST"),
+                                reason="STORAGE_EMULATOR_HOST 미설정 (fake GCS 서버 필요)")
+
+import gcs_upload
+from google.cloud import storage
+
+
+@pytest.fixture
+def bucket():
+    client = gcs_upload.get_client()
+    bucket = client.create_bucket(f"capup-test-{uuid.uuid4().hex[:12]}", project="test")
+    yield bucket
+    for blob in client.list_blobs(bucket.name):
+        blob.delete()
+    bucket.delete()
+
+
+def _write(path, size: int) -> str:
+    with open(path, "wb") as f:
+        f.write(os.urandom(size))
+    return str(path)
+
+
+def test_client_uses_pooled_session():
+    client = gcs_upload.get_client()
+    adapter = client._http.get_adapter("http://localhost")
+    assert adapter._pool_maxsize == gcs_upload.POOL_SIZE
+
+
+def test_upload_then_skip_existing(bucket, tmp_path, monkeypatch):
+    path = _write(tmp_path / "clip.mp4", 300 * 1024)
+    uri = gcs_upload.upload_to_gcs(path, bucket.name, "test")
+    blob_name = uri.split(f"gs://{bucket.name}/", 1)[1]
+    with open(path, "rb") as f:
+        assert bucket.blob(blob_name).download_as_bytes() == f.read()
+
+    # 같은 내용이면 업로드를 다시 하지 않음
+    def _fail(*args, **kwargs):
+        raise AssertionError("이미 있는 blob을 다시 업로드함")
+
+    monkeypatch.setattr(storage.Blob, "upload_from_filename", _fail)
+    monkeypatch.setattr(storage.Blob, "upload_from_file", _fail)
+    assert gcs_upload.upload_to_gcs(path, bucket.name, "test") == uri
+
+
+def test_composite_upload(bucket, tmp_path, monkeypatch):
+    # 임계값/조각 크기를 줄여 조각 업로드 + compose 경로 사용
+    monkeypatch.setattr(gcs_upload, "COMPOSITE_PART_SIZE", 256 * 1024)
+    path = _write(tmp_path / "big.mp4", 1024 * 1024 + 123)
+    uri = gcs_upload.upload_to_gcs(path, bucket.name, "test", composite_threshold=512 * 1024)
+    blob_name = uri.split(f"gs://{bucket.name}/", 1)[1]
+
+    with open(path, "rb") as f:
+        assert bucket.blob(blob_name).download_as_bytes() == f.read()
+    # 조각은 compose 후 삭제
+    assert [b.name for b in gcs_upload.get_client().list_blobs(bucket.name, prefix=f"{blob_name}.parts/")] == []
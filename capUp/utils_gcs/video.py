@@ -13,20 +13,38 @@ def _to_seconds(ts) -> float | None:
         return None
     return (sec or 0) + (nanos or 0) / 1e9
 
-def analyze_video(gcs_uri: str ) -> dict:
+# 분석할 features 구성 (결과 캐시 키에도 사용)
+FEATURES = [
+    vi.Feature.LABEL_DETECTION,     # 라벨 탐지
+    vi.Feature.SHOT_CHANGE_DETECTION,   # 샷 전환
+    vi.Feature.OBJECT_TRACKING,     # 객체추적
+]
+LABEL_DETECTION_MODE = vi.LabelDetectionMode.SHOT_AND_FRAME_MODE
+STATIONARY_CAMERA = False   # 카메라 고정 시점 시 True
+
+
+def analysis_config(features=None) -> dict:
+    return {
+        "features": [f.name for f in (features or FEATURES)],
+        "label_detection_mode": LABEL_DETECTION_MODE.name,
+        "stationary_camera": STATIONARY_CAMERA,
+    }
+
+
+OBJECT_FRAME_STEP = 30      # 객체 추적 프레임 샘플링 (프레임 인덱스 기준)
+
+
+def analyze_video(gcs_uri: str, features=None, object_sample_sec: float | None = None) -> dict:
+    # object_sample_sec: 주면 객체 추적 프레임을 시간 간격(초)으로 샘플링 (fps를 바꾼 프록시 분석용)
+    #                    없으면 기존처럼 OBJECT_FRAME_STEP 프레임마다
     # 클라이언트 호출
     client = vi.VideoIntelligenceServiceClient()
 
-    # 분석할 features 구성
-    features = [
-        vi.Feature.LABEL_DETECTION,     # 라벨 탐지
-        vi.Feature.SHOT_CHANGE_DETECTION,   # 샷 전환
-        vi.Feature.OBJECT_TRACKING,     # 객체추적
-    ]
+    features = features or FEATURES
 
     label_config = vi.LabelDetectionConfig(
-        label_detection_mode=vi.LabelDetectionMode.SHOT_AND_FRAME_MODE,
-        stationary_camera=False,    # 카메라 고정 시점 시 True
+        label_detection_mode=LABEL_DETECTION_MODE,
+        stationary_camera=STATIONARY_CAMERA,
     )
 
     video_context = vi.VideoContext(
@@ -82,11 +100,18 @@ def analyze_video(gcs_uri: str ) -> dict:
             st = _to_seconds(obj.segment.start_time_offset) or 0.0
             et = _to_seconds(obj.segment.end_time_offset) or st
             frames_summarized = []
+            last_t = None
 
             for i, f in enumerate(obj.frames):
-                if i % 30 != 0:
-                    continue
                 t = _to_seconds(f.time_offset)
+                if object_sample_sec is None:
+                    if i % OBJECT_FRAME_STEP != 0:
+                        continue
+                else:
+                    # 프레임 인덱스가 아닌 시간 기준 (입력 fps와 무관하게 같은 간격)
+                    if t is not None and last_t is not None and t - last_t < object_sample_sec:
+                        continue
+                    last_t = t if t is not None else last_t
                 bb = f.normalized_bounding_box
                 frames_summarized.append({
                     "time": round(t, 3) if t is not None else None,
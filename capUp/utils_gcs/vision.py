@@ -1,25 +1,57 @@
 from google.cloud import vision
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+import threading
 
-def analyze_image(gcs_uri: str) -> dict:
-    client = vision.ImageAnnotatorClient()
+# 한 번의 요청에 라벨/텍스트/객체 감지를 모두 담음
+FEATURES = [
+    vision.Feature.Type.LABEL_DETECTION,        # 라벨 감지
+    vision.Feature.Type.TEXT_DETECTION,         # 텍스트 감지
+    vision.Feature.Type.OBJECT_LOCALIZATION,    # 객체 감지
+]
+BATCH_LIMIT = 16        # batch_annotate_images 요청당 최대 이미지 수
+BATCH_WORKERS = 4
+
+_client: Optional[vision.ImageAnnotatorClient] = None
+_client_lock = threading.Lock()
+
+
+def analysis_config() -> dict:
+    # 결과 캐시 키에 사용
+    return {"features": [f.name for f in FEATURES]}
+
+
+def get_client() -> vision.ImageAnnotatorClient:
+    # 프로세스 전체에서 클라이언트 하나를 공유
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = vision.ImageAnnotatorClient()
+        return _client
+
+
+def _build_request(gcs_uri: str) -> vision.AnnotateImageRequest:
     image = vision.Image()
     image.source.image_uri = gcs_uri
+    return vision.AnnotateImageRequest(
+        image=image,
+        features=[vision.Feature(type_=f) for f in FEATURES],
+    )
 
+
+def _to_result(res) -> dict:
     response = {}
 
     # 라벨 감지
-    labels = client.label_detection(image=image).label_annotations
     response["labels"] = [
         {"description": l.description, "score": l.score}
-        for l in labels
+        for l in res.label_annotations
     ]
 
     # 텍스트 감지
-    texts = client.text_detection(image=image).text_annotations
-    response["texts"] = [t.description for t in texts]
+    response["texts"] = [t.description for t in res.text_annotations]
 
     # 객체 감지
-    objects = client.object_localization(image=image).localized_object_annotations
     response["objects"] = [
         {
             "name": o.name,
@@ -29,7 +61,37 @@ def analyze_image(gcs_uri: str) -> dict:
                 for v in o.bounding_poly.normalized_vertices
             ]
         }
-        for o in objects
+        for o in res.localized_object_annotations
     ]
 
-    return response
\ No newline at end of file
+    return response
+
+
+def analyze_image(gcs_uri: str) -> dict:
+    res = get_client().annotate_image(_build_request(gcs_uri))
+    if res.error.message:
+        raise RuntimeError(f"이미지 분석 실패: {res.error.message}")
+    return _to_result(res)
+
+
+def analyze_images(gcs_uris: List[str], workers: int = BATCH_WORKERS) -> List[dict]:
+    # 여러 이미지를 BATCH_LIMIT개씩 묶어 batch_annotate_images로 병렬 요청, 결과는 입력 순서대로
+    client = get_client()
+    chunks = [gcs_uris[i:i + BATCH_LIMIT] for i in range(0, len(gcs_uris), BATCH_LIMIT)]
+
+    def _run(chunk: List[str]) -> List[dict]:
+        batch = client.batch_annotate_images(requests=[_build_request(uri) for uri in chunk])
+        results = []
+        for uri, res in zip(chunk, batch.responses):
+            if res.error.message:
+                # 한 장 실패로 전체를 버리지 않도록 빈 결과 + error
+                print(f"이미지 분석 실패: {uri} - {res.error.message}")
+                results.append({"labels": [], "texts": [], "objects": [], "error": res.error.message})
+            else:
+                results.append(_to_result(res))
+        return results
+
+    if not chunks:
+        return []
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(chunks)))) as ex:
+        return [r for chunk_results in ex.map(_run, chunks) for r in chunk_results]
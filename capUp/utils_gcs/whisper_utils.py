@@ -1,16 +1,95 @@
 # whisper_utils.py
-from typing import List, Dict, Any, Optional
-from faster_whisper import WhisperModel
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Tuple, Union
+import numpy as np
+from faster_whisper import BatchedInferencePipeline, WhisperModel
+
+# 모델 풀 (model_size, device, compute_type) -> WhisperModel, LRU로 최대 개수 제한
+# num_workers/cpu_threads는 처음 로딩할 때만 적용 (같은 모델을 설정만 바꿔 두 벌 올리지 않음)
+MODEL_CACHE_SIZE = int(os.environ.get("WHISPER_MODEL_CACHE_SIZE", "2"))
+
+ModelKey = Tuple[str, str, str]
+
+_models: "OrderedDict[ModelKey, WhisperModel]" = OrderedDict()
+_models_lock = threading.Lock()
+_loading_locks: Dict[ModelKey, threading.Lock] = {}
+
+
+def get_model(
+    model_size: str = "medium",
+    device: str = "auto",
+    compute_type: str = "int8",
+    num_workers: int = 1,        # 여러 스레드에서 동시에 transcribe 할 때 병렬 처리 수 (처음 로딩 시에만)
+    cpu_threads: int = 0,        # 0이면 ctranslate2 기본값 (처음 로딩 시에만)
+) -> WhisperModel:
+    key = (model_size, device, compute_type)
+
+    with _models_lock:
+        model = _models.get(key)
+        if model is not None:
+            _models.move_to_end(key)
+            return model
+        # 같은 키를 동시에 두 번 로딩하지 않도록 키별 락 사용
+        load_lock = _loading_locks.setdefault(key, threading.Lock())
+
+    with load_lock:
+        with _models_lock:
+            model = _models.get(key)
+            if model is not None:
+                _models.move_to_end(key)
+                return model
+
+        # 최초 사용 시점에 로딩 (lazy)
+        model = WhisperModel(
+            model_size,
+            device=device,
+            compute_type=compute_type,
+            num_workers=num_workers,
+            cpu_threads=cpu_threads,
+        )
+
+        with _models_lock:
+            _models[key] = model
+            while len(_models) > max(1, MODEL_CACHE_SIZE):
+                _models.popitem(last=False)
+            _loading_locks.pop(key, None)
+
+    return model
+
+
+def preload(
+    model_size: str = "medium",
+    device: str = "auto",
+    compute_type: str = "int8",
+    warmup: bool = True,
+) -> WhisperModel:
+    # 워커 시작 시 호출 - 모델 로딩 + 1초 무음으로 첫 추론 비용까지 미리 지불
+    model = get_model(model_size, device, compute_type)
+    if warmup:
+        segments, _ = model.transcribe(np.zeros(16000, dtype=np.float32), vad_filter=False)
+        list(segments)
+    return model
+
+
+def clear_models() -> None:
+    with _models_lock:
+        _models.clear()
+        _loading_locks.clear()
+
 
 def transcribe_whisper(
-    audio_path: str,
+    audio_path: Union[str, np.ndarray],   # 파일 경로 또는 16kHz mono float32 배열
     language: Optional[str] = None,
     model_size: str = "medium",
-    device: str = "auto",          
+    device: str = "auto",
     compute_type: str = "int8",      # GPU면 "float16", CPU면 "int8"
     vad_filter: bool = True,
 ) -> List[Dict[str, Any]]:
-    model = WhisperModel(model_size, device=device, compute_type=compute_type)
+    model = get_model(model_size, device, compute_type)
 
     segments, info = model.transcribe(
         audio_path,
@@ -18,7 +97,77 @@ def transcribe_whisper(
         vad_filter=vad_filter,
         word_timestamps=True,
     )
+    return _to_speech_transcriptions(segments)
+
+
+def transcribe_many(
+    audio_paths: List[Union[str, np.ndarray]],
+    language: Optional[str] = None,
+    model_size: str = "medium",
+    device: str = "auto",
+    compute_type: str = "int8",
+    vad_filter: bool = True,
+    batch_size: int = 8,             # 한 파일 내 VAD 구간을 묶어 추론하는 개수
+    workers: Optional[int] = None,   # 동시에 처리할 파일 수 (기본: CPU 코어 기준)
+    stats: Optional[Dict[str, float]] = None,
+) -> List[List[Dict[str, Any]]]:
+    # 여러 오디오 파일을 하나의 모델로 처리, 결과는 입력 순서대로 speechTranscriptions 형태
+    if not audio_paths:
+        return []
+
+    cores = os.cpu_count() or 1
+    if workers is None:
+        workers = max(1, min(len(audio_paths), cores // 4))
+    workers = max(1, workers)
+    cpu_threads = max(1, cores // workers)
+
+    # 이미 올라온 모델(transcribe_whisper/preload)이 있으면 그대로 재사용 - 이때 동시 처리 수는 그 모델의 num_workers
+    model = get_model(model_size, device, compute_type, num_workers=workers, cpu_threads=cpu_threads)
+    # 배치 추론은 VAD 구간 단위로 나눠서 돌기 때문에 vad_filter가 꺼져 있으면 일반 추론 사용
+    batched = BatchedInferencePipeline(model) if vad_filter and batch_size > 1 else None
+
+    def _run(path):
+        if batched is not None:
+            segments, info = batched.transcribe(
+                path,
+                language=language,
+                vad_filter=True,
+                word_timestamps=True,
+                batch_size=batch_size,
+            )
+        else:
+            segments, info = model.transcribe(
+                path,
+                language=language,
+                vad_filter=vad_filter,
+                word_timestamps=True,
+            )
+        return _to_speech_transcriptions(segments), info.duration
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as ex:
+        outputs = list(ex.map(_run, audio_paths))
+    wall_sec = time.perf_counter() - t0
+
+    audio_sec = sum(d for _, d in outputs)
+    throughput = audio_sec / wall_sec if wall_sec > 0 else 0.0
+    print(f"[transcribe_many] files={len(audio_paths)} workers={workers} batch_size={batch_size} "
+          f"audio={audio_sec:.1f}s wall={wall_sec:.1f}s throughput={throughput:.2f}x")
+
+    if stats is not None:
+        stats.update({
+            "files": len(audio_paths),
+            "workers": workers,
+            "batch_size": batch_size,
+            "audio_sec": audio_sec,
+            "wall_sec": wall_sec,
+            "throughput": throughput,
+        })
+
+    return [result for result, _ in outputs]
+
 
+def _to_speech_transcriptions(segments) -> List[Dict[str, Any]]:
     words = []
     texts = []
     for seg in segments:
@@ -34,7 +183,7 @@ def transcribe_whisper(
     return [{
         "alternatives": [{
             "transcript": " ".join(texts).strip(),
-            "confidence": None, 
+            "confidence": None,
             "words": words,
         }]
-    }]
\ No newline at end of file
+    }]